@@ -0,0 +1,63 @@
+"""
+Benchmark van de event loop tijdens een matrix test, met en zonder hardware thread.
+
+De gesimuleerde bus blokkeert per register transactie `BUS_DELAY` seconden,
+ongeveer een 3 byte transactie op 100 kHz. Per modus worden de vertraging van
+de event loop (wat de UI merkt: frames, de Prompt timer, toetsen) en de
+doorvoer van de bus getoond.
+
+    python benchmarks/bench_event_loop.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from hardware_worker import AsyncPortBank, HardwareWorker, LoopLagMonitor  # noqa: E402
+from matrix_sweep import ContinuitySweep  # noqa: E402
+from simulator import WiringModel, SimulatedBackend  # noqa: E402
+from wiring_index import WiringIndex  # noqa: E402
+
+BUS_DELAY = 0.0003
+ANSWERS = ROOT / "test_results/testing_components_answers.json"
+IO = ROOT / "src/IOLIST.json"
+
+
+async def sweep(index, model, worker):
+    if worker is not None:
+        worker.start()
+    ports = await AsyncPortBank.open(SimulatedBackend(model, bus_delay=BUS_DELAY), worker=worker)
+    lag = LoopLagMonitor(interval=0.005)
+    lag.start()
+    start = time.perf_counter()
+    await ContinuitySweep(ports, index, model, settle=0).run()
+    elapsed = time.perf_counter() - start
+    loop_stats = await lag.stop()
+    ports.close()
+    return elapsed, loop_stats, ports.stats()
+
+
+async def main():
+    import json
+
+    with open(ANSWERS) as file:
+        answers = json.load(file)
+    with open(IO) as file:
+        io = json.load(file)
+    index = WiringIndex(answers, io)
+    model = WiringModel.from_project(ANSWERS, IO)
+
+    for name, worker in (("inline", None), ("thread", HardwareWorker())):
+        elapsed, loop_stats, bus = await sweep(index, model, worker)
+        print(
+            f"{name:>6}: {elapsed:.2f}s, event loop lag p99 {loop_stats.get('lag_p99_ms')} ms "
+            f"(max {loop_stats.get('lag_max_ms')} ms, {loop_stats['samples']} samples), "
+            f"{bus['reads'] + bus['writes']} transacties, {bus['transactions_per_second']} transacties/s bustijd"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
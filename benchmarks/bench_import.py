@@ -0,0 +1,78 @@
+"""
+Benchmark van de import van de kabellijsten in electrical_schemes/.
+
+Per werkboek wordt het "Cable list" werkblad één keer ingelezen en daarna
+`CreateProject.organize_connections` herhaald gemeten, naast de oude
+rij-voor-rij implementatie met `DataFrame.iterrows` als referentie. De
+uitkomst van beide moet exact gelijk zijn. Met SCALE wordt elke lijst ook
+vermenigvuldigd gemeten, als maat voor de grote extruder lijsten.
+
+    python benchmarks/bench_import.py
+"""
+import json
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+import pandas as pd  # noqa: E402
+
+from create_test_project import CreateProject  # noqa: E402
+
+REPEAT = 5
+SCALE = 20
+
+
+def organize_connections_iterrows(df):
+    """De oorspronkelijke implementatie, alleen als referentie."""
+    organized_connections = {}
+    for index, row in df.iterrows():
+        from_mark = row['from Mark']
+        to_mark = row['to mark']
+        organized_connections.setdefault(from_mark, []).append({
+            "from_terminal": row['From terminal'],
+            "to_part": row['to part'],
+            "to_mark": to_mark,
+            "to_terminal": row['to terminal']
+        })
+        organized_connections.setdefault(to_mark, []).append({
+            "from_terminal": row['to terminal'],
+            "to_part": row['From Part'],
+            "to_mark": from_mark,
+            "to_terminal": row['From terminal']
+        })
+    return organized_connections
+
+
+def best_of(function, *args):
+    timings = []
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = function(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def main():
+    project = CreateProject()
+    for path_file in sorted((ROOT / "electrical_schemes").glob("*.xlsx")):
+        excel_file = pd.ExcelFile(path_file)
+        sheet_name = 'Cable list' if 'Cable list' in excel_file.sheet_names else 'Cable list '
+        sheet = pd.read_excel(excel_file, sheet_name=sheet_name, header=1)
+
+        for scale in (1, SCALE):
+            df = pd.concat([sheet] * scale, ignore_index=True)
+            vectorized, result = best_of(project.organize_connections, df)
+            legacy, reference = best_of(organize_connections_iterrows, df)
+            same = json.dumps(result, indent=4) == json.dumps(reference, indent=4)
+            print(
+                f"{path_file.name} x{scale}: {len(df)} rijen, columnar {vectorized * 1000:.1f} ms "
+                f"({len(df) / vectorized:.0f} rijen/s), iterrows {legacy * 1000:.1f} ms, "
+                f"{legacy / vectorized:.1f}x sneller, gelijk: {same}"
+            )
+
+
+if __name__ == "__main__":
+    main()
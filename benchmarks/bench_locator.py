@@ -0,0 +1,61 @@
+"""
+Benchmark van de miswire locator tegen de gesimuleerde tester.
+
+Voor elke aangesloten tester pin wordt de probe op zijn terminal gezet en
+zoeken de bisectie- en de lineaire locator de pin terug. Per strategie worden
+de stappen (elk één settle tijd), de probe reads (minstens twee per stap voor
+de bevestiging), de I2C writes, de rekentijd en de geschatte tijd op de bank
+getoond. Die schatting is stappen x settle tijd plus de bus transacties zelf;
+de bevestigende read wacht geen extra settle tijd (alleen als de probe nog
+niet stabiel is).
+
+    python benchmarks/bench_locator.py
+"""
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from locator import LOCATORS  # noqa: E402
+from hardware_worker import AsyncPortBank  # noqa: E402
+from simulator import WiringModel, SimulatedBackend  # noqa: E402
+
+SETTLE = 0.1  # De settle tijd die de tester op de bank gebruikt
+TRANSACTION = 0.0005  # Eén register read of write op 100 kHz I2C, ongeveer
+
+
+async def main():
+    model = WiringModel.from_project(
+        ROOT / "test_results/testing_components_answers.json",
+        ROOT / "src/IOLIST.json",
+    )
+    targets = sorted(model.pin_nodes.items())
+
+    for name, locate in LOCATORS.items():
+        ports = await AsyncPortBank.open(SimulatedBackend(model))
+        found = 0
+        stats = {}
+        start = time.perf_counter()
+        for pin, node in targets:
+            model.place_probe(*node)
+            result = await locate(ports, settle=0, stats=stats)
+            found += result != (None, None)
+        elapsed = time.perf_counter() - start
+
+        counters = ports.counters()
+        steps = stats["steps"] / len(targets)
+        reads = counters["reads"] / len(targets)
+        writes = counters["writes"] / len(targets)
+        bench = steps * SETTLE + (reads + writes) * TRANSACTION
+        print(
+            f"{name:>7}: {len(targets)} miswires, {found} gevonden, per miswire {steps:.1f} stappen, "
+            f"{reads:.1f} probe reads en {writes:.1f} writes, "
+            f"{len(targets) / elapsed:.0f} ops/s, ~{bench:.2f}s per miswire op de bank"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
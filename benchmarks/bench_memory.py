@@ -0,0 +1,100 @@
+"""
+Geheugen benchmark voor de werkboek import: pandas tegen streaming.
+
+Elke meting draait in een eigen proces. pandas en openpyxl worden vooraf
+geïmporteerd, zodat alleen het importeren van het werkboek telt; de piek
+komt van tracemalloc (Python allocaties) en ru_maxrss (het hele proces).
+Naast de meegeleverde werkboeken wordt een S25 kabellijst van 10x en 50x
+zo veel rijen gegenereerd, om te zien of de piek met het aantal rijen meegroeit.
+
+    python benchmarks/bench_memory.py
+    python benchmarks/bench_memory.py --scale 10 --scale 200
+"""
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+SCALES = (10, 50)
+
+MEASURE = """
+import json, resource, sys, time, tracemalloc
+from pathlib import Path
+sys.path.insert(0, {src!r})
+import pandas, openpyxl
+from create_test_project import CreateProject
+
+project = CreateProject()
+project.compiled_dir = Path({compiled_dir!r})  # compile() schrijft de cache; die gaat naar de tijdelijke map
+project.streaming_import = {streaming!r}
+tracemalloc.start()
+start = time.perf_counter()
+compiled = project.compile(Path({path!r}))
+elapsed = time.perf_counter() - start
+current, peak = tracemalloc.get_traced_memory()
+print(json.dumps({{
+    "seconds": round(elapsed, 3),
+    "peak_mb": round(peak / 2 ** 20, 2),
+    "retained_mb": round(current / 2 ** 20, 2),
+    "maxrss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    "graph_bytes": len(compiled["graph"]),
+}}))
+"""
+
+
+def measure(path: Path, streaming: bool, workdir: Path) -> dict:
+    script = MEASURE.format(src=str(ROOT / "src"), compiled_dir=str(workdir / "compiled"), streaming=streaming, path=str(path))
+    completed = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def scaled_workbook(source: Path, scale: int, target: Path) -> Path:
+    """De kabellijst van `source` met alle data rijen `scale` keer herhaald (andere marks per kopie)."""
+    from openpyxl import Workbook, load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    sheet = workbook[next(name for name in workbook.sheetnames if name.strip() == "Cable list")]
+    rows = [tuple(cell.value for cell in row) for row in sheet.iter_rows()]
+    workbook.close()
+    header = rows[1]
+    marks = {header.index("from Mark"), header.index("to mark")}
+
+    output = Workbook(write_only=True)
+    out_sheet = output.create_sheet("Cable list")
+    out_sheet.append(rows[0])
+    out_sheet.append(header)
+    for copy in range(scale):
+        for row in rows[2:]:
+            out_sheet.append([
+                f"{value}#{copy}" if copy and position in marks and value is not None else value
+                for position, value in enumerate(row)
+            ])
+    output.save(target)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Geheugen van de werkboek import, pandas tegen streaming")
+    parser.add_argument("--scale", type=int, action="append", help="gegenereerde S25 kabellijst met zo veel keer de rijen")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        workdir = Path(workdir)
+        workbooks = sorted((ROOT / "electrical_schemes").glob("*.xlsx"))
+        source = next(path for path in workbooks if path.stem.endswith("S25"))
+        for scale in args.scale or SCALES:
+            workbooks.append(scaled_workbook(source, scale, workdir / f"S25 x{scale}.xlsx"))
+
+        print(f"{'workbook':<48} {'mode':<10} {'seconds':>8} {'peak MB':>8} {'kept MB':>8} {'maxrss MB':>10}")
+        for path in workbooks:
+            for streaming in (False, True):
+                result = measure(path, streaming, workdir)
+                print(f"{path.stem[-40:]:<48} {'streaming' if streaming else 'pandas':<10} {result['seconds']:>8.3f} "
+                      f"{result['peak_mb']:>8.2f} {result['retained_mb']:>8.2f} {result['maxrss_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Startup benchmark: import tijd van de UI (main) en de headless runner (cli).
+
+Elke entry point wordt een paar keer in een nieuw proces geïmporteerd met
+`python -X importtime`; de mediaan van de totale import tijd wordt tegen een
+budget gezet en de duurste modules worden getoond. Modules die bij het
+opstarten niet geladen mogen worden (pandas/openpyxl: alleen bij het
+importeren van een werkboek, de hardware libraries: alleen als een test
+start) laten de benchmark ook falen.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --budget main=2500 --budget cli=1200   # bv. op de Pi
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Budget in ms voor de import van elke entry point (ontwikkel PC)
+BUDGETS = {"main": 600, "cli": 400}
+FORBIDDEN = ("pandas", "openpyxl", "numpy", "board", "busio", "adafruit_mcp230xx", "RPi")
+RUNS = 5
+TOP = 12
+
+
+def import_times(module: str) -> list:
+    """[(naam, self_us, cumulatief_us, diepte)] van één koude import."""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT / "src", capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def report(module: str, budget: float) -> bool:
+    runs = [import_times(module) for _ in range(RUNS)]
+    totals = [next(cumulative for name, _, cumulative, _ in rows if name == module) / 1000 for rows in runs]
+    total = statistics.median(totals)
+    loaded = {name.split(".")[0] for name, *_ in runs[-1]}
+    forbidden = sorted(loaded & set(FORBIDDEN))
+
+    ok = total <= budget and not forbidden
+    print(f"{module}: {total:.0f} ms (min {min(totals):.0f}, max {max(totals):.0f}), budget {budget:.0f} ms  {'OK' if ok else 'FAIL'}")
+    if forbidden:
+        print(f"  geladen bij het opstarten, hoort lazy: {', '.join(forbidden)}")
+
+    # De duurste directe imports van de entry point
+    direct = sorted((row for row in runs[-1] if row[3] == 1), key=lambda row: row[2], reverse=True)
+    for name, _, cumulative, _ in direct[:TOP]:
+        print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import tijd van de entry points tegen een budget")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=MS", help="budget per entry point overschrijven")
+    args = parser.parse_args()
+    budgets = dict(BUDGETS)
+    for item in args.budget:
+        module, ms = item.split("=")
+        budgets[module] = float(ms)
+
+    results = [report(module, budget) for module, budget in budgets.items()]
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,366 @@
+"""
+Benchmark suite voor de hete paden van de tester.
+
+Scenario's (vaste invoer, dus herhaalbaar):
+
+    create    CreateProject.create per werkboek in electrical_schemes/, koud en uit de cache
+    index     WiringIndex opbouwen en zoek_connector / pin lookups
+    graph     connections laden als JSON en als mmap WiringGraph, voor S25 en een 10x/100x groter schema
+    sweep     een volledige RunTest.run over alle connectoren tegen de gesimuleerde MCP's,
+              een run met een miswire, en de locators over alle pinnen
+    save      save_results_to_json bij een groeiend aantal resultaten, direct en via de journal
+    tree      ResultStore bulk insert en queries, TestTree.compose en het laden van een pagina terminals
+
+Per meting worden ops/s en p50/p99 van één iteratie getoond; alles wordt als
+JSON in benchmarks/results/ bewaard. Met --compare wordt een eerdere run ernaast gezet.
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --only save,tree --compare benchmarks/results/<vorige>.json
+"""
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from textual.app import App  # noqa: E402
+
+from create_test_project import CreateProject  # noqa: E402
+from locator import LOCATORS  # noqa: E402
+from hardware_worker import AsyncPortBank  # noqa: E402
+from metrics import RunMetrics  # noqa: E402
+from result_journal import ResultJournal  # noqa: E402
+from result_store import ResultStore, PAGE_SIZE  # noqa: E402
+from run_test import RunTest  # noqa: E402
+from schemes import scheme_file  # noqa: E402
+from simulator import WiringModel, SimulatedBackend  # noqa: E402
+from test_tree import TestTree  # noqa: E402
+from utils import BaseTest, SubTest  # noqa: E402
+from wiring_graph import WiringGraph  # noqa: E402
+from wiring_index import WiringIndex, ANSWERS_PATH, IO_PATH  # noqa: E402
+
+RESULTS_DIR = ROOT / "benchmarks/results"
+GRAPH_SCALES = (1, 10, 100)
+SAVE_SIZES = (10, 100, 1000, 10000)
+TREE_SIZES = (100, 1000, 10000)
+
+
+class BenchApp(App):
+    """Host voor TestTree; die leest test_time, de store en de run van de app."""
+    test_time = 30
+    store = None
+    run_id = None
+
+
+class Suite:
+    def __init__(self, repeat: int, warmup: int, workdir: Path):
+        self.repeat = repeat
+        self.warmup = warmup
+        self.workdir = workdir
+        self.results = []
+
+    def measure(self, name: str, function, ops: int = 1, setup=None, repeat: int | None = None, **params):
+        """Meet `function` `repeat` keer; `setup` draait ongemeten voor elke iteratie."""
+        timings = []
+        for iteration in range(self.warmup + (repeat or self.repeat)):
+            if setup is not None:
+                setup()
+            gc.collect()
+            gc.disable()
+            start = time.perf_counter()
+            try:
+                function()
+            finally:
+                elapsed = time.perf_counter() - start
+                gc.enable()
+            if iteration >= self.warmup:
+                timings.append(elapsed)
+        self._add(name, params, ops, timings)
+
+    async def measure_async(self, name: str, function, ops: int = 1, setup=None, repeat: int | None = None, **params):
+        timings = []
+        for iteration in range(self.warmup + (repeat or self.repeat)):
+            if setup is not None:
+                setup()
+            gc.collect()
+            start = time.perf_counter()
+            await function()
+            if iteration >= self.warmup:
+                timings.append(time.perf_counter() - start)
+        self._add(name, params, ops, timings)
+
+    def _add(self, name, params, ops, timings):
+        timings.sort()
+        result = {
+            "name": name,
+            "params": params,
+            "ops": ops,
+            "iterations": len(timings),
+            "ops_per_second": round(ops * len(timings) / sum(timings), 1),
+            "p50_ms": round(statistics.median(timings) * 1000, 3),
+            "p99_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1000, 3),
+        }
+        self.results.append(result)
+        label = f"{name} {' '.join(f'{key}={value}' for key, value in params.items())}"
+        print(f"{label:<48} {result['ops_per_second']:>12.1f} ops/s  p50 {result['p50_ms']:>10.3f} ms  p99 {result['p99_ms']:>10.3f} ms")
+
+
+def workdir_project(suite: Suite) -> CreateProject:
+    """Een CreateProject dat alles (ook de cache) in de werkmap van de suite schrijft, niet in test_results/."""
+    project = CreateProject()
+    project.graph_output_path = suite.workdir / "connections.wgraph"
+    project.json_output_path = suite.workdir / "connections.json"
+    project.testing_components_output_path = suite.workdir / "testing_components_answers.json"
+    project.testing_components_results = suite.workdir / "test_results.json"
+    project.fixture_output_path = suite.workdir / "fixture.json"
+    project.compiled_dir = suite.workdir / "compiled"
+    return project
+
+
+def bench_create(suite: Suite):
+    project = workdir_project(suite)
+    for path_file in sorted((ROOT / "electrical_schemes").glob("*.xlsx")):
+        workbook = path_file.name
+        scheme = path_file.stem.split("list ")[-1].split()[0]  # "...assembly list E40 S7-1500 PLC" -> "E40"
+        suite.measure("create", lambda: project.create(workbook), setup=lambda: shutil.rmtree(project.compiled_dir, ignore_errors=True),
+                      workbook=scheme, cache="cold")
+        suite.measure("create", lambda: project.create(workbook), workbook=scheme, cache="warm")
+
+
+def bench_index(suite: Suite):
+    with open(ANSWERS_PATH, "r") as file:
+        data = json.load(file)
+    with open(IO_PATH, "r") as file:
+        data_io = json.load(file)
+    suite.measure("index.build", lambda: WiringIndex(data, data_io))
+
+    index = WiringIndex(data, data_io)
+    tester = RunTest()
+    # Alle bestaande MCP pinnen plus evenveel die niet bestaan
+    addresses = list(index.connectors) + [(address, pin + 16) for address, pin in index.connectors]
+    suite.measure("index.zoek_connector", lambda: [tester.zoek_connector(index, *address) for address in addresses], ops=len(addresses))
+
+    terminals = [(connector, terminal["from_terminal"]) for connector, terminals in data.items() for terminal in terminals]
+    suite.measure("index.pin", lambda: [index.pin(*key) for key in terminals], ops=len(terminals))
+
+
+def bench_graph(suite: Suite):
+    # De verbindingen van S25, in de werkmap gebouwd (connections.wgraph van test_results/ staat niet in git)
+    project = workdir_project(suite)
+    if not project.create(scheme_file("S25")):
+        raise RuntimeError("S25 kon niet worden aangemaakt")
+    graph = WiringGraph.load(project.graph_output_path)
+    connections = graph.to_dict()
+    graph.close()
+
+    for scale in GRAPH_SCALES:
+        # Een groter schema: dezelfde kast `scale` keer, met andere marks
+        scaled = {
+            f"{mark}#{copy}" if copy else mark: terminals
+            for copy in range(scale) for mark, terminals in connections.items()
+        }
+        json_path = suite.workdir / f"connections_{scale}.json"
+        graph_path = suite.workdir / f"connections_{scale}.wgraph"
+        with open(json_path, "w") as file:
+            json.dump(scaled, file, indent=4)
+        WiringGraph.build(scaled).save(graph_path)
+        edges = sum(len(terminals) for terminals in scaled.values())
+        marks = list(scaled)[::max(1, len(scaled) // 100)]
+        print(f"graph scale={scale}: json {json_path.stat().st_size} bytes, graph {graph_path.stat().st_size} bytes")
+
+        def load_json():
+            with open(json_path, "r") as file:
+                data = json.load(file)
+            return [data[mark] for mark in marks]
+
+        def load_graph():
+            graph = WiringGraph.load(graph_path)
+            lookups = [graph.edges(mark) for mark in marks]
+            graph.close()
+            return lookups
+
+        suite.measure("graph.json", load_json, ops=edges, scale=scale)
+        suite.measure("graph.mmap", load_graph, ops=edges, scale=scale)
+
+
+def bench_sweep(suite: Suite):
+    empty = suite.workdir / "empty_results.json"
+    results_path = suite.workdir / "sweep_results.json"
+    try:
+        # RunTest leest het geladen project (test_results/fixture.json)
+        index = WiringIndex.for_project()
+    except FileNotFoundError as error:
+        print(f"sweep overgeslagen: {error}")
+        return
+    with open(empty, "w") as file:
+        json.dump({"cabinet_name": "bench", "test_results": {connector: [] for connector in index.answers}}, file)
+
+    def fresh():
+        shutil.copy(empty, results_path)
+        ResultJournal(results_path).clear()
+
+    def tester(model):
+        return RunTest(
+            backend=SimulatedBackend(model),
+            result_pause=0,
+            pass_pause=0,
+            metrics=RunMetrics(directory=suite.workdir / "metrics"),
+        )
+
+    async def sweep():
+        run = tester(WiringModel.from_project(ANSWERS_PATH, IO_PATH))
+        for connector in index.answers:
+            await run.run(connector, results_path, test_time=1)
+
+    terminals = sum(len(terminals) for terminals in index.answers.values())
+    asyncio.run(suite.measure_async("sweep.run", sweep, ops=terminals, setup=fresh, repeat=max(1, suite.repeat // 4)))
+
+    async def miswire():
+        model = WiringModel.from_project(ANSWERS_PATH, IO_PATH)
+        model.disconnect(("20C1", "3"))
+        model.miswire(("10CON1", "3"), ("C20.1", "4"))
+        await tester(model).run("20C1", results_path, test_time=0.05)
+
+    asyncio.run(suite.measure_async("sweep.miswire", miswire, setup=fresh, repeat=max(1, suite.repeat // 4)))
+
+    async def locate():
+        model = WiringModel.from_project(ANSWERS_PATH, IO_PATH)
+        targets = sorted(model.pin_nodes.items())
+        ports = await AsyncPortBank.open(SimulatedBackend(model))
+        for name, locator in LOCATORS.items():
+            async def run():
+                for pin, node in targets:
+                    model.place_probe(*node)
+                    await locator(ports, settle=0)
+            await suite.measure_async("sweep.locate", run, ops=len(targets), locator=name)
+
+    asyncio.run(locate())
+
+
+def bench_save(suite: Suite):
+    path = suite.workdir / "save_results.json"
+
+    def fresh():
+        with open(path, "w") as file:
+            json.dump({"cabinet_name": "bench", "test_results": {}}, file)
+        ResultJournal(path).clear()
+
+    for size in SAVE_SIZES:
+        results = [
+            SubTest(title=f"Test for terminal {i}", terminal=str(i), passes=i % 7 != 0, answer=f"Should go to mark: X{i} and terminal {i % 16}")
+            for i in range(size)
+        ]
+        test = BaseTest(title="BENCH", results=results)
+        suite.measure("save.json", lambda: test.save_results_to_json(path), ops=size, setup=fresh, results=size)
+
+        def journaled():
+            journal = ResultJournal(path, fsync="batch", compact_every=size + 1)
+            test = BaseTest(title="BENCH", journal=journal)
+            for subtest in results:
+                test.record(subtest)
+            test.save_results_to_json(path)
+
+        suite.measure("save.journal", journaled, ops=size, setup=fresh, results=size)
+
+
+def bench_tree(suite: Suite):
+    async def run():
+        app = BenchApp()
+        async with app.run_test():
+            for size in TREE_SIZES:
+                # Connectoren van 50 terminals, elke tiende fout
+                test_results = {
+                    f"C{connector}": [
+                        {"terminal": str(terminal), "passed": terminal % 10 != 0, "answer": f"Should go to mark: X{terminal}"}
+                        for terminal in range(50)
+                    ]
+                    for connector in range(size // 50)
+                }
+                data = {"cabinet_name": "bench", "test_results": test_results}
+                store = ResultStore(suite.workdir / f"store_{size}.sqlite3")
+                suite.measure("store.insert", lambda: store.start_run("bench", "bench", data), ops=size, results=size)
+
+                # Eén mark over alle kasten (elke insert hierboven was een kast-run)
+                suite.measure("store.failures", lambda: store.failures("C0"), results=size)
+
+                app.store, app.run_id = store, store.latest_run()["id"]
+                tree = TestTree(testers=[], selected_scheme="bench")
+                suite.measure("tree.compose", lambda: list(tree.compose()), ops=size // 50, leaves=size)
+
+                def expand():
+                    tree.loaded.clear()
+                    tree.parent_nodes["C0"].remove_children()
+                    tree.load_page("C0")
+
+                suite.measure("tree.page", expand, ops=min(50, PAGE_SIZE), leaves=size)
+                store.close()
+
+    asyncio.run(run())
+
+
+SCENARIOS = {
+    "create": bench_create,
+    "index": bench_index,
+    "graph": bench_graph,
+    "sweep": bench_sweep,
+    "save": bench_save,
+    "tree": bench_tree,
+}
+
+
+def compare(results: list, previous_path: Path):
+    with open(previous_path, "r") as file:
+        previous = {(result["name"], json.dumps(result["params"], sort_keys=True)): result for result in json.load(file)["results"]}
+    print(f"\nTen opzichte van {previous_path.name}:")
+    for result in results:
+        before = previous.get((result["name"], json.dumps(result["params"], sort_keys=True)))
+        if before is None:
+            continue
+        ratio = result["ops_per_second"] / before["ops_per_second"]
+        label = f"{result['name']} {' '.join(f'{key}={value}' for key, value in result['params'].items())}"
+        print(f"{label:<48} {ratio:>6.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--only", default=",".join(SCENARIOS), help="komma gescheiden scenario's")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=2)
+    parser.add_argument("--output", type=Path, help="standaard benchmarks/results/<tijd>.json")
+    parser.add_argument("--compare", type=Path, help="eerdere resultaten om mee te vergelijken")
+    args = parser.parse_args()
+
+    started = datetime.now()
+    with tempfile.TemporaryDirectory() as workdir:
+        suite = Suite(args.repeat, args.warmup, Path(workdir))
+        for name in args.only.split(","):
+            SCENARIOS[name](suite)
+
+    output = args.output or RESULTS_DIR / f"{started:%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as file:
+        json.dump({
+            "started": started.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+            "results": suite.results,
+        }, file, indent=4)
+    print(f"\nResultaten opgeslagen in {output}")
+
+    if args.compare:
+        compare(suite.results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
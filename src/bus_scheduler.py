@@ -0,0 +1,155 @@
+import asyncio
+import logging
+
+from matrix_sweep import ContinuitySweep
+from hardware_worker import AsyncPortBank
+from fixture_profile import Station
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+
+class BusScheduler:
+    """
+    Eén queue voor alle I2C toegang op de gedeelde bus.
+
+    Gelijktijdige tests sturen hun verzoeken naar de queue in plaats van zelf
+    de bus te gebruiken. De worker pakt alles wat er op dat moment klaarstaat
+    als één batch en voert die per expander adres uit:
+
+    - stuurverzoeken van alle eigenaren worden per poort samengevoegd tot
+      één masker en in één bulk write gezet (alleen als het verandert);
+    - leesverzoeken voor hetzelfde adres worden één read die iedereen krijgt.
+
+    Zo bepaalt de bandbreedte van de bus de doorvoer, niet de volgorde van
+    de tests.
+    """
+
+    def __init__(self, ports: AsyncPortBank):
+        self.ports = ports
+        self.queue = asyncio.Queue()
+        self.owned = {}  # eigenaar -> {adres: masker}
+        self.task = None
+        self.batches = 0
+        self.requests = 0
+
+    def start(self):
+        if self.task is None:
+            self.task = asyncio.create_task(self._worker())
+
+    async def stop(self):
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.ports.batch([(port.release,) for port in self.ports.ports.values()])
+
+    async def drive(self, owner, masks: dict):
+        """Stuurt voor `owner` de pinnen in `masks` hoog; eerdere pinnen van dezelfde eigenaar gaan los."""
+        await self._submit("drive", owner, masks)
+
+    async def release(self, owner):
+        await self._submit("drive", owner, {})
+
+    async def read(self, address: int) -> int:
+        return await self._submit("read", address, None)
+
+    async def read_all(self) -> dict:
+        values = await asyncio.gather(*(self.read(address) for address in self.ports.ports))
+        return dict(zip(self.ports.ports, values))
+
+    async def _submit(self, kind: str, key, value):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((kind, key, value, future))
+        return await future
+
+    async def _worker(self):
+        while True:
+            batch = [await self.queue.get()]
+            while not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                # De hele batch in één keer op de hardware thread
+                results = await self.ports.call(self._execute, [request[:3] for request in batch])
+            except Exception as error:
+                for *_, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+            else:
+                for (*_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+
+    def _execute(self, batch: list) -> list:
+        """Voert een batch uit en geeft per verzoek het resultaat terug."""
+        self.batches += 1
+        self.requests += len(batch)
+
+        # Eerst alle stuurverzoeken: per poort één samengevoegd masker
+        drives = [request for request in batch if request[0] == "drive"]
+        if drives:
+            changed = set()
+            for _, owner, masks in drives:
+                changed |= self.owned.get(owner, {}).keys() | masks.keys()
+                self.owned[owner] = {address: mask for address, mask in masks.items() if mask}
+            for address in changed:
+                combined = 0
+                for masks in self.owned.values():
+                    combined |= masks.get(address, 0)
+                self.ports.ports[address].drive(combined)
+
+        # Dan de reads: één per adres, gedeeld door iedereen die erom vroeg
+        values = {}
+        results = []
+        for kind, address, _ in batch:
+            if kind == "read" and address not in values:
+                values[address] = self.ports.ports[address].read()
+            results.append(values[address] if kind == "read" else None)
+        return results
+
+
+class ScheduledSweep(ContinuitySweep):
+    """ContinuitySweep voor één station die de bus deelt via een BusScheduler."""
+
+    def __init__(self, scheduler: BusScheduler, station: Station, *args, **kwargs):
+        super().__init__(scheduler.ports, *args, connectors=station.connectors, **kwargs)
+        self.scheduler = scheduler
+        self.station = station
+
+    async def drive(self, pin: tuple):
+        address, pin_number = pin
+        await self.scheduler.drive(self.station.owner, {address: 1 << pin_number})
+
+    async def read_all(self) -> dict:
+        return await self.scheduler.read_all()
+
+    async def release(self):
+        await self.scheduler.release(self.station.owner)
+
+
+async def sweep_stations(ports: AsyncPortBank, stations: list, index, model, settle: float = 0.01) -> dict:
+    """
+    Draait de matrix test van alle stations tegelijk; geeft per station (expected, observed, report).
+
+    Als stations toch een net delen (bv. een gemeenschappelijke PE) kan de
+    pin van het ene station bij het andere hoog lezen. Stations met
+    bevindingen worden daarom daarna nog één keer alleen gemeten, terwijl de
+    rest van de bus stil is; alleen die meting telt.
+    """
+    scheduler = BusScheduler(ports)
+    scheduler.start()
+    try:
+        sweeps = [ScheduledSweep(scheduler, station, index, model, settle=settle) for station in stations]
+        results = await asyncio.gather(*(sweep.run() for sweep in sweeps))
+    finally:
+        await scheduler.stop()
+    logger.debug(f"Bus scheduler: {scheduler.requests} verzoeken in {scheduler.batches} batches, I2C: {ports.counters()}")
+
+    for position, (station, (expected, observed, report)) in enumerate(zip(stations, results)):
+        if any(report.values()):
+            logger.debug(f"Station {station.owner} heeft bevindingen, opnieuw meten zonder andere stations")
+            results[position] = await ContinuitySweep(ports, index, model, settle=settle, connectors=station.connectors).run()
+    return {station.owner: result for station, result in zip(stations, results)}
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+import time
+from datetime import datetime
+from pathlib import Path
+
+from hardware_worker import AsyncPortBank
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+CALIBRATION_PATH = Path(__file__).parent.parent / "test_results/calibration.json"
+DEFAULT_SETTLE = 0.1  # Zonder kalibratie: de vaste wachttijd die de tester altijd gebruikte
+
+
+def _wait_level(bank, pin: tuple, level: bool, timeout: float):
+    """Leest `pin` tot hij `level` heeft; geeft de verstreken tijd, of None na `timeout`."""
+    address, pin_number = pin
+    start = time.perf_counter()
+    while True:
+        if bool(bank.read(address) >> pin_number & 1) == level:
+            return time.perf_counter() - start
+        if time.perf_counter() - start > timeout:
+            return None
+
+
+def _edges(bank, driver: tuple, receiver: tuple, timeout: float) -> tuple:
+    """
+    Stuurt `driver` hoog en meet hoe lang het duurt tot `receiver` hoog leest
+    (rise) en na het loslaten weer laag (fall). Draait op de hardware thread,
+    zodat er geen event loop tussen de reads zit.
+    """
+    bank.drive(*driver)
+    rise = _wait_level(bank, receiver, True, timeout)
+    bank.release()
+    fall = _wait_level(bank, receiver, False, timeout) if rise is not None else None
+    return rise, fall
+
+
+class Calibration:
+    """
+    Gemeten settle tijden van de bank, per expander.
+
+    `expanders` bevat per adres de langste gemeten rise en fall tijd. De
+    engine wacht `margin` keer de gemeten tijd (minimaal `minimum`) in plaats
+    van een vaste 0,1 s. Zonder kalibratie blijft het `default`.
+    """
+
+    def __init__(self, expanders: dict | None = None, margin: float = 3.0, minimum: float = 0.002,
+                 default: float = DEFAULT_SETTLE, created: str | None = None):
+        self.expanders = {int(address): values for address, values in (expanders or {}).items()}
+        self.margin = margin
+        self.minimum = minimum
+        self.default = default
+        self.created = created
+
+    @property
+    def calibrated(self) -> bool:
+        return bool(self.expanders)
+
+    @classmethod
+    def load(cls, path: Path = CALIBRATION_PATH) -> "Calibration":
+        """De opgeslagen kalibratie, of een lege (vaste wachttijden) als die er niet is."""
+        try:
+            with open(path, "r") as file:
+                data = json.load(file)
+        except FileNotFoundError:
+            return cls()
+        except (OSError, json.JSONDecodeError) as error:
+            logger.warning(f"Kalibratie in {path} onleesbaar, vaste wachttijden gebruiken: {error}")
+            return cls()
+        return cls(**data)
+
+    def save(self, path: Path = CALIBRATION_PATH):
+        tmp_path = Path(path).with_suffix(".tmp")
+        with open(tmp_path, "w") as file:
+            json.dump({
+                "created": self.created,
+                "margin": self.margin,
+                "minimum": self.minimum,
+                "default": self.default,
+                "expanders": {str(address): values for address, values in self.expanders.items()},
+            }, file, indent=4)
+        os.replace(tmp_path, path)
+
+    def settle(self, addresses) -> float:
+        """De wachttijd na het sturen als er pinnen op deze expanders meedoen."""
+        if not self.calibrated:
+            return self.default
+        measured = [
+            max(self.expanders[address]["rise"], self.expanders[address]["fall"])
+            for address in addresses if address in self.expanders
+        ]
+        if not measured:
+            return self.default
+        return max(self.minimum, max(measured) * self.margin)
+
+    def settle_times(self, addresses, receiver: int) -> dict:
+        """Per expander adres de wachttijd als er vanaf die expander naar `receiver` (bv. de probe) gemeten wordt."""
+        return {address: self.settle({address, receiver}) for address in addresses}
+
+
+async def calibrate(ports: AsyncPortBank, pairs=(), samples: int = 3, timeout: float = 0.5, **settings) -> Calibration:
+    """
+    Meet de settle tijden van de bank.
+
+    Elke stuurbare pin wordt hoog gestuurd en teruggelezen (de lijn zelf,
+    belast door de kabelboom). `pairs` zijn (driver, receiver) paren die via
+    de kabelboom verbonden horen te zijn, bv. uit de matrix test; die meten
+    de weg door de draad. Een meting telt mee voor de expander van zowel de
+    driver als de receiver; paren die niet hoog worden (open) tellen als
+    timeout en niet mee.
+    """
+    measurements = [(pin, pin) for pin in ports.pins()] + list(pairs)
+    expanders = {}
+    for driver, receiver in measurements:
+        for _ in range(samples):
+            rise, fall = await ports.call(_edges, ports.bank, driver, receiver, timeout)
+            for address in {driver[0], receiver[0]}:
+                values = expanders.setdefault(address, {"rise": 0.0, "fall": 0.0, "samples": 0, "timeouts": 0})
+                if rise is None or fall is None:
+                    values["timeouts"] += 1
+                    continue
+                values["rise"] = max(values["rise"], round(rise, 6))
+                values["fall"] = max(values["fall"], round(fall, 6))
+                values["samples"] += 1
+
+    for address, values in expanders.items():
+        logger.debug(f"Kalibratie MCP {address}: rise {values['rise'] * 1000:.2f} ms, fall {values['fall'] * 1000:.2f} ms, "
+                     f"{values['samples']} metingen, {values['timeouts']} timeouts")
+    return Calibration(
+        {address: values for address, values in expanders.items() if values["samples"]},
+        created=datetime.now().isoformat(timespec="seconds"),
+        **settings,
+    )
@@ -0,0 +1,246 @@
+"""
+Headless tester: test een kast zonder de Textual UI.
+
+Laadt (optioneel) een schema, test de gekozen connectoren of alle
+connectoren en schrijft elk resultaat als JSON regel naar stdout. Standaard
+met de matrix test, die geen operator nodig heeft; --mode probe wacht per
+terminal tot iemand de probe plaatst. De exit code is 0 als alles goed is,
+1 bij een gefaalde terminal en 2 als de test niet kon starten.
+
+    python src/cli.py --scheme S25 --serial KS-1042
+    python src/cli.py --mode probe --connector 20C1 --connector 20C2 --test-time 10
+    python src/cli.py --backend simulated
+    python src/cli.py --calibrate
+    python src/cli.py --migrate-fixture         # project van voor de fixture profielen
+    python src/cli.py --interrupt-pin 26:17     # INT lijn van MCP 26 op GPIO 17
+    python src/cli.py --mode stations --station 20C1,20C2 --station 8C1
+"""
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+
+from hardware_session import HardwareSession
+from io_backend import HardwareBackend, RecordingBackend, ReplayBackend
+from metrics import RunMetrics, METRICS_DIR
+from result_journal import ResultJournal
+from result_store import ResultStore, STORE_PATH, UNKNOWN_SERIAL
+from run_test import RunTest
+from schemes import testers, scheme_file
+from simulator import WiringModel, SimulatedBackend
+from utils import TestObserver
+from wiring_index import WiringIndex, ANSWERS_PATH
+from fixture_profile import FixtureProfile, Station, FIXTURE_PATH
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+RESULTS_PATH = Path(__file__).parent.parent / "test_results/test_results.json"
+
+
+class JsonLinesObserver(TestObserver):
+    """Schrijft prompts, contact en resultaten als JSON regels naar een stream."""
+
+    def __init__(self, stream=None):
+        # Niet als standaard argument: dan blijft het de stdout van het moment van importeren
+        self.stream = stream or sys.stdout
+        self.failed = 0
+        self.passed = 0
+
+    def emit(self, event: str, **fields):
+        self.stream.write(json.dumps({"event": event, **fields}) + "\n")
+        self.stream.flush()
+
+    async def plan(self, plan, eta: float):
+        self.emit("plan", test=plan.test, remaining=plan.remaining, marks=plan.marks, passed=plan.passed,
+                  unmapped=plan.unmapped, eta=round(eta, 1))
+
+    async def prompt(self, title: str, prompt: str, duration: int):
+        self.emit("prompt", title=title, prompt=prompt, duration=duration)
+
+    async def updateconatiner(self, state, state_2):
+        # (True, False): contact; (False, True): geen contact, de locator zoekt verder
+        self.emit("contact", contact=bool(state))
+
+    def on_result(self, test_name, subtest):
+        if subtest.passes:
+            self.passed += 1
+        else:
+            self.failed += 1
+        self.emit("result", test=test_name, terminal=subtest.terminal, passed=subtest.passes, answer=subtest.answer)
+
+
+def make_backend(name: str, trace: Path | None, interrupt_pins: dict | None = None):
+    if name == "replay":
+        return ReplayBackend(trace)
+    if name == "simulated":
+        backend = SimulatedBackend(WiringModel.from_project(ANSWERS_PATH, FIXTURE_PATH))
+    else:
+        backend = HardwareBackend(interrupt_pins=interrupt_pins)
+    if trace is not None:
+        backend = RecordingBackend(backend, trace)
+    return backend
+
+
+def interrupt_pin(value: str) -> tuple:
+    """'26:17' -> (26, 17): MCP adres en GPIO pin (BCM) van zijn INT lijn."""
+    try:
+        address, gpio = (int(part) for part in value.split(":"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"verwacht ADRES:GPIO, niet {value!r}")
+    return address, gpio
+
+
+def station(value: str) -> Station:
+    """'20C1,20C2' -> een station met die connectoren."""
+    connectors = [connector.strip() for connector in value.split(",") if connector.strip()]
+    if not connectors:
+        raise argparse.ArgumentTypeError("een station heeft minstens één connector nodig")
+    return Station(connectors=connectors)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Headless cabinet tester")
+    parser.add_argument("--scheme", choices=[tester[0] for tester in testers], help="eerst dit schema laden (wist de resultaten)")
+    parser.add_argument("--streaming-import", action="store_true", help="het werkboek rij voor rij importeren (weinig geheugen)")
+    parser.add_argument("--connector", action="append", help="te testen connector, mag vaker; standaard alle")
+    parser.add_argument("--mode", choices=("probe", "matrix", "stations"), default="matrix",
+                        help="matrix: alle pinnen tegen elkaar, zonder operator; probe: per terminal met de probe "
+                             "(wacht op een operator); stations: de matrix test van meerdere harnassen tegelijk")
+    parser.add_argument("--station", type=station, action="append", metavar="CONNECTOR[,CONNECTOR]",
+                        help="connectoren van één harness bij --mode stations, mag vaker; standaard de stations uit het fixture profiel")
+    parser.add_argument("--backend", choices=("hardware", "simulated", "replay"), default="hardware")
+    parser.add_argument("--trace", type=Path, help="bij hardware/simulated: I2C opnemen naar dit bestand; bij replay: afspelen")
+    parser.add_argument("--test-time", type=float, default=30, help="bij --mode probe: seconden per terminal om de probe te plaatsen")
+    parser.add_argument("--locate", choices=("bisect", "linear"), default="bisect")
+    parser.add_argument("--interrupt-pin", type=interrupt_pin, action="append", metavar="ADRES:GPIO",
+                        help="INT lijn van een expander, mag vaker; standaard die uit het fixture profiel")
+    parser.add_argument("--serial", help="serienummer van de kast; standaard die van de laatste run")
+    parser.add_argument("--results", type=Path, default=RESULTS_PATH)
+    parser.add_argument("--store", type=Path, default=STORE_PATH, help="database met de resultaten van alle kasten")
+    parser.add_argument("--metrics", type=Path, default=METRICS_DIR, help="map voor de metrics van elke run")
+    parser.add_argument("--migrate-fixture", action="store_true",
+                        help="fixture.json compileren voor een project van voor de fixture profielen (standaard profiel)")
+    parser.add_argument("--calibrate", action="store_true", help="eerst de settle tijden van de bank meten (kast goed aangesloten)")
+    parser.add_argument("--retest", action="store_true", help="ook terminals testen die al geslaagd zijn")
+    parser.add_argument("--verbose", "-v", action="store_true", help="debug logging naar stderr")
+    args = parser.parse_args(argv)
+    if args.backend == "replay" and args.trace is None:
+        parser.error("--backend replay heeft --trace nodig")
+    return args
+
+
+async def run(args) -> int:
+    store = ResultStore(args.store)
+    try:
+        return await run_with_store(args, store)
+    finally:
+        store.close()
+
+
+async def run_with_store(args, store: ResultStore) -> int:
+    latest = store.latest_run(args.serial)
+    serial = args.serial or (latest["serial"] if latest else UNKNOWN_SERIAL)
+    if args.scheme:
+        # Alleen hier pandas en de Excel import nodig
+        from create_test_project import CreateProject
+
+        project = CreateProject()
+        project.streaming_import = args.streaming_import
+        if not project.create(scheme_file(args.scheme)):
+            logger.error(f"Project voor {args.scheme} kon niet worden aangemaakt")
+            return 2
+
+    if not args.results.exists():
+        logger.error(f"Geen testresultaten gevonden in {args.results}, laad eerst een schema met --scheme")
+        return 2
+
+    journal = ResultJournal(args.results)
+    if args.scheme:
+        run_id = store.start_run(serial, args.scheme, journal.load())
+    else:
+        run_id = store.resume(serial, latest["scheme"] if latest else None, journal.load())
+    if args.retest:
+        data = journal.load()
+        connectors = args.connector or list(data["test_results"])
+        for connector in connectors:
+            data["test_results"][connector] = []
+        with open(args.results, "w") as file:
+            json.dump(data, file, indent=4)
+        journal.clear()
+        store.clear(run_id, connectors)
+
+    if args.migrate_fixture:
+        WiringIndex.migrate()
+    try:
+        index = WiringIndex.for_project()
+    except FileNotFoundError as error:
+        logger.error(f"{error} (of gebruik --migrate-fixture)")
+        return 2
+    connectors = args.connector or list(index.answers)
+    unknown = [connector for connector in connectors if connector not in index.answers]
+    if unknown:
+        logger.error(f"Onbekende connector(en): {', '.join(unknown)}")
+        return 2
+
+    # Het profiel van het geladen project, niet dat van de laatste run (kan een andere kast zijn)
+    profile = FixtureProfile.load(index.table.scheme)
+    stations = args.station or profile.stations
+    if args.mode == "stations":
+        if not stations:
+            logger.error("Geen stations: geef --station of zet ze in het fixture profiel")
+            return 2
+        unknown = [connector for station in stations for connector in station.connectors if connector not in index.answers]
+        if unknown:
+            logger.error(f"Onbekende connector(en) in de stations: {', '.join(unknown)}")
+            return 2
+        connectors = [connector for station in stations for connector in station.connectors]
+
+    observer = JsonLinesObserver()
+    # Eén keer de bus openen voor alle connectoren
+    interrupt_pins = dict(args.interrupt_pin) if args.interrupt_pin else profile.interrupt_pins
+    session = HardwareSession(make_backend(args.backend, args.trace, interrupt_pins))
+    tester = RunTest(
+        observer=observer,
+        journal=journal,
+        listeners=[observer.on_result],
+        session=session,
+        store=store,
+        run_id=run_id,
+        metrics=RunMetrics(args.metrics),
+        locate_mode=args.locate,
+        result_pause=0,
+        pass_pause=0,
+    )
+    try:
+        if args.calibrate:
+            calibration = await tester.calibrate()
+            observer.emit("calibration", expanders=calibration.expanders)
+        if args.mode == "stations":
+            await tester.run_stations(args.results, stations)
+        elif args.mode == "matrix":
+            await tester.run_matrix(args.results, connectors=None if args.connector is None else connectors)
+        else:
+            for connector in connectors:
+                await tester.run(connector, args.results, test_time=args.test_time)
+    finally:
+        await session.close()
+
+    observer.emit("summary", passed=observer.passed, failed=observer.failed, connectors=connectors, serial=serial, run=run_id)
+    return 1 if observer.failed else 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(stream=sys.stderr, level=logging.DEBUG if args.verbose else logging.WARNING,
+                        format="%(levelname)s %(name)s: %(message)s")
+    try:
+        return asyncio.run(run(args))
+    except KeyboardInterrupt:
+        return 130
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,101 +1,254 @@
+import hashlib
 import json
 import os
+import pickle
 from pathlib import Path
-import pandas as pd
-from rich import print
+from result_journal import ResultJournal
+from schemes import SCHEMES_DIR, scheme_of
+from fixture_profile import FixtureProfile, PinTable, FIXTURE_PATH
+from wiring_graph import WiringGraph, GraphBuilder, GRAPH_PATH
 import logging
 
 logging.getLogger(__name__)
 logger = logging.getLogger(__name__)
 
+# De fases van create, in volgorde; listeners krijgen ze met hun index
+STAGES = ("read", "organize", "filter", "write")
+
+
+class ProjectCancelled(Exception):
+    """Het aanmaken is afgebroken voordat er iets geschreven is; het vorige project staat er nog."""
+
+
 class CreateProject:
-    important_marks = ["10CON1", "21C1", "21C2", "19C1", "17C1", "16C1", "8C1", "20C1", "20C2"]
+    graph_output_path = GRAPH_PATH
     json_output_path = Path(__file__).parent.parent / "test_results/connections.json"
+    export_connections_json = False  # connections.json alleen als export, het project gebruikt de graph
     testing_components_output_path = Path(__file__).parent.parent / "test_results/testing_components_answers.json"
     testing_components_results = Path(__file__).parent.parent / "test_results/test_results.json"
+    fixture_output_path = FIXTURE_PATH
+    compiled_dir = Path(__file__).parent.parent / "test_results/compiled"
+    compiled_version = 2  # Ophogen als de inhoud van het gecompileerde project verandert
+    # Rij voor rij importeren zonder pandas, voor grote werkboeken op de Pi (zie workbook_stream)
+    streaming_import = False
+
+    def __init__(self, listeners=None, cancelled=None, profile: FixtureProfile | None = None):
+        # listeners(stage, index) bij het begin van elke fase; cancelled() wordt daar ook gecontroleerd
+        self.listeners = listeners or []
+        self.cancelled = cancelled
+        # Zonder profiel: het fixture profiel van het schema waar het werkboek bij hoort
+        self.profile = profile
+        self._profiles = {}
+
+    def profile_for(self, path_file: Path) -> FixtureProfile:
+        if self.profile is not None:
+            return self.profile
+        scheme = scheme_of(Path(path_file).name)
+        if scheme not in self._profiles:
+            self._profiles[scheme] = FixtureProfile.load(scheme)
+        return self._profiles[scheme]
+
+    def stage(self, name: str):
+        self.check_cancelled()
+        for listener in self.listeners:
+            listener(name, STAGES.index(name))
+
+    def check_cancelled(self):
+        if self.cancelled is not None and self.cancelled():
+            raise ProjectCancelled()
 
     def create(self, path_file: Path):
-        path_file = Path(__file__).parent.parent / f"electrical_schemes/{path_file}"
+        path_file = SCHEMES_DIR / path_file
         if not path_file.exists():
             logger.error(f"File not found: {path_file}")
             return
         
         logger.debug("File found")
         try:
-            # Controleer alle werkbladnamen
-            excel_file = pd.ExcelFile(path_file)
-            sheet_name = None
-            
-            # Controleer op de mogelijke namen
-            if 'Cable list' in excel_file.sheet_names:
-                sheet_name = 'Cable list'
-            elif 'Cable list ' in excel_file.sheet_names:
-                sheet_name = 'Cable list '
-            else:
-                logger.debug("No valid sheet name found")
-                return None
-
-            # Lees het juiste werkblad en gebruik de eerste rij als kolomnamen
-            df = pd.read_excel(path_file, sheet_name=sheet_name, header=None)
-            cabinet_name = self.get_cabinet_name(df)
-            df = pd.read_excel(path_file, sheet_name=sheet_name, header=1)
-            
-            organized_connections = self.organize_connections(df)
-            self.save_connections_to_json(organized_connections, self.json_output_path)
-            self.save_connections_to_json(self.filter_important_connections(organized_connections, self.important_marks), self.testing_components_output_path)
+            # Een ongewijzigd werkboek hoeft niet opnieuw geparsed te worden
+            self.stage("read")
+            profile = self.profile_for(path_file)
+            compiled = self.load_compiled(path_file)
+            if compiled is None:
+                compiled = self.compile(path_file)
+                if compiled is None:
+                    return None
+
+            # Na deze controle wordt er niet meer afgebroken: de bestanden horen bij elkaar
+            self.stage("write")
+            PinTable.compile(profile, compiled["answers"]).save(self.fixture_output_path)
+            self.save_graph(compiled["graph"], self.graph_output_path)
+            if self.export_connections_json:
+                WiringGraph.from_buffer(compiled["graph"]).export_json(self.json_output_path)
+            self.save_connections_to_json(compiled["answers"], self.testing_components_output_path)
             
             # Maak het lege test_results.json bestand met de schakelkast naam
-            self.create_empty_test_results(self.testing_components_results, cabinet_name)
+            self.create_empty_test_results(self.testing_components_results, compiled["cabinet_name"], profile.marks)
+            return True
 
+        except ProjectCancelled:
+            raise
         except Exception as e:
-            print(f"An error occurred: {e}")
+            logger.error(f"An error occurred: {e}")
+            return None
+
+    def compile(self, path_file: Path):
+        """Parseert het werkboek en slaat het resultaat op als gecompileerd project."""
+        if self.streaming_import:
+            return self.compile_streaming(path_file)
+
+        # pandas (en via read_excel openpyxl) pas laden als er echt een werkboek geparsed wordt;
+        # een project uit de cache heeft ze niet nodig
+        import pandas as pd
+
+        # Controleer alle werkbladnamen
+        excel_file = pd.ExcelFile(path_file)
+        sheet_name = None
+        
+        # Controleer op de mogelijke namen
+        if 'Cable list' in excel_file.sheet_names:
+            sheet_name = 'Cable list'
+        elif 'Cable list ' in excel_file.sheet_names:
+            sheet_name = 'Cable list '
+        else:
+            logger.debug("No valid sheet name found")
+            return None
+
+        # Lees het werkblad één keer: de eerste rij bevat de kastnaam, de tweede de kolomnamen
+        raw = pd.read_excel(excel_file, sheet_name=sheet_name, header=None)
+        cabinet_name = self.get_cabinet_name(raw)
+        df = raw.iloc[2:].reset_index(drop=True)
+        df.columns = raw.iloc[1]
+        df = df.infer_objects()
+
+        self.stage("organize")
+        organized_connections = self.organize_connections(df)
+        graph = WiringGraph.build(organized_connections).to_bytes()
+        self.stage("filter")
+        compiled = {
+            "cabinet_name": cabinet_name,
+            "graph": graph,
+            "answers": self.filter_important_connections(organized_connections, self.profile_for(path_file).marks),
+        }
+        self.save_compiled(path_file, compiled)
+        return compiled
+
+    def compile_streaming(self, path_file: Path):
+        """Als compile, maar het werkblad gaat rij voor rij via een generator direct de graph in."""
+        from workbook_stream import read_rows, connection_edges
+
+        sheet_name, rows = read_rows(path_file)
+        if rows is None:
+            logger.debug("No valid sheet name found")
             return None
 
+        # Lezen en ordenen gaan hier samen, rij voor rij
+        self.stage("organize")
+        cabinet_name, edges = connection_edges(rows)
+        builder = GraphBuilder()
+        marks = self.profile_for(path_file).marks
+        important_marks = set(marks)
+        answers = {}
+        for count, (mark, edge) in enumerate(edges):
+            if count % 1000 == 0:
+                self.check_cancelled()
+            builder.add(mark, edge)
+            if mark in important_marks:
+                answers.setdefault(mark, []).append(edge)
+
+        self.stage("filter")
+        compiled = {
+            "cabinet_name": cabinet_name,
+            "graph": builder.build().to_bytes(),
+            "answers": {mark: answers[mark] for mark in marks if mark in answers},
+        }
+        self.save_compiled(path_file, compiled)
+        return compiled
+
+    def compiled_path(self, path_file: Path) -> Path:
+        """Pad van het gecompileerde project, op basis van de inhoud van het werkboek en de marks."""
+        digest = hashlib.sha256()
+        digest.update(path_file.read_bytes())
+        digest.update(json.dumps([self.compiled_version, self.profile_for(path_file).marks, self.streaming_import]).encode())
+        return self.compiled_dir / f"{path_file.stem}.{digest.hexdigest()[:16]}.pickle"
+
+    def load_compiled(self, path_file: Path):
+        compiled_path = self.compiled_path(path_file)
+        if not compiled_path.exists():
+            return None
+        try:
+            with open(compiled_path, 'rb') as file:
+                compiled = pickle.load(file)
+            logger.debug(f"Compiled project loaded from {compiled_path}")
+            return compiled
+        except Exception as e:
+            logger.warning(f"Compiled project unreadable, rebuilding: {e}")
+            return None
+
+    def save_compiled(self, path_file: Path, compiled: dict):
+        compiled_path = self.compiled_path(path_file)
+        try:
+            self.compiled_dir.mkdir(parents=True, exist_ok=True)
+            # Oude versies van hetzelfde werkboek opruimen
+            for old in self.compiled_dir.glob(f"{path_file.stem}.*.pickle"):
+                old.unlink()
+            # Eigen tmp bestand per proces: de precompile workers schrijven dezelfde cache
+            tmp_path = compiled_path.with_suffix(f".{os.getpid()}.tmp")
+            with open(tmp_path, 'wb') as file:
+                pickle.dump(compiled, file, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, compiled_path)
+        except Exception as e:
+            logger.warning(f"Failed to save compiled project: {e}")
+
     def get_cabinet_name(self, df):
+        import pandas as pd
+
         # Zoek de schakelkastnaam in de eerste rij
         return df.iloc[0, 1] if not pd.isna(df.iloc[0, 1]) else "Unknown Cabinet"
 
     def organize_connections(self, df):
+        import pandas as pd
+
         if df is None or df.empty:
-            print("No data to display.")
+            logger.warning("No data to display.")
             return
         
-        organized_connections = {}
-        
-        for index, row in df.iterrows():
-            from_mark = row['from Mark']
-            to_mark = row['to mark']
-            connection_from = {
-                "from_terminal": row['From terminal'],
-                "to_part": row['to part'],
-                "to_mark": to_mark,
-                "to_terminal": row['to terminal']
-            }
-
-            connection_to = {
-                "from_terminal": row['to terminal'],
-                "to_part": row['From Part'],
-                "to_mark": from_mark,
-                "to_terminal": row['From terminal']
-            }
-            
-            if from_mark not in organized_connections:
-                organized_connections[from_mark] = []
-            
-            organized_connections[from_mark].append(connection_from)
+        # Elke kabel is een verbinding heen (from -> to) en terug (to -> from)
+        forward = pd.DataFrame({
+            "mark": df['from Mark'],
+            "from_terminal": df['From terminal'],
+            "to_part": df['to part'],
+            "to_mark": df['to mark'],
+            "to_terminal": df['to terminal'],
+        })
+        reverse = pd.DataFrame({
+            "mark": df['to mark'],
+            "from_terminal": df['to terminal'],
+            "to_part": df['From Part'],
+            "to_mark": df['from Mark'],
+            "to_terminal": df['From terminal'],
+        })
+        # Heen en terug om en om, zodat de volgorde per mark gelijk blijft aan rij voor rij
+        forward.index = forward.index * 2
+        reverse.index = reverse.index * 2 + 1
+        edges = pd.concat([forward, reverse]).astype(object).sort_index(kind="stable")
 
-            # Voeg de verbinding ook toe aan de to_mark als een from_mark
-            if to_mark not in organized_connections:
-                organized_connections[to_mark] = []
-            
-            organized_connections[to_mark].append(connection_to)
-        
-        return organized_connections
+        columns = ["from_terminal", "to_part", "to_mark", "to_terminal"]
+        records = [dict(zip(columns, values)) for values in zip(*(edges[column].tolist() for column in columns))]
+        groups = edges.groupby("mark", sort=False, dropna=False).indices
+        return {mark: [records[position] for position in positions] for mark, positions in groups.items()}
 
     def filter_important_connections(self, connections, important_marks):
         filtered_connections = {mark: connections[mark] for mark in important_marks if mark in connections}
         return filtered_connections
 
+    def save_graph(self, graph: bytes, graph_path):
+        tmp_path = Path(graph_path).with_suffix(".tmp")
+        with open(tmp_path, 'wb') as file:
+            file.write(graph)
+        os.replace(tmp_path, graph_path)
+        logger.info(f"Connections saved to {graph_path}")
+
     def save_connections_to_json(self, connections, json_path):
         try:
             # Verwijder het bestaande JSON-bestand als het bestaat
@@ -104,15 +257,15 @@ class CreateProject:
             
             with open(json_path, 'w') as json_file:
                 json.dump(connections, json_file, indent=4)
-            print(f"Connections saved to {json_path}")
+            logger.info(f"Connections saved to {json_path}")
         except Exception as e:
-            print(f"Failed to save connections to JSON: {e}")
+            logger.error(f"Failed to save connections to JSON: {e}")
 
-    def create_empty_test_results(self, json_path, cabinet_name):
+    def create_empty_test_results(self, json_path, cabinet_name, important_marks):
         # Maak een dictionary met de schakelkastnaam en lege arrays voor elke belangrijke markering
         empty_results = {
             "cabinet_name": cabinet_name,
-            "test_results": {mark: [] for mark in self.important_marks}
+            "test_results": {mark: [] for mark in important_marks}
         }
 
         try:
@@ -123,9 +276,12 @@ class CreateProject:
             # Schrijf de lege testresultaten naar het JSON-bestand
             with open(json_path, 'w') as json_file:
                 json.dump(empty_results, json_file, indent=4)
-            print(f"Empty test results file created at {json_path}")
+
+            # Resultaten in de journal horen bij het vorige project
+            ResultJournal(json_path).clear()
+            logger.info(f"Empty test results file created at {json_path}")
         except Exception as e:
-            print(f"Failed to create empty test results JSON: {e}")
+            logger.error(f"Failed to create empty test results JSON: {e}")
 
 if __name__ == "__main__":
     # Geef het juiste pad naar het geüploade bestand
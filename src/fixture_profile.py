@@ -0,0 +1,248 @@
+"""
+Fixture profielen: hoe de tester per schema op de kast aangesloten wordt.
+
+Een profiel bepaalt welke marks getest worden, welke connector pin op welke
+MCP pin zit, waar de probe zit, op welke GPIO pinnen de INT lijnen van de
+expanders zitten, de stations (harnassen die tegelijk getest worden) en de
+wachttijden zonder kalibratie. Het standaard profiel staat in
+fixtures/default.json; fixtures/<schema>.json overschrijft daar velden van
+(alleen de velden die erin staan). Zonder "connectors" wordt de pin map uit
+"io_list" gelezen (een bestand in src/ in het formaat van IOLIST.json).
+
+Bij het aanmaken van een project wordt het profiel met de antwoorden samen
+gecompileerd tot een PinTable (test_results/fixture.json). Het run pad leest
+alleen nog die tabel: de terminals staan per test al in probe volgorde met
+hun MCP pin erbij, en een MCP pin vinden is een index in een lijst.
+"""
+import json
+import logging
+import math
+import os
+import re
+from pathlib import Path
+
+from pydantic import BaseModel, Field, field_validator, model_validator
+
+from calibration import DEFAULT_SETTLE
+from utils import normalize_terminal
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+PROFILES_DIR = Path(__file__).parent / "fixtures"
+DEFAULT_PROFILE = "default"
+FIXTURE_PATH = Path(__file__).parent.parent / "test_results/fixture.json"
+PINS_PER_EXPANDER = 16  # MCP23017: GPA0-7 en GPB0-7
+
+
+class ConnectorPin(BaseModel):
+    """Eén regel uit de pin map, met dezelfde namen als IOLIST.json."""
+    Conector_pin: str | int | float
+    mcp_adress: int = Field(ge=0, le=127)  # 7 bit I2C adres; "27" uit IOLIST.json wordt 27
+    mcp_pin: int = Field(ge=0, lt=PINS_PER_EXPANDER)
+
+
+class Station(BaseModel):
+    """
+    Een test station: de connectoren van één harness. run_stations test de
+    stations tegelijk met de matrix test, die geen probe gebruikt.
+    """
+    connectors: list[str]
+    name: str = ""
+
+    @property
+    def owner(self) -> str:
+        return self.name or "+".join(self.connectors)
+
+
+class FixtureProfile(BaseModel):
+    scheme: str = DEFAULT_PROFILE
+    marks: list[str]
+    io_list: str = "IOLIST.json"
+    connectors: dict[str, list[ConnectorPin]] = {}
+    probe: tuple[int, int] = (26, 0)
+    # Expander adres -> GPIO pin (BCM) van zijn INT lijn; zonder lijn voor de probe wordt er gepold
+    interrupt_pins: dict[int, int] = {}
+    stations: list[Station] = []
+    settle: float = Field(DEFAULT_SETTLE, gt=0)  # Wachttijd bij het zoeken zonder kalibratie
+    matrix_settle: float = Field(0.01, gt=0)  # Wachttijd per stap van de matrix test zonder kalibratie
+
+    @field_validator("marks")
+    @classmethod
+    def unique_marks(cls, marks):
+        if not marks:
+            raise ValueError("a profile needs at least one mark")
+        duplicates = sorted({mark for mark in marks if marks.count(mark) > 1})
+        if duplicates:
+            raise ValueError(f"duplicate mark(s): {', '.join(duplicates)}")
+        return marks
+
+    @field_validator("interrupt_pins")
+    @classmethod
+    def valid_interrupt_pins(cls, interrupt_pins):
+        for address, gpio in interrupt_pins.items():
+            if not 0 <= address <= 127:
+                raise ValueError(f"interrupt pin for invalid MCP address {address}")
+            if gpio < 0:
+                raise ValueError(f"invalid GPIO pin {gpio} for MCP {address}")
+        return interrupt_pins
+
+    @field_validator("connectors")
+    @classmethod
+    def without_probe_rows(cls, connectors):
+        # De probe staat in IOLIST.json als pin zonder connector pin ("NaN"); die komt uit `probe`
+        return {
+            connector: [pin for pin in pins if normalize_terminal(pin.Conector_pin) not in ("", "NaN")]
+            for connector, pins in connectors.items()
+        }
+
+    @model_validator(mode="after")
+    def one_pin_per_terminal(self):
+        used = {}
+        terminals = set()
+        for connector, pins in self.connectors.items():
+            for pin in pins:
+                address = (pin.mcp_adress, pin.mcp_pin)
+                terminal = (connector, normalize_terminal(pin.Conector_pin))
+                if address == tuple(self.probe):
+                    raise ValueError(f"{connector} pin {pin.Conector_pin} is on the probe input {address}")
+                if address in used:
+                    raise ValueError(f"MCP {address} is used by {used[address]} and {terminal}")
+                if terminal in terminals:
+                    raise ValueError(f"{connector} pin {pin.Conector_pin} is mapped twice")
+                used[address] = terminal
+                terminals.add(terminal)
+        stations = {}
+        for station in self.stations:
+            for connector in station.connectors:
+                if connector not in self.marks:
+                    raise ValueError(f"station {station.owner}: {connector} is not a mark of this profile")
+                if connector in stations:
+                    raise ValueError(f"{connector} is in station {stations[connector]} and {station.owner}")
+                stations[connector] = station.owner
+        unmapped = [mark for mark in self.marks if not self.connectors.get(mark)]
+        if unmapped:
+            logger.warning(f"Profiel {self.scheme}: geen MCP pinnen voor {', '.join(unmapped)}")
+        return self
+
+    @classmethod
+    def load(cls, scheme: str | None = None, directory: Path = PROFILES_DIR) -> "FixtureProfile":
+        """Het standaard profiel, aangevuld met dat van `scheme` als dat er is."""
+        with open(directory / f"{DEFAULT_PROFILE}.json", "r") as file:
+            data = json.load(file)
+        scheme_path = directory / f"{scheme}.json"
+        if scheme and scheme != DEFAULT_PROFILE and scheme_path.exists():
+            with open(scheme_path, "r") as file:
+                data.update(json.load(file))
+        if scheme:
+            data["scheme"] = scheme
+        if "connectors" not in data:
+            with open(Path(__file__).parent / data.get("io_list", "IOLIST.json"), "r") as file:
+                data["connectors"] = json.load(file)
+        return cls.model_validate(data)
+
+    def io(self) -> dict:
+        """De pin map in het formaat van IOLIST.json, met gehele adressen."""
+        return {connector: [pin.model_dump() for pin in pins] for connector, pins in self.connectors.items()}
+
+
+def _missing(value) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def terminal_order(terminal: str):
+    """Natuurlijke volgorde: '2' voor '10', 'A1' voor 'A2'."""
+    return [(0, int(part), "") if part.isdigit() else (1, 0, part) for part in re.split(r"(\d+)", terminal) if part]
+
+
+class PinTable:
+    """
+    Het gecompileerde profiel van één project.
+
+    `terminals[test]` zijn rijen (terminal, adres, pin, to_part, to_mark,
+    to_terminal) in de volgorde waarin de operator de probe plaatst:
+    gegroepeerd per to_mark (in schema volgorde), binnen een mark op
+    terminal nummer. Rijen die niet te testen zijn (geen MCP pin of geen
+    bestemming) hebben adres en pin None en staan achteraan.
+
+    `slots[adres * 16 + pin]` is (connector, Conector_pin, bestemming) of
+    None; de bestemming is (to_part, to_mark, to_terminal) of None.
+    """
+
+    def __init__(self, scheme: str, probe, settle: float, matrix_settle: float, io: dict, slots: list, terminals: dict):
+        self.scheme = scheme
+        self.probe = tuple(probe)
+        self.settle = settle
+        self.matrix_settle = matrix_settle
+        self.io = io
+        self.slots = slots
+        self.terminals = terminals
+
+    @classmethod
+    def compile(cls, profile: FixtureProfile, answers: dict) -> "PinTable":
+        pins = {}
+        expanders = max((pin.mcp_adress + 1 for connector_pins in profile.connectors.values() for pin in connector_pins), default=0)
+        slots = [None] * (expanders * PINS_PER_EXPANDER)
+        for connector, connector_pins in profile.connectors.items():
+            for pin in connector_pins:
+                pins[(connector, normalize_terminal(pin.Conector_pin))] = (pin.mcp_adress, pin.mcp_pin)
+                slots[pin.mcp_adress * PINS_PER_EXPANDER + pin.mcp_pin] = [connector, pin.Conector_pin, None]
+
+        terminals = {}
+        for test, test_terminals in answers.items():
+            groups, untestable = {}, []
+            for terminal in test_terminals:
+                from_terminal = normalize_terminal(terminal.get("from_terminal"))
+                address = pins.get((test, from_terminal))
+                to_part, to_mark, to_terminal = terminal.get("to_part"), terminal.get("to_mark"), terminal.get("to_terminal")
+                if address is not None:
+                    slot = slots[address[0] * PINS_PER_EXPANDER + address[1]]
+                    if slot[2] is None:  # De eerste regel van een terminal is de verwachte bestemming
+                        slot[2] = [to_part, to_mark, to_terminal]
+                if address is None or _missing(to_mark) or _missing(to_part):
+                    untestable.append([from_terminal, None, None, to_part, to_mark, to_terminal])
+                    continue
+                groups.setdefault(to_mark, []).append([from_terminal, *address, str(to_part), str(to_mark), to_terminal])
+            terminals[test] = [
+                row for rows in groups.values()
+                for row in sorted(rows, key=lambda row: terminal_order(normalize_terminal(row[5])))
+            ] + untestable
+
+        return cls(profile.scheme, profile.probe, profile.settle, profile.matrix_settle, profile.io(), slots, terminals)
+
+    def slot(self, mcp_address: int, mcp_pin: int):
+        position = mcp_address * PINS_PER_EXPANDER + mcp_pin
+        if 0 <= mcp_pin < PINS_PER_EXPANDER and 0 <= position < len(self.slots):
+            return self.slots[position]
+        return None
+
+    def save(self, path: Path = FIXTURE_PATH):
+        tmp_path = Path(path).with_suffix(".tmp")
+        with open(tmp_path, "w") as file:
+            json.dump({
+                "scheme": self.scheme,
+                "probe": list(self.probe),
+                "settle": self.settle,
+                "matrix_settle": self.matrix_settle,
+                "io": self.io,
+                "slots": self.slots,
+                "terminals": self.terminals,
+            }, file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path = FIXTURE_PATH) -> "PinTable":
+        with open(path, "r") as file:
+            return cls(**json.load(file))
+
+
+def load_io(path: Path) -> tuple[dict, tuple]:
+    """
+    De pin map en de probe uit een gecompileerde fixture.json, of uit een
+    IOLIST.json met de probe van het standaard profiel.
+    """
+    with open(path, "r") as file:
+        data = json.load(file)
+    if "slots" in data and "io" in data:
+        return data["io"], tuple(data["probe"])
+    return data, tuple(FixtureProfile.load().probe)
@@ -0,0 +1,109 @@
+import logging
+import time
+
+from hardware_worker import AsyncPortBank, HardwareWorker
+from io_backend import IOBackend
+from mcp_port import PortBank
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+
+class HardwareSession:
+    """
+    Eén I2C bus en één set expanders voor de hele app.
+
+    De bus wordt bij de eerste test geopend en blijft daarna open; de
+    schaduwregisters van de PortBank blijven dus ook geldig tussen runs en
+    een connector test kan meteen beginnen. Na een fout op de bus wordt bij
+    de volgende test opnieuw geopend (re-probe). Na `health_interval`
+    seconden zonder test wordt eerst met één read per expander gecontroleerd
+    of de bus nog werkt. `close` laat alle pinnen los en geeft de bus vrij.
+    """
+
+    def __init__(self, backend: IOBackend, hardware_thread: bool = True, health_interval: float = 30.0):
+        self.backend = backend
+        self.hardware_thread = hardware_thread
+        self.health_interval = health_interval
+        self.ports = None
+        self.error = None  # De laatste busfout; de volgende acquire opent opnieuw
+        self.opened = 0
+        self.last_used = 0.0
+
+    async def acquire(self, probe: tuple = (26, 0), inputs=()) -> AsyncPortBank:
+        """De PortBank voor een test, met `probe` en `inputs` als input pinnen."""
+        if self.ports is not None and self.error is None and time.monotonic() - self.last_used > self.health_interval:
+            await self.health()
+        if self.ports is None or self.error is not None:
+            await self.reopen()
+
+        await self.ports.call(self.ports.bank.configure, probe, inputs)
+        self.last_used = time.monotonic()
+        return self.ports
+
+    async def reopen(self):
+        if self.ports is not None:
+            logger.warning(f"I2C bus opnieuw openen na fout: {self.error}")
+            await self.close()
+
+        worker = None
+        if self.hardware_thread:
+            worker = HardwareWorker()
+            worker.start()
+        ports = AsyncPortBank(worker, on_error=self._on_error)
+        try:
+            mcps = await ports.call(self.backend.open)
+            ports.bank = await ports.call(PortBank, mcps)
+        except Exception:
+            ports.close()
+            self.backend.close()
+            raise
+        self.ports = ports
+        self.error = None
+        self.opened += 1
+        logger.debug(f"I2C bus geopend ({self.opened}e keer), {len(mcps)} expanders")
+
+    async def health(self) -> dict:
+        """Leest alle expanders één keer; bij een fout wordt de bus bij de volgende acquire opnieuw geopend."""
+        if self.ports is None:
+            return {"ok": False, "error": "not open"}
+        start = time.perf_counter()
+        try:
+            await self.ports.read_all()
+        except Exception as error:
+            return {"ok": False, "error": str(error)}
+        finally:
+            self.last_used = time.monotonic()
+        return {"ok": True, "latency_ms": round((time.perf_counter() - start) * 1000, 2)}
+
+    async def release(self):
+        """Na een test: alle pinnen terug op input, de bus blijft open."""
+        if self.ports is None:
+            return
+        if self.error is None:
+            await self.ports.release()
+            self.last_used = time.monotonic()
+            return
+        # Na een busfout toch proberen alles los te laten, anders blijven pinnen hoog tot de volgende test
+        try:
+            await self.ports.release(force=True)
+        except Exception as error:
+            logger.warning(f"Pinnen loslaten na busfout mislukt: {error}")
+
+    async def close(self):
+        if self.ports is None:
+            return
+        ports, self.ports = self.ports, None
+        try:
+            await ports.release(force=self.error is not None)
+        except Exception as error:
+            logger.warning(f"Pinnen loslaten bij afsluiten mislukt: {error}")
+        finally:
+            ports.close()
+            self.backend.close()
+            logger.debug("I2C bus gesloten")
+
+    def _on_error(self, error: Exception):
+        if self.error is None:
+            logger.error(f"Fout op de I2C bus: {error}")
+        self.error = error
@@ -0,0 +1,222 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+
+from mcp_port import PortBank
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+
+class HardwareWorker:
+    """
+    Eén thread die de I2C bus bezit.
+
+    De blokkerende Adafruit calls lopen hier in plaats van in de Textual
+    event loop. Commando's gaan via een queue naar de thread en het antwoord
+    komt terug als asyncio future; `batch` voert meerdere commando's uit in
+    één rondgang.
+    """
+
+    def __init__(self, name: str = "hardware"):
+        self.name = name
+        self.commands = queue.Queue()
+        self.thread = None
+        self.busy = 0.0  # Seconden dat de thread met de bus bezig was
+        self.commands_done = 0
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        if self.thread is not None:
+            self.commands.put(None)
+            self.thread.join()
+            self.thread = None
+
+    async def call(self, function, *args):
+        results = await self.batch([(function, *args)])
+        return results[0]
+
+    async def batch(self, calls: list) -> list:
+        """Voert [(functie, *args), ...] achter elkaar uit op de hardware thread."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self.commands.put((calls, loop, future))
+        return await future
+
+    def _run(self):
+        while True:
+            command = self.commands.get()
+            if command is None:
+                return
+            calls, loop, future = command
+            start = time.perf_counter()
+            try:
+                results = [function(*args) for function, *args in calls]
+            except Exception as error:
+                loop.call_soon_threadsafe(_set_exception, future, error)
+            else:
+                loop.call_soon_threadsafe(_set_result, future, results)
+            self.busy += time.perf_counter() - start
+            self.commands_done += len(calls)
+
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+
+
+def _set_exception(future, error):
+    if not future.done():
+        future.set_exception(error)
+
+
+class AsyncPortBank:
+    """
+    Async versie van PortBank.
+
+    Met een HardwareWorker gaat elke bus operatie naar de hardware thread;
+    zonder worker wordt hij direct in de event loop uitgevoerd (het oude
+    gedrag, handig om het verschil te meten).
+    """
+
+    def __init__(self, worker: HardwareWorker | None = None, on_error=None):
+        self.worker = worker
+        self.bank = None
+        self.busy = 0.0  # Alleen zonder worker: tijd dat de event loop op de bus wachtte
+        self.on_error = on_error  # Wordt aangeroepen bij elke fout op de bus, bv. HardwareSession
+
+    @classmethod
+    async def open(cls, backend, probe: tuple = (26, 0), inputs=(), worker: HardwareWorker | None = None):
+        ports = cls(worker)
+        mcps = await ports.call(backend.open)
+        ports.bank = await ports.call(PortBank, mcps, probe, inputs)
+        return ports
+
+    def close(self):
+        if self.worker is not None:
+            self.worker.stop()
+
+    async def call(self, function, *args):
+        results = await self.batch([(function, *args)])
+        return results[0]
+
+    async def batch(self, calls: list) -> list:
+        try:
+            if self.worker is not None:
+                return await self.worker.batch(calls)
+            start = time.perf_counter()
+            try:
+                return [function(*args) for function, *args in calls]
+            finally:
+                self.busy += time.perf_counter() - start
+        except Exception as error:
+            if self.on_error is not None:
+                self.on_error(error)
+            raise
+
+    @property
+    def probe(self) -> tuple:
+        return self.bank.probe
+
+    @property
+    def inputs(self) -> set:
+        return self.bank.inputs
+
+    @property
+    def ports(self) -> dict:
+        return self.bank.ports
+
+    def pins(self) -> list:
+        return self.bank.pins()
+
+    def counters(self) -> dict:
+        return self.bank.counters()
+
+    async def drive(self, address: int, pin: int):
+        await self.call(self.bank.drive, address, pin)
+
+    async def drive_pins(self, pins):
+        await self.call(self.bank.drive_pins, pins)
+
+    async def drive_mask(self, masks: dict):
+        await self.call(self.bank.drive_mask, masks)
+
+    async def release(self, force: bool = False):
+        await self.call(self.bank.release, force)
+
+    async def read(self, address: int) -> int:
+        return await self.call(self.bank.read, address)
+
+    async def read_all(self) -> dict:
+        """Leest alle expanders in één rondgang naar de hardware thread."""
+        values = await self.batch([(self.bank.read, address) for address in self.bank.ports])
+        return dict(zip(self.bank.ports, values))
+
+    async def probe_active(self) -> bool:
+        return await self.call(self.bank.probe_active)
+
+    def stats(self, since: dict | None = None) -> dict:
+        """Bus doorvoer: transacties per seconde bustijd; met `since` alleen sinds die eerdere stats."""
+        busy = self.worker.busy if self.worker is not None else self.busy
+        stats = {**self.counters(), "bus_seconds": busy}
+        if since is not None:
+            stats = {key: value - since[key] for key, value in stats.items()}
+        transactions = stats["reads"] + stats["writes"]
+        return {
+            **stats,
+            "bus_seconds": round(stats["bus_seconds"], 4),
+            "transactions_per_second": round(transactions / stats["bus_seconds"]) if stats["bus_seconds"] else 0,
+        }
+
+
+class LoopLagMonitor:
+    """
+    Meet hoe lang de event loop geblokkeerd is.
+
+    Een taak slaapt steeds `interval` en kijkt hoeveel later hij wakker
+    wordt dan gevraagd. In de Textual app is dat de extra vertraging van
+    elke frame, de Prompt timer en toetsaanslagen.
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples = []
+        self.task = None
+
+    def start(self):
+        self.samples = []
+        self.task = asyncio.create_task(self._run())
+
+    async def stop(self) -> dict:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        return self.stats()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, loop.time() - start - self.interval))
+
+    def stats(self) -> dict:
+        if not self.samples:
+            return {"samples": 0}
+        samples = sorted(self.samples)
+        return {
+            "samples": len(samples),
+            "lag_mean_ms": round(sum(samples) / len(samples) * 1000, 2),
+            "lag_p99_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.99))] * 1000, 2),
+            "lag_max_ms": round(samples[-1] * 1000, 2),
+        }
@@ -0,0 +1,178 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+from pathlib import Path
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+# Adressen van de expanders op de tester (26 = 0x26, ...), in de volgorde waarin ze gescand worden
+MCP_ADDRESSES = (26, 25, 24, 23, 22, 21, 27)
+
+
+class IOBackend(ABC):
+    """
+    Basis voor de I/O backends van de tester.
+
+    `open` geeft per adres een object met de MCP23017 `iodir` en `gpio`
+    registers terug, zodat `mcp_port.PortBank` er niet om geeft of er echte
+    hardware, de simulator of een opgenomen trace achter zit.
+    """
+
+    addresses = MCP_ADDRESSES
+
+    @abstractmethod
+    def open(self) -> dict:
+        """Per MCP adres een object met `iodir` en `gpio`."""
+
+    def close(self):
+        pass
+
+    def place_probe(self, mark, terminal):
+        """Wordt aangeroepen als de operator de probe op een terminal moet zetten."""
+
+    def interrupt_line(self, address: int):
+        """De INT lijn van een expander, of None als die niet is aangesloten."""
+        return None
+
+
+class HardwareBackend(IOBackend):
+    """
+    De echte MCP23017 expanders op de I2C bus van de Raspberry Pi.
+
+    `interrupt_pins` koppelt een expander adres aan de GPIO pin (BCM) waar
+    zijn INTA/INTB lijn op zit, bijvoorbeeld {26: 17} voor de probe.
+    """
+
+    def __init__(self, interrupt_pins: dict | None = None):
+        self.i2c = None
+        self.interrupt_pins = interrupt_pins or {}
+
+    def open(self) -> dict:
+        # Hardware libraries pas laden als er echt getest wordt
+        import board
+        import busio
+        import adafruit_mcp230xx.mcp23017 as MCP
+
+        self.i2c = busio.I2C(board.SCL, board.SDA)
+        return {address: MCP.MCP23017(self.i2c, address=int(str(address), 16)) for address in self.addresses}
+
+    def close(self):
+        if self.i2c is not None:
+            self.i2c.deinit()
+            self.i2c = None
+
+    def interrupt_line(self, address: int):
+        if address not in self.interrupt_pins:
+            return None
+        from probe import GPIOInterruptLine
+
+        return GPIOInterruptLine(self.interrupt_pins[address])
+
+
+class RecordingMCP:
+    """Geeft registertoegang door aan een echte expander en schrijft elke stap naar een trace."""
+
+    def __init__(self, mcp, address: int, trace):
+        self._mcp = mcp
+        self._address = address
+        self._trace = trace
+
+    def _record(self, op: str, value: int):
+        self._trace.write(json.dumps({"address": self._address, "op": op, "value": value}) + "\n")
+
+    @property
+    def gpio(self) -> int:
+        value = self._mcp.gpio
+        self._record("read", value)
+        return value
+
+    @gpio.setter
+    def gpio(self, value: int):
+        self._mcp.gpio = value
+        self._record("gpio", value)
+
+    @property
+    def iodir(self) -> int:
+        return self._mcp.iodir
+
+    @iodir.setter
+    def iodir(self, value: int):
+        self._mcp.iodir = value
+        self._record("iodir", value)
+
+
+class RecordingBackend(IOBackend):
+    """Neemt alle registertoegang van een andere backend op als JSON lines."""
+
+    def __init__(self, backend: IOBackend, trace_path: Path):
+        self.backend = backend
+        self.trace_path = Path(trace_path)
+        self.trace = None
+
+    def open(self) -> dict:
+        self.trace = open(self.trace_path, "w")
+        return {address: RecordingMCP(mcp, address, self.trace) for address, mcp in self.backend.open().items()}
+
+    def close(self):
+        self.backend.close()
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+
+    def place_probe(self, mark, terminal):
+        self.backend.place_probe(mark, terminal)
+
+    def interrupt_line(self, address: int):
+        # Interrupts staan niet in de trace; opnemen en terugspelen gaat via pollen
+        return None
+
+
+class ReplayMCP:
+    """Speelt de opgenomen reads van één expander terug; writes worden alleen gecontroleerd."""
+
+    def __init__(self, address: int, steps: list):
+        self.address = address
+        self._steps = steps
+        self._iodir = 0xFFFF
+
+    def _next(self, op: str, value: int | None = None) -> int:
+        if not self._steps:
+            raise RuntimeError(f"Trace voor MCP {self.address} is op, verwachtte nog '{op}'")
+        step = self._steps.pop(0)
+        if step["op"] != op or (value is not None and step["value"] != value):
+            logger.warning(f"Trace wijkt af op MCP {self.address}: verwacht {step}, kreeg {op}={value}")
+        return step["value"]
+
+    @property
+    def gpio(self) -> int:
+        return self._next("read")
+
+    @gpio.setter
+    def gpio(self, value: int):
+        self._next("gpio", value)
+
+    @property
+    def iodir(self) -> int:
+        return self._iodir
+
+    @iodir.setter
+    def iodir(self, value: int):
+        self._next("iodir", value)
+        self._iodir = value
+
+
+class ReplayBackend(IOBackend):
+    """Voert een met `RecordingBackend` opgenomen trace opnieuw uit, zonder hardware."""
+
+    def __init__(self, trace_path: Path):
+        self.trace_path = Path(trace_path)
+
+    def open(self) -> dict:
+        steps = {address: [] for address in self.addresses}
+        with open(self.trace_path, "r") as file:
+            for line in file:
+                if line.strip():
+                    step = json.loads(line)
+                    steps.setdefault(step["address"], []).append(step)
+        return {address: ReplayMCP(address, address_steps) for address, address_steps in steps.items()}
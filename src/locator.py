@@ -0,0 +1,101 @@
+import asyncio
+import logging
+
+from hardware_worker import AsyncPortBank
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+
+def settle_for(settle, pins) -> float:
+    """`settle` is een vaste tijd of per expander adres een tijd (zie Calibration.settle_times)."""
+    if isinstance(settle, dict):
+        return max(settle[address] for address in {address for address, _ in pins})
+    return settle
+
+
+async def confirmed_probe(ports: AsyncPortBank, settle: float, attempts: int = 3) -> bool:
+    """
+    Leest de probe tot twee reads na elkaar hetzelfde geven.
+
+    Met gekalibreerde (korte) wachttijden vangt dit een lijn op die nog niet
+    helemaal stabiel is: bij verschil wordt nog een settle tijd gewacht.
+    """
+    previous = await ports.probe_active()
+    for _ in range(attempts):
+        current = await ports.probe_active()
+        if current == previous:
+            return current
+        logger.debug("Probe nog niet stabiel, opnieuw lezen")
+        await asyncio.sleep(settle)
+        previous = current
+    return previous
+
+
+def count_step(stats: dict | None):
+    if stats is not None:
+        stats["steps"] = stats.get("steps", 0) + 1
+
+
+async def locate_bisect(ports: AsyncPortBank, settle=0.1, stats: dict | None = None):
+    """
+    Zoekt de pin die op de probe is aangesloten met group testing.
+
+    Eerst worden alle pinnen tegelijk hoog gestuurd; zit er niets op de probe
+    dan zijn we na één stap klaar. Anders wordt de groep steeds gehalveerd
+    (hele poorten eerst, want de lijst staat in scanvolgorde) en wordt de
+    linker helft eerst geprobeerd. Dat geeft dezelfde pin als de lineaire scan,
+    maar in ongeveer log2(111) + 1 = 8 stappen in plaats van 111. Elke stap is
+    één settle tijd plus de bevestiging van confirmed_probe: minstens twee
+    probe reads, dus ongeveer 16 reads per miswire. `stats["steps"]` telt de
+    stappen mee (zie benchmarks/bench_locator.py).
+    """
+    candidates = ports.pins()
+    steps = 0
+
+    async def probe(group) -> bool:
+        nonlocal steps
+        steps += 1
+        count_step(stats)
+        await ports.drive_pins(group)
+        delay = settle_for(settle, group)
+        await asyncio.sleep(delay)
+        return await confirmed_probe(ports, delay)
+
+    if not await probe(candidates):
+        await ports.release()
+        logger.debug(f"Geen verbonden component gevonden na {steps} stap(pen)")
+        return None, None
+
+    while len(candidates) > 1:
+        half = candidates[:len(candidates) // 2]
+        candidates = half if await probe(half) else candidates[len(half):]
+
+    await ports.release()
+    mcp_address, pin_number = candidates[0]
+    logger.debug(f"Verbonden component gevonden op MCP {mcp_address}, pin {pin_number} na {steps} stappen")
+    return mcp_address, pin_number
+
+
+async def locate_linear(ports: AsyncPortBank, settle=0.1, stats: dict | None = None):
+    """Fallback: elke pin één voor één hoog sturen, zoals de tester het altijd deed."""
+    for mcp_address, pin_number in ports.pins():
+        count_step(stats)
+        await ports.drive(mcp_address, pin_number)
+        delay = settle_for(settle, [(mcp_address, pin_number)])
+        await asyncio.sleep(delay)  # Kleine vertraging om het signaal te stabiliseren
+
+        if await confirmed_probe(ports, delay):
+            await ports.release()
+            logger.debug(f"Verbonden component gevonden op MCP {mcp_address}, pin {pin_number}")
+            return mcp_address, pin_number
+
+    await ports.release()
+    logger.debug("Geen andere verbonden componenten gevonden")
+    return None, None
+
+
+LOCATORS = {
+    "bisect": locate_bisect,
+    "linear": locate_linear,
+}
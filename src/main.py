@@ -1,7 +1,7 @@
 from textual.app import App, ComposeResult
 from textual.containers import Container, Horizontal, Vertical
-from textual.widgets import Input, Button, Footer, Header, Static, Label, Checkbox, Switch, ListItem, ListView, RichLog, TabbedContent, TabPane
-from textual import on, events
+from textual.widgets import Input, Button, Footer, Header, Static, Label, Checkbox, Switch, ListItem, ListView, RichLog, TabbedContent, TabPane, ProgressBar
+from textual import on, events, work
 from textual.message import Message
 from textual.reactive import reactive
 from textual.widget import Widget
@@ -10,13 +10,22 @@ import json
 from pathlib import Path
 from textual.reactive import Reactive
 import logging
+import threading
 from rich.logging import RichHandler
 from textual.logging import TextualHandler
 import atexit
 
 from Tester import TestScreen
 from test_tree import TestTree
-from create_test_project import CreateProject
+from create_test_project import CreateProject, ProjectCancelled, STAGES
+from metrics import RunMetrics, METRICS_DIR
+from schemes import testers
+from precompile import SchemeCompiler, CHECK_INTERVAL
+from hardware_session import HardwareSession
+from io_backend import HardwareBackend
+from fixture_profile import FixtureProfile
+from result_journal import ResultJournal
+from result_store import ResultStore, UNKNOWN_SERIAL
 
 from pop_up import HasPrompt
 
@@ -25,7 +34,30 @@ class LoggingConsole(RichLog):
     console: Widget
 
     def print(self, content):
-        self.write(content)
+        # Ook logging uit een worker thread (zoals de schema import) komt hier langs
+        if threading.current_thread() is threading.main_thread():
+            self.write(content)
+        else:
+            self.app.call_from_thread(self.write, content)
+
+class MetricsPanel(Static):
+    """Live overzicht van de lopende test: latency per terminal en I2C verkeer."""
+
+    def show(self, metrics: RunMetrics) -> None:
+        summary = metrics.summary()
+
+        def latency(name):
+            histogram = summary[name]
+            if not histogram["count"]:
+                return f"{name}: -"
+            return f"{name}: p50 {histogram['p50']:.2f}s p99 {histogram['p99']:.2f}s (n={histogram['count']})"
+
+        i2c = summary["i2c"]
+        self.update(
+            f"{summary['test'] or 'No test running'}  |  terminals: {summary['terminals']} ({summary['failed']} failed)  |  "
+            f"{latency('contact')}  |  {latency('locate')}  |  {latency('save')}  |  "
+            f"I2C: {i2c['reads']} reads, {i2c['writes']} writes, {i2c['bytes']} bytes"
+        )
 
 logger = logging.getLogger()
 rich_log_handler = RichHandler(
@@ -37,36 +69,46 @@ logger.addHandler(TextualHandler())
 logger.setLevel(logging.DEBUG)
 atexit.register(logger.removeHandler, rich_log_handler)
 
-testers = [
-    ("S25", "Cable & cabinet assembly list S25.xlsx"),
-    ("E25", "Cable & cabinet assembly list E25.xlsx"),
-    ("F25", "Cable & cabinet assembly list F25.xlsx"),
-    ("E40", "Cable & cabinet assembly list E40 S7-1500 PLC.xlsx"),
-    ("G40", "Cable & extruder assembly list G40.xlsx"),
-    ("E50", "Cable & cabinet assembly list E50.xlsx")
-]    
-
 class Options(Container):
     selected_scheme: Reactive[str] = reactive("S25")
 
-    def __init__(self, selected_scheme):
+    def __init__(self, selected_scheme, cabinet_serial=""):
         super().__init__()
         self.selected_scheme = selected_scheme
+        self.cabinet_serial = cabinet_serial
 
     def compose(self) -> ComposeResult:
         yield Label("Electric scheme choice: ")
         yield ListView(
             *[ListItem(Label(f"{tester[0]}  -  {tester[1]}"), id=tester[0]) for tester in testers],
             classes="keuze")
+        yield Input(value=self.cabinet_serial, placeholder="Cabinet serial number", id="serial")
         with Horizontal(id="horizontal_main"):
             yield Button("Change Scheme", id="Change_Scheme", disabled=True, variant="default")
+            yield Button("Cancel", id="cancel_project", disabled=True, variant="error")
             self.response_static = Static(f"Selected Scheme: {self.selected_scheme}", id="response")
             yield self.response_static
+        self.progress = ProgressBar(total=len(STAGES), show_eta=False, id="project_progress")
+        self.progress.display = False
+        yield self.progress
 
     def update_selected_scheme(self, new_scheme):
         self.selected_scheme = new_scheme
         self.response_static.update(f"Selected Scheme: {self.selected_scheme}")
 
+    def show_stage(self, scheme, stage, index):
+        self.progress.display = True
+        self.progress.update(progress=index)
+        self.response_static.update(f"Loading {scheme}: {stage}")
+        # Tijdens het schrijven wordt niet meer afgebroken
+        self.query_one("#cancel_project", Button).disabled = stage == "write"
+
+    def hide_progress(self):
+        self.progress.display = False
+        self.progress.update(progress=0)
+        self.query_one("#cancel_project", Button).disabled = True
+        self.response_static.update(f"Selected Scheme: {self.selected_scheme}")
+
 class CableApp(App[None], HasPrompt):
     CSS_PATH = "main.tcss"
     TITLE = "Electrical cabinet tester"
@@ -74,23 +116,78 @@ class CableApp(App[None], HasPrompt):
     selected_label = ""
     selected_scheme = "S25"
     test_time = 30  # Initial test time in seconds
+    journal_fsync = "always"  # "always", "batch" of "never", zie ResultJournal
+    stations = []  # Stations uit het fixture profiel, voor een bank met meerdere harnassen tegelijk
+    cabinet_serial = UNKNOWN_SERIAL
+    results_path = Path(__file__).parent.parent / "test_results/test_results.json"
+    loading = None  # threading.Event om de lopende project import af te breken
 
     def compose(self) -> ComposeResult:
         yield Header()
         yield Footer()
         with TabbedContent(classes="tabs"):
             with TabPane("Electric scheme", id="tab_electric_scheme"):
-                self.options_container = Options(selected_scheme=self.selected_scheme)
+                self.options_container = Options(selected_scheme=self.selected_scheme, cabinet_serial=self.cabinet_serial)
                 yield self.options_container
             with TabPane("Project", id="tab_project"):          
                 yield TestTree(testers=testers,selected_scheme=self.selected_scheme)
 
+        yield MetricsPanel(id="metrics")
         yield rich_log_handler.console
         yield Footer()
         
     def on_load(self) -> None:
         self.bind("q", "quit", description="Quit")
         self.bind("d", "toggle_dark", description="Toggle mode")
+        # Resultaten van alle kasten; verder waar de laatste run gebleven was
+        self.store = ResultStore()
+        latest = self.store.latest_run()
+        if latest is not None:
+            self.cabinet_serial = latest["serial"]
+            self.selected_scheme = latest["scheme"] or self.selected_scheme
+        self.run_id = self.store.resume(self.cabinet_serial, self.selected_scheme, ResultJournal(self.results_path).load())
+        # Eén metrics verzameling voor de hele app, het paneel luistert mee
+        self.metrics = RunMetrics(METRICS_DIR)
+        self.metrics.context["scheme"] = self.selected_scheme
+        self.metrics.context["serial"] = self.cabinet_serial
+        profile = FixtureProfile.load(self.selected_scheme)
+        self.stations = profile.stations
+        # De I2C bus wordt bij de eerste test geopend en blijft open tot de app stopt
+        self.hardware = HardwareSession(HardwareBackend(interrupt_pins=profile.interrupt_pins))
+
+    def on_mount(self) -> None:
+        panel = self.query_one(MetricsPanel)
+        self.metrics.listeners.append(panel.show)
+        panel.show(self.metrics)
+        # Alle schema's op de achtergrond in de cache zetten, zodat Change Scheme niet hoeft te parsen
+        self.compiler = SchemeCompiler()
+        self.compiler.listeners.append(self.on_scheme_compiled)
+        self.run_worker(self.compiler.compile_all(), group="precompile")
+        self.set_interval(CHECK_INTERVAL, self.check_schemes)
+
+    def check_schemes(self) -> None:
+        self.run_worker(self.compiler.compile_changed(), group="precompile")
+
+    def on_scheme_compiled(self, scheme: str, result: dict) -> None:
+        if result["status"] == "missing":
+            self.notify(f"Workbook for {scheme} not found: {result['workbook']}", severity="warning")
+        elif result["status"] == "failed":
+            self.notify(f"Could not compile {scheme}: {result.get('error', 'no cable list')}", severity="error")
+
+    async def on_unmount(self) -> None:
+        if self.loading is not None:
+            self.loading.set()
+        self.compiler.close()
+        await self.hardware.close()
+        self.store.close()
+
+    def start_run(self) -> None:
+        """Na het (opnieuw) aanmaken van test_results.json: een nieuwe run in de store."""
+        self.run_id = self.store.start_run(self.cabinet_serial, self.selected_scheme, ResultJournal(self.results_path).load())
+
+    async def plan(self, plan, eta: float):
+        """De werklijst van een connector als melding, voor de operator begint."""
+        self.notify(plan.describe(eta), title=plan.test)
     
     def action_toggle_dark(self) -> None:
         self.dark = not self.dark
@@ -99,8 +196,18 @@ class CableApp(App[None], HasPrompt):
     async def on_item_focus(self, event: ListView.Highlighted) -> None:
         self.selected_label = event.item.id
         logger.debug(f"Geselecteerde schema: {self.selected_label}")
+        self.update_change_button()
+
+    @on(Input.Changed, "#serial")
+    def on_serial_changed(self, event: Input.Changed) -> None:
+        self.update_change_button()
+
+    def update_change_button(self) -> None:
+        # Een ander schema of een andere kast: opnieuw laden start een nieuwe run
         button_test = self.query_one("#Change_Scheme")
-        if self.selected_scheme != self.selected_label:
+        serial = self.query_one("#serial", Input).value.strip() or UNKNOWN_SERIAL
+        changed = (self.selected_label or self.selected_scheme) != self.selected_scheme or serial != self.cabinet_serial
+        if changed and self.loading is None:
             button_test.disabled = False
             button_test.variant = "success"
         else:
@@ -108,19 +215,66 @@ class CableApp(App[None], HasPrompt):
             button_test.variant = "default"
 
     @on(Button.Pressed, "#Change_Scheme")
-    async def changescheme(self, event: Button.Pressed) -> None:
-        self.selected_scheme = self.selected_label
-        for tester in testers:
-            if tester[0] == self.selected_label:
-                self.selected_file = tester[1]
-                logger.debug(f"Bijbehorende bestand: {self.selected_file}")
-                CreateProject().create(self.selected_file)
-                self.query(TestTree).remove()
-                self.options_container.update_selected_scheme(self.selected_scheme)
-                self.mount(TestTree(testers=testers,selected_scheme=self.selected_scheme))
-        button_test = self.query_one("#Change_Scheme")
-        button_test.disabled = True
-        button_test.variant = "default"
+    def changescheme(self, event: Button.Pressed) -> None:
+        serial = self.query_one("#serial", Input).value.strip() or UNKNOWN_SERIAL
+        self.load_project(self.selected_label or self.selected_scheme, serial)
+
+    @on(Button.Pressed, "#cancel_project")
+    def cancel_project(self, event: Button.Pressed) -> None:
+        if self.loading is not None:
+            self.loading.set()
+            event.button.disabled = True
+
+    def load_project(self, scheme: str, serial: str) -> None:
+        """Maakt het project van `scheme` in een worker thread; de tree wordt pas gewisseld als het klaar is."""
+        if self.loading is not None:
+            self.notify("A project is already being loaded", severity="warning")
+            return
+        selected_file = dict(testers).get(scheme)
+        if selected_file is None:
+            logger.error(f"Unknown scheme: {scheme}")
+            return
+        logger.debug(f"Bijbehorende bestand: {selected_file}")
+        self.loading = threading.Event()
+        self.update_change_button()
+        self.create_project(scheme, serial, selected_file, self.loading)
+
+    @work(thread=True, group="project", exit_on_error=False)
+    def create_project(self, scheme: str, serial: str, selected_file: str, cancel: threading.Event) -> None:
+        def stage(name, index):
+            self.call_from_thread(self.options_container.show_stage, scheme, name, index)
+
+        try:
+            status = "created" if CreateProject(listeners=[stage], cancelled=cancel.is_set).create(selected_file) else "failed"
+        except ProjectCancelled:
+            status = "cancelled"
+        self.call_from_thread(self.project_done, scheme, serial, selected_file, status)
+
+    def project_done(self, scheme: str, serial: str, selected_file: str, status: str) -> None:
+        self.loading = None
+        if status == "created":
+            self.selected_scheme = scheme
+            self.selected_file = selected_file
+            self.cabinet_serial = serial
+            self.metrics.context["scheme"] = scheme
+            self.metrics.context["serial"] = serial
+            self.start_run()
+            # Het nieuwe schema kan andere stations hebben en de probe op een andere INT lijn
+            profile = FixtureProfile.load(scheme)
+            self.stations = profile.stations
+            self.hardware.backend.interrupt_pins = profile.interrupt_pins
+            # De nieuwe tree op de plek van de oude
+            tree = self.query_one(TestTree)
+            parent = tree.parent
+            tree.remove()
+            parent.mount(TestTree(testers=testers, selected_scheme=scheme))
+            self.options_container.update_selected_scheme(scheme)
+        elif status == "cancelled":
+            self.notify(f"Loading {scheme} cancelled, {self.selected_scheme} is still loaded")
+        else:
+            self.notify(f"Could not create the project for {scheme}", severity="error")
+        self.options_container.hide_progress()
+        self.update_change_button()
         
     def on_button_pressed(self, event: Button.Pressed) -> None:
         if event.button.id == "start":
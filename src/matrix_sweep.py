@@ -0,0 +1,103 @@
+import asyncio
+import logging
+
+from hardware_worker import AsyncPortBank
+from simulator import WiringModel
+from wiring_index import WiringIndex
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+
+class ContinuitySweep:
+    """
+    Onbemande continuïteitstest van de hele kabelboom.
+
+    Alle harness connectoren zitten in de tester. Elke pin wordt om de beurt
+    hoog gestuurd terwijl alle poorten in bulk gelezen worden; zo ontstaat in
+    één ronde de volledige gemeten verbindingsmatrix. Pinnen die al in een
+    gevonden net zitten hoeven niet meer gestuurd te worden, dus het aantal
+    stappen is gelijk aan het aantal netten.
+
+    De verwachte matrix komt uit testing_components_answers.json: twee tester
+    pinnen horen verbonden te zijn als hun draden in hetzelfde net eindigen.
+    """
+
+    def __init__(self, ports: AsyncPortBank, index: WiringIndex, model: WiringModel, settle: float = 0.01, connectors=None):
+        self.ports = ports
+        self.model = model
+        self.settle = settle
+        # (mcp_adress, mcp_pin) -> (connector, Conector_pin), eventueel beperkt tot een deel van de connectoren
+        self.labels = {
+            address: label for address, label in index.connectors.items()
+            if address not in ports.inputs and (connectors is None or label[0] in connectors)
+        }
+
+    def expected(self) -> dict:
+        """Per tester pin de set pinnen waarmee hij volgens het schema verbonden is."""
+        nets = {}
+        for pin in self.labels:
+            node = self.model.pin_nodes.get(pin)
+            if node is not None:
+                nets.setdefault(self.model.net(node), set()).add(pin)
+        return {pin: net - {pin} for net in nets.values() for pin in net}
+
+    async def sweep(self) -> dict:
+        """Meet per tester pin de set pinnen die hoog worden als hij gestuurd wordt."""
+        observed = {}
+        for driver in self.labels:
+            if driver in observed:
+                continue  # Zit al in een gemeten net
+            await self.drive(driver)
+            await asyncio.sleep(self.settle)
+            net = {driver}
+            for address, value in (await self.read_all()).items():
+                for pin in range(16):
+                    if value >> pin & 1 and (address, pin) in self.labels:
+                        net.add((address, pin))
+            for pin in net:
+                observed[pin] = net - {pin}
+        await self.release()
+        return observed
+
+    async def drive(self, pin: tuple):
+        await self.ports.drive(*pin)
+
+    async def read_all(self) -> dict:
+        return await self.ports.read_all()
+
+    async def release(self):
+        await self.ports.release()
+
+    def diff(self, expected: dict, observed: dict) -> dict:
+        """Vergelijkt de matrices en geeft opens, shorts en miswires per paar connector pinnen."""
+        report = {"opens": [], "shorts": [], "miswires": []}
+        for pin, label in self.labels.items():
+            missing = expected.get(pin, set()) - observed.get(pin, set())
+            extra = observed.get(pin, set()) - expected.get(pin, set())
+            for other in sorted(missing):
+                if pin < other:
+                    report["opens"].append(self._pair(pin, other))
+            for other in sorted(extra):
+                if pin < other:
+                    # Een verkeerde verbinding plus een ontbrekende: de draad zit op de verkeerde plek
+                    missing_other = expected.get(other, set()) - observed.get(other, set())
+                    kind = "miswires" if missing or missing_other else "shorts"
+                    report[kind].append(self._pair(pin, other))
+        return report
+
+    def _pair(self, a: tuple, b: tuple) -> dict:
+        return {
+            "from": {"Connector": self.labels[a][0], "Conector_pin": self.labels[a][1]},
+            "to": {"Connector": self.labels[b][0], "Conector_pin": self.labels[b][1]},
+        }
+
+    async def run(self) -> tuple:
+        expected = self.expected()
+        observed = await self.sweep()
+        report = self.diff(expected, observed)
+        logger.debug(
+            f"Matrix sweep: {len(report['opens'])} open, {len(report['shorts'])} kortsluiting, "
+            f"{len(report['miswires'])} verkeerd aangesloten, I2C: {self.ports.counters()}"
+        )
+        return expected, observed, report
@@ -0,0 +1,171 @@
+import logging
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+ALL_PINS = 0xFFFF
+# Een 16-bit register over I2C: register byte + 2 data bytes
+REGISTER_BYTES = 3
+# IOCON: INTA en INTB aan elkaar (MIRROR) en open drain (ODR), actief laag
+IOCON_MIRROR = 0x40
+IOCON_ODR = 0x04
+
+
+class MCPPort:
+    """
+    Port-level toegang tot één MCP23017.
+
+    Houdt een schaduwkopie bij van IODIR en OLAT zodat het aansturen van een
+    pin geen read-modify-write meer kost. Registers worden altijd als geheel
+    16-bit woord (A + B) in één I2C transactie geschreven, en alleen als de
+    waarde ook echt verandert.
+    """
+
+    def __init__(self, mcp, address: int, inputs: int = 0x0000):
+        self.mcp = mcp
+        self.address = address
+        self.inputs = inputs  # Bits die altijd input moeten blijven (bv. de probe)
+        self.reads = 0
+        self.writes = 0
+        self.bytes = 0
+        self._iodir = ALL_PINS
+        self._olat = 0x0000
+        self.sync()
+
+    def sync(self):
+        """Zet de chip in een bekende toestand: latch laag, alle pinnen input."""
+        self._write_olat(0x0000, force=True)
+        self._write_iodir(ALL_PINS, force=True)
+
+    @property
+    def driven(self) -> int:
+        """Masker van de pinnen die op dit moment hoog worden gestuurd."""
+        return ~self._iodir & self._olat & ALL_PINS
+
+    def drive(self, mask: int):
+        """Stuurt de pinnen in `mask` hoog en zet alle andere pinnen op input."""
+        mask &= ~self.inputs & ALL_PINS
+        # Eerst de latch, dan pas de richting: zo komt er nooit een glitch op de lijn
+        if mask:
+            self._write_olat(mask)
+        self._write_iodir(~mask & ALL_PINS)
+
+    def release(self, force: bool = False):
+        """Zet alle pinnen terug op input. De latch mag blijven staan."""
+        self._write_iodir(ALL_PINS, force=force)
+
+    def read(self) -> int:
+        """Leest GPIOA en GPIOB in één transactie."""
+        self.reads += 1
+        self.bytes += REGISTER_BYTES
+        return self.mcp.gpio
+
+    def enable_interrupt(self, mask: int):
+        """
+        Interrupt-on-change voor de pinnen in `mask`, vergeleken met DEFVAL = 0.
+
+        Zolang zo'n pin hoog is blijft de INT lijn actief, dus een contact dat
+        al bestond voordat er gewacht wordt gaat niet verloren.
+        """
+        self.mcp.io_control = IOCON_MIRROR | IOCON_ODR
+        self.mcp.default_value = 0x0000
+        self.mcp.interrupt_configuration = mask
+        self.mcp.interrupt_enable = mask
+        self.writes += 4
+        self.bytes += 2 + 3 * REGISTER_BYTES
+        self.clear_interrupt()
+
+    def clear_interrupt(self):
+        """Leest INTCAP zodat de INT lijn weer vrijkomt."""
+        self.mcp.clear_ints()
+        self.reads += 1
+        self.bytes += REGISTER_BYTES
+
+    def _write_olat(self, value: int, force: bool = False):
+        if value == self._olat and not force:
+            return
+        self.mcp.gpio = value
+        self._olat = value
+        self.writes += 1
+        self.bytes += REGISTER_BYTES
+
+    def _write_iodir(self, value: int, force: bool = False):
+        if value == self._iodir and not force:
+            return
+        self.mcp.iodir = value
+        self._iodir = value
+        self.writes += 1
+        self.bytes += REGISTER_BYTES
+
+
+class PortBank:
+    """
+    Alle expanders van de tester als één geheel.
+
+    Er wordt altijd maar op één plek tegelijk gestuurd: `drive` laat de vorige
+    pinnen eerst los, zodat de test loops zelf geen richting of waarde meer
+    per pin hoeven bij te houden.
+    """
+
+    def __init__(self, mcps: dict, probe: tuple = (26, 0), inputs=()):
+        self.ports = {address: MCPPort(mcp, address) for address, mcp in mcps.items()}
+        self._active = set()
+        self.configure(probe, inputs)
+
+    def configure(self, probe: tuple, inputs=()):
+        """Zet welke pinnen input blijven; alle pinnen worden eerst losgelaten."""
+        self.release()
+        # De probe plus eventuele extra input pinnen worden nooit gestuurd
+        self.probe = probe
+        self.inputs = {probe, *inputs}
+        for address, port in self.ports.items():
+            port.inputs = sum(1 << pin for input_address, pin in self.inputs if input_address == address)
+
+    def drive(self, address: int, pin: int):
+        self.drive_mask({address: 1 << pin})
+
+    def pins(self) -> list:
+        """Alle pinnen die gestuurd kunnen worden, in scanvolgorde (zonder de probe)."""
+        return [(address, pin) for address in self.ports for pin in range(16) if (address, pin) not in self.inputs]
+
+    def drive_pins(self, pins):
+        """Stuurt een willekeurige groep pinnen tegelijk hoog, één bulk write per poort."""
+        masks = {}
+        for address, pin in pins:
+            masks[address] = masks.get(address, 0) | 1 << pin
+        self.drive_mask(masks)
+
+    def drive_mask(self, masks: dict):
+        """Stuurt per adres een heel pin-masker hoog; alle andere poorten worden losgelaten."""
+        for address in self._active - masks.keys():
+            self.ports[address].release()
+        # Al als actief markeren voor het schrijven: na een busfout halverwege laat release ze ook los
+        self._active |= masks.keys()
+        for address, mask in masks.items():
+            self.ports[address].drive(mask)
+        self._active = {address for address, mask in masks.items() if mask}
+
+    def release(self, force: bool = False):
+        """
+        Alle pinnen terug op input. Met `force` wordt IODIR van elke poort
+        opnieuw geschreven, ook als de schaduwkopie zegt dat hij al input is:
+        na een busfout weet je niet wat de chip echt heeft.
+        """
+        for address in self.ports if force else self._active:
+            self.ports[address].release(force=force)
+        self._active = set()
+
+    def read(self, address: int) -> int:
+        return self.ports[address].read()
+
+    def probe_active(self) -> bool:
+        probe_address, probe_pin = self.probe
+        return bool(self.read(probe_address) >> probe_pin & 1)
+
+    def counters(self) -> dict:
+        """Totaal aantal I2C transacties en bytes over alle expanders."""
+        return {
+            "reads": sum(port.reads for port in self.ports.values()),
+            "writes": sum(port.writes for port in self.ports.values()),
+            "bytes": sum(port.bytes for port in self.ports.values()),
+        }
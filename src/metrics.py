@@ -0,0 +1,145 @@
+import bisect
+import json
+import logging
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from pydantic import BaseModel
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+METRICS_DIR = Path(__file__).parent.parent / "test_results/metrics"
+# Bovengrenzen van de histogram emmers in seconden; alles daarboven valt in "+inf"
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Latency histogram met vaste emmers; de ruwe waarden blijven bewaard voor p50/p99."""
+
+    def __init__(self, buckets: tuple = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.samples = []
+
+    def add(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.samples.append(seconds)
+
+    def percentile(self, fraction: float) -> float:
+        samples = sorted(self.samples)
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+    def summary(self) -> dict:
+        if not self.samples:
+            return {"count": 0}
+        labels = [f"<={bound:g}" for bound in self.buckets] + ["+inf"]
+        return {
+            "count": len(self.samples),
+            "total": round(sum(self.samples), 4),
+            "mean": round(sum(self.samples) / len(self.samples), 4),
+            "p50": round(self.percentile(0.5), 4),
+            "p99": round(self.percentile(0.99), 4),
+            "max": round(max(self.samples), 4),
+            "buckets": {label: count for label, count in zip(labels, self.counts) if count},
+        }
+
+
+class TerminalMetrics(BaseModel):
+    """Meetwaarden van één geteste terminal."""
+    test: str
+    terminal: str
+    passed: bool | None = None
+    contact_seconds: float = 0.0  # Tot de probe contact had (of de test tijd verstreek)
+    locate_seconds: float = 0.0  # In test_different_components
+    reads: int = 0
+    writes: int = 0
+    bytes: int = 0
+
+
+class RunMetrics:
+    """
+    Verzamelt de meetwaarden van een test run.
+
+    Per terminal: tijd tot probe contact, tijd in de locator en de I2C
+    transacties; per run: de tijd in save_results_to_json. `listeners`
+    worden na elke meting aangeroepen (het live paneel), `export` schrijft
+    alles als JSON naar `directory` (de app en de CLI geven METRICS_DIR);
+    zonder directory wordt er niets weggeschreven.
+    """
+
+    def __init__(self, directory: Path | None = None):
+        self.directory = Path(directory) if directory is not None else None
+        self.context = {}  # Bv. het schema; komt mee in de export
+        self.listeners = []
+        self.begin("")
+
+    def begin(self, test: str):
+        self.test = test
+        self.started = datetime.now()
+        self.terminals = []
+        self.histograms = {"contact": Histogram(), "locate": Histogram(), "save": Histogram()}
+        self._counters = {}
+        self._notify()
+
+    def start_terminal(self, test: str, terminal: str, counters: dict) -> TerminalMetrics:
+        self._counters = dict(counters)
+        return TerminalMetrics(test=test, terminal=terminal)
+
+    def finish_terminal(self, record: TerminalMetrics, passed: bool, counters: dict):
+        record.passed = passed
+        for key in ("reads", "writes", "bytes"):
+            setattr(record, key, counters[key] - self._counters.get(key, 0))
+        self.terminals.append(record)
+        self._notify()
+
+    @contextmanager
+    def measure(self, name: str, record: TerminalMetrics | None = None):
+        """Meet de tijd van het blok in histogram `name` (en in `record.<name>_seconds`)."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.histograms[name].add(elapsed)
+            if record is not None:
+                setattr(record, f"{name}_seconds", round(elapsed, 4))
+            if name == "save":
+                self._notify()
+
+    def totals(self) -> dict:
+        return {key: sum(getattr(record, key) for record in self.terminals) for key in ("reads", "writes", "bytes")}
+
+    def summary(self) -> dict:
+        return {
+            "test": self.test,
+            "terminals": len(self.terminals),
+            "failed": sum(record.passed is False for record in self.terminals),
+            "i2c": self.totals(),
+            **{name: histogram.summary() for name, histogram in self.histograms.items()},
+        }
+
+    def export(self, extra: dict | None = None) -> Path | None:
+        """Schrijft de run naar <directory>/<tijd>_<test>.json en geeft het pad terug (None zonder directory)."""
+        if self.directory is None:
+            return None
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{self.started:%Y%m%d-%H%M%S}_{self.test or 'run'}.json"
+        data = {
+            **self.context,
+            "started": self.started.isoformat(timespec="seconds"),
+            "duration": round((datetime.now() - self.started).total_seconds(), 3),
+            "summary": self.summary(),
+            **(extra or {}),
+            "terminals": [record.model_dump() for record in self.terminals],
+        }
+        with open(path, "w") as file:
+            json.dump(data, file, indent=4)
+        logger.debug(f"Metrics weggeschreven naar {path}")
+        return path
+
+    def _notify(self):
+        for listener in self.listeners:
+            listener(self)
@@ -9,6 +9,8 @@ from textual import events
 
 import logging
 
+from utils import TestObserver
+
 logging.getLogger(__name__)
 logger = logging.getLogger(__name__)
 
@@ -76,7 +78,7 @@ class Prompt(ModalScreen[bool]):
         container = self.query_one(Container)
         container.styles.background = color
 
-class HasPrompt:
+class HasPrompt(TestObserver):
     async def prompt(self, title: str, prompt: str, duration: int):
         self.prompt_instance = Prompt(title=title, prompt=prompt, duration=duration)
         await self.push_screen(self.prompt_instance)
@@ -0,0 +1,172 @@
+"""
+Compileert alle geregistreerde schema's op de achtergrond.
+
+Bij het opstarten (en daarna als een werkboek op schijf verandert) worden
+alle werkboeken uit schemes.testers die nog niet in de cache van
+CreateProject staan parallel in een process pool geïmporteerd. "Change
+Scheme" laadt daarna alleen nog uit de cache. Ontbrekende werkboeken worden
+gemeld, niet gecompileerd. De cache wordt in de app zelf gecontroleerd; de
+pool wordt alleen gestart voor werkboeken die echt gecompileerd moeten
+worden en na elke ronde weer afgesloten.
+
+    python src/precompile.py          # alles compileren en het resultaat tonen
+"""
+import asyncio
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, resource_tracker
+
+from schemes import testers, SCHEMES_DIR
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+CHECK_INTERVAL = 10.0  # Seconden tussen het controleren van de werkboeken op wijzigingen
+
+
+def _quiet_worker():
+    # Fouten komen via het resultaat terug; een worker mag niet op de terminal van de UI schrijven
+    logging.getLogger().addHandler(logging.NullHandler())
+
+
+def make_project(compiled_dir=None):
+    from create_test_project import CreateProject
+
+    project = CreateProject()
+    if compiled_dir is not None:
+        project.compiled_dir = compiled_dir
+    return project
+
+
+def is_cached(workbook: str, compiled_dir=None) -> bool:
+    """Of het werkboek (deze inhoud) al gecompileerd in de cache staat; draait in de app."""
+    return make_project(compiled_dir).compiled_path(SCHEMES_DIR / workbook).exists()
+
+
+def compile_workbook(workbook: str, compiled_dir=None) -> dict:
+    """Draait in een worker proces: het werkboek importeren en in de cache zetten."""
+    start = time.perf_counter()
+    status = "compiled" if make_project(compiled_dir).compile(SCHEMES_DIR / workbook) is not None else "failed"
+    return {"status": status, "seconds": round(time.perf_counter() - start, 3)}
+
+
+class SchemeCompiler:
+    """
+    Houdt de cache van alle schema's bij in een process pool.
+
+    `listeners` krijgen per schema (scheme, result) met result["status"]
+    "cached", "compiled", "failed" of "missing". `compile_changed` kijkt
+    alleen naar werkboeken waarvan de mtime veranderd is sinds de vorige keer.
+    `workers` is het maximum aantal processen; `spawned` het aantal van de
+    laatste ronde (0 als alles al in de cache stond). Zonder `compiled_dir`
+    de cache van CreateProject.
+    """
+
+    def __init__(self, schemes=testers, workers: int | None = None, compiled_dir=None):
+        self.schemes = list(schemes)
+        self.compiled_dir = compiled_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.spawned = 0
+        self.listeners = []
+        self.results = {}
+        self._mtimes = {}
+        self._pool = None
+        self._batch = asyncio.Lock()  # Eén ronde tegelijk: een ronde sluit zijn pool zelf af
+
+    def pool(self, jobs: int) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # Textual vangt stderr af (fileno -1); de resource tracker geeft het stderr fd door aan zijn proces
+            stderr, sys.stderr = sys.stderr, sys.__stderr__
+            try:
+                resource_tracker.ensure_running()
+            finally:
+                sys.stderr = stderr
+            # spawn: de app heeft al threads (hardware, Textual), fork is dan niet veilig
+            self.spawned = min(jobs, self.workers)
+            self._pool = ProcessPoolExecutor(max_workers=self.spawned, mp_context=get_context("spawn"), initializer=_quiet_worker)
+        return self._pool
+
+    def changed(self) -> list:
+        """De schema's waarvan het werkboek nieuw, veranderd of verdwenen is sinds de vorige controle."""
+        changed = []
+        for scheme, workbook in self.schemes:
+            path = SCHEMES_DIR / workbook
+            mtime = path.stat().st_mtime_ns if path.exists() else None
+            if scheme not in self._mtimes or self._mtimes[scheme] != mtime:
+                self._mtimes[scheme] = mtime
+                changed.append((scheme, workbook))
+        return changed
+
+    async def compile_all(self) -> dict:
+        self._mtimes = {}
+        return await self.compile_changed()
+
+    async def compile_changed(self) -> dict:
+        async with self._batch:
+            return await self._compile_changed()
+
+    async def _compile_changed(self) -> dict:
+        loop = asyncio.get_running_loop()
+        changed, todo = [], []
+        for scheme, workbook in self.changed():
+            if self._mtimes[scheme] is None:
+                self._report(scheme, {"status": "missing", "workbook": workbook})
+                continue
+            changed.append(scheme)
+            # Het hashen van het werkboek niet op de event loop
+            start = time.perf_counter()
+            if await asyncio.to_thread(is_cached, workbook, self.compiled_dir):
+                self._report(scheme, {"status": "cached", "seconds": round(time.perf_counter() - start, 3)})
+            else:
+                todo.append((scheme, workbook))
+
+        self.spawned = 0
+        if todo:
+            pool = self.pool(len(todo))
+            jobs = {scheme: loop.run_in_executor(pool, compile_workbook, workbook, self.compiled_dir) for scheme, workbook in todo}
+            try:
+                for scheme, job in jobs.items():
+                    try:
+                        result = await job
+                    except Exception as error:
+                        result = {"status": "failed", "error": str(error)}
+                    self._report(scheme, result)
+            finally:
+                # Geen processen laten staan tot de app stopt
+                self.close()
+        return {scheme: self.results[scheme] for scheme in changed}
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _report(self, scheme: str, result: dict):
+        self.results[scheme] = result
+        if result["status"] == "missing":
+            logger.warning(f"Schema {scheme}: werkboek {result['workbook']} ontbreekt in {SCHEMES_DIR}")
+        elif result["status"] == "failed":
+            logger.error(f"Schema {scheme}: compileren mislukt {result.get('error', '')}")
+        else:
+            logger.debug(f"Schema {scheme}: {result['status']} in {result['seconds']} s")
+        for listener in self.listeners:
+            listener(scheme, result)
+
+
+async def main() -> int:
+    compiler = SchemeCompiler()
+    compiler.listeners.append(lambda scheme, result: print(scheme, result))
+    start = time.perf_counter()
+    try:
+        await compiler.compile_all()
+    finally:
+        compiler.close()
+    print(f"{len(compiler.results)} schema's in {time.perf_counter() - start:.2f} s met {compiler.spawned} processen")
+    return 1 if any(result["status"] == "failed" for result in compiler.results.values()) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,118 @@
+import asyncio
+import logging
+
+from hardware_worker import AsyncPortBank
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+
+class PollingProbe:
+    """
+    Wacht op contact door de probe input te pollen.
+
+    Het interval begint kort (snel contact wordt snel gezien) en groeit tot
+    `max_interval`, zodat een lange wachttijd de bus niet continu bezet houdt.
+    """
+
+    def __init__(self, ports: AsyncPortBank, min_interval: float = 0.02, max_interval: float = 0.5, backoff: float = 1.5):
+        self.ports = ports
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+
+    async def wait(self, timeout: float) -> bool:
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        interval = self.min_interval
+        while True:
+            if await self.ports.probe_active():
+                return True
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(interval, remaining))
+            interval = min(interval * self.backoff, self.max_interval)
+
+    def close(self):
+        pass
+
+
+class GPIOInterruptLine:
+    """De INTA/INTB lijn van een expander op een GPIO pin (BCM nummering) van de Pi."""
+
+    def __init__(self, bcm_pin: int):
+        self.bcm_pin = bcm_pin
+        self.gpio = None
+
+    def start(self, callback):
+        import RPi.GPIO as GPIO
+
+        self.gpio = GPIO
+        GPIO.setmode(GPIO.BCM)
+        # Open drain, actief laag: pull-up op de Pi en reageren op de dalende flank
+        GPIO.setup(self.bcm_pin, GPIO.IN, pull_up_down=GPIO.PUD_UP)
+        GPIO.add_event_detect(self.bcm_pin, GPIO.FALLING, callback=lambda channel: callback())
+
+    def stop(self):
+        if self.gpio is not None:
+            self.gpio.remove_event_detect(self.bcm_pin)
+            self.gpio = None
+
+
+class InterruptProbe:
+    """
+    Wacht op contact via interrupt-on-change op de probe input.
+
+    GPINTEN/INTCON worden één keer gezet; daarna wordt er niet meer gepolld
+    maar gewacht op een asyncio.Event dat vanuit de interrupt callback (een
+    andere thread) wordt gezet. Na een interrupt volgt nog één bevestigende
+    read, zodat een storing op de lijn geen contact oplevert.
+    """
+
+    def __init__(self, ports: AsyncPortBank, line):
+        self.ports = ports
+        self.line = line
+        self.loop = asyncio.get_event_loop()
+        self.event = asyncio.Event()
+        probe_address, probe_pin = ports.probe
+        self.port = ports.ports[probe_address]
+        self.mask = 1 << probe_pin
+
+    async def arm(self):
+        await self.ports.call(self.port.enable_interrupt, self.mask)
+        self.line.start(self._on_interrupt)
+
+    def _on_interrupt(self):
+        self.loop.call_soon_threadsafe(self.event.set)
+
+    async def wait(self, timeout: float) -> bool:
+        deadline = self.loop.time() + timeout
+        while True:
+            self.event.clear()
+            await self.ports.call(self.port.clear_interrupt)
+            if await self.ports.probe_active():
+                return True
+            remaining = deadline - self.loop.time()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self.event.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+
+    def close(self):
+        self.line.stop()
+
+
+async def make_probe(backend, ports: AsyncPortBank):
+    """Interrupt gestuurd als de backend een INT lijn heeft, anders adaptief pollen."""
+    probe_address, _ = ports.probe
+    line = backend.interrupt_line(probe_address)
+    if line is None:
+        logger.debug("Geen interrupt lijn voor de probe, terugvallen op pollen")
+        return PollingProbe(ports)
+    logger.debug(f"Probe via interrupt lijn van MCP {probe_address}")
+    probe = InterruptProbe(ports, line)
+    await probe.arm()
+    return probe
@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+from pathlib import Path
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+FSYNC_POLICIES = ("always", "batch", "never")
+
+
+def merge_results(data: dict, title: str, results: list):
+    """Werkt de resultaten van één test bij in een test_results dict; bestaande terminals worden overschreven."""
+    if title not in data["test_results"]:
+        data["test_results"][title] = []
+
+    existing_terminals = {result['terminal']: result for result in data["test_results"][title]}
+
+    for result in results:
+        if result['terminal'] in existing_terminals:
+            # Update het bestaande resultaat
+            existing_terminals[result['terminal']]['passed'] = result['passed']
+            existing_terminals[result['terminal']]['answer'] = result['answer']
+        else:
+            # Voeg een nieuw resultaat toe
+            entry = {"terminal": result['terminal'], "passed": result['passed'], "answer": result['answer']}
+            data["test_results"][title].append(entry)
+            existing_terminals[result['terminal']] = entry
+
+
+class ResultJournal:
+    """
+    Append-only journal naast test_results.json.
+
+    Elk resultaat wordt als één JSON regel toegevoegd op het moment dat het
+    gemeten is, dus een crash midden in een connector kost niets. Het
+    snapshot bestand wordt alleen bij compactie herschreven (atomair via een
+    tijdelijk bestand), periodiek en aan het eind van een connector.
+
+    fsync:
+        "always"  na elk resultaat (veiligst, standaard)
+        "batch"   alleen bij compactie en elke `batch_size` resultaten
+        "never"   aan het besturingssysteem overlaten
+    """
+
+    def __init__(self, snapshot_path: Path, fsync: str = "always", batch_size: int = 20, compact_every: int = 200):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.snapshot_path = Path(snapshot_path)
+        self.path = self.snapshot_path.with_suffix(".journal.jsonl")
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.compact_every = compact_every
+        self._file = None
+        self._unsynced = 0
+        self._appended = 0
+
+    def append(self, title: str, terminal: str, passed: bool, answer: str):
+        if self._file is None:
+            self._file = open(self.path, "a+")
+            # Een half geschreven regel van een crash afsluiten, anders plakt de volgende eraan vast
+            if self._file.tell() > 0:
+                self._file.seek(self._file.tell() - 1)
+                if self._file.read(1) != "\n":
+                    self._file.write("\n")
+        self._file.write(json.dumps({"test": title, "terminal": terminal, "passed": passed, "answer": answer}) + "\n")
+        self._file.flush()
+        self._unsynced += 1
+        if self.fsync == "always" or (self.fsync == "batch" and self._unsynced >= self.batch_size):
+            self._sync()
+
+        self._appended += 1
+        if self._appended >= self.compact_every:
+            self.compact()
+
+    def entries(self):
+        """Alle resultaten die nog niet in het snapshot staan, in volgorde."""
+        if not self.path.exists():
+            return
+        with open(self.path, "r") as file:
+            for line in file:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # Half geschreven laatste regel na een crash
+                    logger.warning(f"Skipping damaged journal line in {self.path}")
+
+    def load(self) -> dict:
+        """Het snapshot met alle journal regels toegepast: de actuele stand na een crash of herstart."""
+        with open(self.snapshot_path, "r") as file:
+            data = json.load(file)
+        self._apply(data)
+        return data
+
+    def compact(self) -> dict:
+        """Schrijft de journal regels in het snapshot en maakt de journal weer leeg; geeft de nieuwe stand."""
+        data = self.load()
+        tmp_path = self.snapshot_path.with_suffix(".tmp")
+        with open(tmp_path, "w") as file:
+            json.dump(data, file, indent=4)
+            file.flush()
+            if self.fsync != "never":
+                os.fsync(file.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        self.clear()
+        return data
+
+    def clear(self):
+        self.close()
+        if self.path.exists():
+            os.remove(self.path)
+        self._appended = 0
+
+    def close(self):
+        if self._file is not None:
+            if self.fsync != "never":
+                self._sync()
+            self._file.close()
+            self._file = None
+
+    def _sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def _apply(self, data: dict):
+        by_test = {}
+        for entry in self.entries():
+            by_test.setdefault(entry["test"], []).append(entry)
+        for title, results in by_test.items():
+            merge_results(data, title, results)
@@ -0,0 +1,181 @@
+import logging
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+STORE_PATH = Path(__file__).parent.parent / "test_results/results.sqlite3"
+UNKNOWN_SERIAL = "unknown"
+PAGE_SIZE = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cabinets (
+    id INTEGER PRIMARY KEY,
+    serial TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    cabinet_id INTEGER NOT NULL REFERENCES cabinets(id),
+    scheme TEXT NOT NULL,
+    cabinet_name TEXT NOT NULL,
+    started TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_by_cabinet ON runs(cabinet_id, scheme);
+CREATE TABLE IF NOT EXISTS run_tests (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    test TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (run_id, test)
+);
+CREATE TABLE IF NOT EXISTS results (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    test TEXT NOT NULL,
+    terminal TEXT NOT NULL,
+    passed INTEGER NOT NULL,
+    answer TEXT NOT NULL,
+    recorded TEXT NOT NULL,
+    UNIQUE (run_id, test, terminal)
+);
+-- Pagineren per connector in de volgorde van testen (rowid)
+CREATE INDEX IF NOT EXISTS results_by_test ON results(run_id, test);
+-- Alle fouten op één mark over alle kasten
+CREATE INDEX IF NOT EXISTS failures_by_test ON results(test) WHERE passed = 0;
+"""
+
+
+class ResultStore:
+    """
+    Lokale SQLite database met de resultaten van alle kasten.
+
+    Een run is één kast (serienummer) met één schema, van het laden van het
+    schema tot het volgende laden. test_results.json en de journal blijven
+    de werkkopie van de lopende run; bij elke save komen de resultaten van
+    die connector in één transactie in de store, zodat een nieuw schema of
+    een nieuwe kast de vorige resultaten niet meer weggooit.
+    """
+
+    def __init__(self, path: Path = STORE_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        self.connection.execute("PRAGMA synchronous = NORMAL")
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def start_run(self, serial: str, scheme: str, data: dict) -> int:
+        """Nieuwe run voor een net aangemaakte werkkopie (`data` zoals in test_results.json)."""
+        with self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO cabinets (serial) VALUES (?)", (serial,))
+            cabinet_id = self.connection.execute("SELECT id FROM cabinets WHERE serial = ?", (serial,)).fetchone()[0]
+            run_id = self.connection.execute(
+                "INSERT INTO runs (cabinet_id, scheme, cabinet_name, started) VALUES (?, ?, ?, ?)",
+                (cabinet_id, scheme, data.get("cabinet_name", "Unknown Cabinet"), datetime.now().isoformat(timespec="seconds")),
+            ).lastrowid
+        self.import_results(run_id, data)
+        logger.debug(f"Run {run_id} gestart: kast {serial}, schema {scheme}")
+        return run_id
+
+    def latest_run(self, serial: str | None = None, scheme: str | None = None) -> dict | None:
+        """De laatste run, eventueel van één kast en/of schema."""
+        row = self.connection.execute(
+            "SELECT runs.*, cabinets.serial FROM runs JOIN cabinets ON cabinets.id = runs.cabinet_id "
+            "WHERE (:serial IS NULL OR cabinets.serial = :serial) AND (:scheme IS NULL OR runs.scheme = :scheme) "
+            "ORDER BY runs.id DESC LIMIT 1",
+            {"serial": serial, "scheme": scheme},
+        ).fetchone()
+        return None if row is None else dict(row)
+
+    def run(self, run_id: int) -> dict:
+        row = self.connection.execute(
+            "SELECT runs.*, cabinets.serial FROM runs JOIN cabinets ON cabinets.id = runs.cabinet_id WHERE runs.id = ?",
+            (run_id,),
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"Unknown run: {run_id}")
+        return dict(row)
+
+    def resume(self, serial: str, scheme: str | None, data: dict) -> int:
+        """
+        De run bij de werkkopie `data`: de laatste run van deze kast (en dit
+        schema), of een nieuwe. Resultaten die alleen in de werkkopie staan
+        (journal na een crash, of van voor de store) worden meegenomen.
+        """
+        latest = self.latest_run(serial, scheme)
+        if latest is None:
+            return self.start_run(serial, scheme or "", data)
+        self.import_results(latest["id"], data)
+        return latest["id"]
+
+    def import_results(self, run_id: int, data: dict):
+        """Alle tests en resultaten van een werkkopie, in één transactie."""
+        with self.connection:
+            self._add_tests(run_id, data.get("test_results", {}))
+            for test, results in data.get("test_results", {}).items():
+                self._add_results(run_id, test, results)
+
+    def add_results(self, run_id: int, test: str, results: list):
+        """Bulk insert van de resultaten van één test; bestaande terminals worden overschreven."""
+        with self.connection:
+            self._add_tests(run_id, [test])
+            self._add_results(run_id, test, results)
+
+    def clear(self, run_id: int, tests):
+        """Resultaten van `tests` weggooien, bv. om opnieuw te testen."""
+        with self.connection:
+            self.connection.executemany("DELETE FROM results WHERE run_id = ? AND test = ?", [(run_id, test) for test in tests])
+
+    def summary(self, run_id: int) -> list:
+        """Per test (in schema volgorde) het aantal geteste en gefaalde terminals."""
+        rows = self.connection.execute(
+            "SELECT run_tests.test, COUNT(results.terminal) AS total, COALESCE(SUM(results.passed = 0), 0) AS failed "
+            "FROM run_tests LEFT JOIN results ON results.run_id = run_tests.run_id AND results.test = run_tests.test "
+            "WHERE run_tests.run_id = ? GROUP BY run_tests.test ORDER BY run_tests.position",
+            (run_id,),
+        )
+        return [dict(row) for row in rows]
+
+    def page(self, run_id: int, test: str, offset: int = 0, limit: int = PAGE_SIZE) -> list:
+        """Eén pagina resultaten van een test, in de volgorde waarin ze getest zijn."""
+        rows = self.connection.execute(
+            "SELECT terminal, passed, answer FROM results WHERE run_id = ? AND test = ? ORDER BY rowid LIMIT ? OFFSET ?",
+            (run_id, test, limit, offset),
+        )
+        return [{"terminal": row["terminal"], "passed": bool(row["passed"]), "answer": row["answer"]} for row in rows]
+
+    def statuses(self, run_id: int, test: str) -> dict:
+        """terminal -> passed voor één test."""
+        rows = self.connection.execute("SELECT terminal, passed FROM results WHERE run_id = ? AND test = ?", (run_id, test))
+        return {terminal: bool(passed) for terminal, passed in rows}
+
+    def failures(self, test: str, offset: int = 0, limit: int = PAGE_SIZE) -> list:
+        """Alle gefaalde terminals op mark `test` over alle kasten en runs, nieuwste eerst."""
+        rows = self.connection.execute(
+            "SELECT cabinets.serial, runs.scheme, runs.id AS run_id, runs.started, results.terminal, results.answer, results.recorded "
+            "FROM results JOIN runs ON runs.id = results.run_id JOIN cabinets ON cabinets.id = runs.cabinet_id "
+            "WHERE results.test = ? AND results.passed = 0 ORDER BY results.run_id DESC, results.rowid LIMIT ? OFFSET ?",
+            (test, limit, offset),
+        )
+        return [dict(row) for row in rows]
+
+    def _add_tests(self, run_id: int, tests):
+        (position,) = self.connection.execute("SELECT COUNT(*) FROM run_tests WHERE run_id = ?", (run_id,)).fetchone()
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO run_tests (run_id, test, position) VALUES (?, ?, ?)",
+            [(run_id, test, position + i) for i, test in enumerate(tests)],
+        )
+
+    def _add_results(self, run_id: int, test: str, results: list):
+        recorded = datetime.now().isoformat(timespec="seconds")
+        self.connection.executemany(
+            "INSERT INTO results (run_id, test, terminal, passed, answer, recorded) VALUES (?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (run_id, test, terminal) DO UPDATE SET passed = excluded.passed, answer = excluded.answer, recorded = excluded.recorded "
+            "WHERE passed != excluded.passed OR answer != excluded.answer",
+            [(run_id, test, result["terminal"], bool(result["passed"]), result["answer"], recorded) for result in results],
+        )
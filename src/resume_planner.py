@@ -0,0 +1,74 @@
+import logging
+
+from pydantic import BaseModel
+
+from utils import normalize_terminal
+from wiring_index import WiringIndex
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+
+class PlannedTerminal(BaseModel):
+    """Eén nog te testen terminal van een connector."""
+    terminal: str  # from_terminal, genormaliseerd
+    address: int
+    pin: int
+    to_part: str
+    to_mark: str
+    to_terminal: str | int | float  # Zoals in het schema, voor de prompt en het antwoord
+
+
+class ResumePlan(BaseModel):
+    """
+    De werklijst van één connector test.
+
+    `pending` is in de volgorde waarin de operator de probe plaatst:
+    gegroepeerd per to_mark (in schema volgorde) en binnen een mark op
+    terminal nummer, zodat de probe zo min mogelijk heen en weer gaat. Die
+    volgorde ligt al vast in de PinTable van het project.
+    """
+    test: str
+    pending: list[PlannedTerminal] = []
+    passed: int = 0  # Al geslaagd, worden overgeslagen
+    unmapped: int = 0  # Geen MCP pin of geen bestemming, niet te testen
+
+    @property
+    def remaining(self) -> int:
+        return len(self.pending)
+
+    @property
+    def marks(self) -> int:
+        return len({terminal.to_mark for terminal in self.pending})
+
+    def eta(self, seconds_per_terminal: float) -> float:
+        return self.remaining * seconds_per_terminal
+
+    def describe(self, eta: float) -> str:
+        minutes, seconds = divmod(round(eta), 60)
+        return (f"{self.remaining} terminals to test on {self.marks} marks "
+                f"({self.passed} already passed), ETA {minutes}m{seconds:02d}s")
+
+
+def passed_terminals(results: list) -> set:
+    """De terminals die al geslaagd zijn, genormaliseerd zoals de werklijst."""
+    return {normalize_terminal(result['terminal']) for result in results if result['passed']}
+
+
+def plan(test: str, index: WiringIndex, results: list) -> ResumePlan:
+    """Maakt de werklijst van `test` uit de wiring index en de resultaten tot nu toe."""
+    resume = ResumePlan(test=test)
+    passed = passed_terminals(results)
+
+    for terminal, address, pin, to_part, to_mark, to_terminal in index.terminals(test):
+        if address is None:
+            resume.unmapped += 1
+            continue
+        if terminal in passed:
+            resume.passed += 1
+            continue
+        resume.pending.append(PlannedTerminal(
+            terminal=terminal, address=address, pin=pin, to_part=to_part, to_mark=to_mark, to_terminal=to_terminal,
+        ))
+    logger.debug(f"Plan {test}: {resume.remaining} te testen, {resume.passed} al geslaagd, {resume.unmapped} niet te testen")
+    return resume
@@ -1,217 +1,293 @@
-import json
-from pathlib import Path
 import logging
 import asyncio
 from datetime import datetime, timedelta
-from textual.app import App, ComposeResult
-from textual.containers import Container
-from textual.screen import ModalScreen
-from textual.widgets import Label, Static
-from textual import events
-import math
-
-from utils import BaseTest, SubTest
-
-import board
-import busio
-import adafruit_mcp230xx.mcp23017 as MCP
-from digitalio import Direction, Pull
+
+from pydantic import Field, PrivateAttr
+
+from utils import BaseTest, SubTest, normalize_terminal
+from resume_planner import plan
+from result_journal import ResultJournal
+from hardware_worker import AsyncPortBank, LoopLagMonitor
+from hardware_session import HardwareSession
+from io_backend import IOBackend, HardwareBackend
+from locator import LOCATORS, locate_linear
+from probe import make_probe
+from matrix_sweep import ContinuitySweep
+from bus_scheduler import sweep_stations
+from simulator import WiringModel
+from wiring_index import WiringIndex, ANSWERS_PATH
+from fixture_profile import FIXTURE_PATH
+from metrics import RunMetrics
+from calibration import Calibration, CALIBRATION_PATH, calibrate
 import time
 
 logging.getLogger(__name__)
 logger = logging.getLogger(__name__)
 
 class RunTest(BaseTest):
+    backend: IOBackend | None = Field(
+        None,
+        exclude=True,
+    )
+    locate_mode: str = "bisect"  # "bisect" of "linear"
+    probe: tuple | None = None  # (mcp_adress, mcp_pin) van de probe input; standaard die uit het fixture profiel
+    # De bus van de app; zonder session wordt er per run een eigen geopend en weer gesloten
+    session: HardwareSession | None = Field(
+        None,
+        exclude=True,
+    )
+    hardware_thread: bool = True  # I2C op een eigen thread, zodat de UI niet blokkeert
+    result_pause: float = 2  # Seconden dat een fout in beeld blijft
+    pass_pause: float = 0.5  # Seconden dat een geslaagde terminal in beeld blijft
+    # Settle tijden van de bank; standaard uit test_results/calibration.json
+    calibration: Calibration | None = Field(
+        None,
+        exclude=True,
+    )
+    metrics: RunMetrics | None = Field(
+        None,
+        exclude=True,
+    )
+    _own_session: bool = PrivateAttr(False)
+
+    async def open_ports(self) -> AsyncPortBank:
+        """De expanders voor deze run; alle pinnen via port-level registers, de probe pin blijft input."""
+        if self.session is None:
+            # Zonder expliciete backend wordt de echte hardware gebruikt
+            self.session = HardwareSession(self.backend or HardwareBackend(), hardware_thread=self.hardware_thread)
+            self._own_session = True
+        self.backend = self.session.backend
+        if self.calibration is None:
+            self.calibration = Calibration.load()
+        return await self.session.acquire(self.probe or WiringIndex.for_project().probe)
+
+    async def close_ports(self):
+        """Alle pinnen los; een eigen bus wordt gesloten (ook de hardware thread), die van de app blijft open."""
+        if self._own_session:
+            session, self.session, self._own_session = self.session, None, False
+            await session.close()
+        elif self.session is not None:
+            await self.session.release()
+
+    def seconds_per_terminal(self, test_time) -> float:
+        """Verwachte tijd per terminal: de gemiddelde contact tijd tot nu toe, anders de volle test tijd."""
+        contact = self.metrics.summary()["contact"] if self.metrics is not None else {"count": 0}
+        typical = contact["mean"] if contact["count"] else test_time
+        return typical + self.pass_pause
+
+    def begin_metrics(self, test) -> RunMetrics:
+        if self.metrics is None:
+            self.metrics = RunMetrics()
+        self.metrics.begin(test)
+        return self.metrics
+
     async def run(self, test, test_data_path, test_time):
-        i2c = busio.I2C(board.SCL, board.SDA)
-        mcps = {
-            26: MCP.MCP23017(i2c, address=0x26),
-            25: MCP.MCP23017(i2c, address=0x25),
-            24: MCP.MCP23017(i2c, address=0x24),
-            23: MCP.MCP23017(i2c, address=0x23),
-            22: MCP.MCP23017(i2c, address=0x22),
-            21: MCP.MCP23017(i2c, address=0x21),
-            27: MCP.MCP23017(i2c, address=0x27),
-        }
-        
-        input_pin = mcps[26].get_pin(0)
-        input_pin.direction = Direction.INPUT
-        
-        self.title = test
-        logger.debug(f"De te testen test is {test}")
-        
-        # Open the JSON file with test data
-        with open(test_data_path, 'r') as file:
-            test_data = json.load(file)
-        
-        # Open JSON files for component answers and IO configurations
-        json_data_file_path = Path(__file__).parent.parent / "test_results/testing_components_answers.json"
-        json_io_path = Path(__file__).parent / "IOLIST.json"
-        with open(json_data_file_path, 'r') as file:
-            data = json.load(file)
-        with open(json_io_path, 'r') as file:
-            data_io = json.load(file)
-        
-        if test in data:
-            connector = data[test]  # Terminals connected to the test
-            connected_io = data_io.get(test, [])  # I/O configuration for the connector
-            logger.debug(f"Connected IO: {connected_io}")
-            
-            # Loop through each terminal for the specified connector
-            for terminal in connector:
-
-                from_terminal = terminal.get('from_terminal')
-                to_part = terminal.get('to_part')
-                to_mark = terminal.get('to_mark')
-                to_terminal = terminal.get('to_terminal')
-                
-                # Match from_terminal to Conector_pin in connected_io to get mcp_adress and mcp_pin
-                # Normalize `from_terminal` to ensure it's an integer regardless of format
-                if isinstance(from_terminal, str) and from_terminal.startswith("pin "):
-                    from_terminal = int(from_terminal.split(" ")[1])
-                elif isinstance(from_terminal, str) and from_terminal.isdigit():
-                    from_terminal = int(from_terminal)
-                elif isinstance(from_terminal, int):
-                    # Already an integer, no conversion needed
-                    pass
-
-                # Now perform the matching
-                matching_io = next((io for io in connected_io if io.get("Conector_pin") == from_terminal), None)
-
-                if matching_io:
-                    mcp_adress = int(matching_io['mcp_adress'])
-                    mcp_pin = int(matching_io['mcp_pin'])  # Convert pin to integer (hex support)
-                
-                    # Ensure from_terminal is a string for consistency in test_data
-                    if isinstance(from_terminal, int):
-                        from_terminal = str(from_terminal)
-                    
-                    # Skip if already passed
-                    already_passed = any(
-                        result['terminal'] == from_terminal and result['passed'] 
-                        for result in test_data.get("test_results", {}).get(test, [])
-                    )
-                    if already_passed:
-                        logger.debug(f"Terminal {from_terminal} already passed, skipping...")
-                        continue
+        # Voor de ETA: de contact tijden van de vorige run, voordat begin_metrics ze leegmaakt
+        seconds_per_terminal = self.seconds_per_terminal(test_time)
+        metrics = self.begin_metrics(test)
+        # Bij een fout (bv. op de I2C bus) toch de probe, de lag monitor en alle pinnen loslaten
+        probe, lag = None, LoopLagMonitor()
+        try:
+            ports = await self.open_ports()
+            start = ports.stats()
+            probe = await make_probe(self.backend, ports)
+            lag.start()
+
+            self.title = test
+            logger.debug(f"De te testen test is {test}")
 
-                    # Skip if to_mark or to_part is NaN
-                    if (isinstance(to_mark, float) and math.isnan(to_mark)) or (isinstance(to_part, float) and math.isnan(to_part)):
-                        continue
+            # Resultaten gaan per terminal naar de journal; snapshot + journal is de actuele stand
+            if self.journal is None:
+                self.journal = ResultJournal(test_data_path)
+            test_data = self.journal.load()
+
+            # Eén keer per project gecompileerde opzoektabellen voor connector pinnen en antwoorden
+            index = WiringIndex.for_project()
+
+            if test in index.answers:
+                # De werklijst vooraf: geslaagde terminals eruit, gegroepeerd per mark
+                resume = plan(test, index, test_data.get("test_results", {}).get(test, []))
+                eta = resume.eta(seconds_per_terminal)
+                logger.debug(f"{test}: {resume.describe(eta)}")
+                await self.observer.plan(resume, eta)
+
+                for terminal in resume.pending:
+                    from_terminal, to_part, to_mark, to_terminal = terminal.terminal, terminal.to_part, terminal.to_mark, terminal.to_terminal
 
                     # Create a prompt instance
-                    await self.app.prompt(title=f"Testing; {test} connector" ,prompt=f"Mark: {to_mark} ({to_part}); terminal: {to_terminal} ", duration=test_time)
-
-                    # Simulate a test with a delay
-                    start_time = asyncio.get_event_loop().time()
-
-                    while True:
-                        current_time = asyncio.get_event_loop().time()
-                        elapsed_time = current_time - start_time
-
-                        output_pin = mcps[mcp_adress].get_pin(mcp_pin)
-                        output_pin.direction = Direction.OUTPUT
-                        output_pin.value = True
-
-                        if input_pin.value:
-                            output_pin.value = False
-                            output_pin.direction = Direction.INPUT
-                            await self.app.updateconatiner(True,False)
-                            self.add_result(from_terminal, True, to_mark, to_terminal)
-                            break
-                        
-                        if elapsed_time >= test_time:
-                            output_pin.value = False
-                            output_pin.direction = Direction.INPUT
-                            await self.app.updateconatiner(False,True)
-                            mcp_address, pin_number = await self.test_different_components(tested_mark=to_mark, tested_terminal=to_terminal, mcps=mcps, input_pin=input_pin)
-                            logger.debug(f"Returned mcp_address: {mcp_address}, pin_number: {pin_number}")
-                            if mcp_address is not None:
-                                gevonden_details = self.zoek_connector(data_io, data, mcp_address, pin_number)
-                                logger.debug(f"Verbonden component: {gevonden_details}")
-                                self.add_result_different_terminal(from_terminal, False, gevonden_details)
-                            else:
-                                self.add_result(from_terminal, False, to_mark, to_terminal)
-                            
-                            break
-
-                        await asyncio.sleep(0.5)
-
-                    await asyncio.sleep(2)
-                    await self.app.dismiss()
+                    self.backend.place_probe(to_mark, to_terminal)
+                    await self.observer.prompt(title=f"Testing; {test} connector" ,prompt=f"Mark: {to_mark} ({to_part}); terminal: {to_terminal} ", duration=test_time)
+
+                    # De pin hoeft maar één keer gezet te worden, daarna wachten op de probe
+                    record = metrics.start_terminal(test, from_terminal, ports.counters())
+                    await ports.drive(terminal.address, terminal.pin)
+                    with metrics.measure("contact", record):
+                        contact = await probe.wait(test_time)
+                    await ports.release()
+
+                    if contact:
+                        await self.observer.updateconatiner(True,False)
+                        self.add_result(from_terminal, True, to_mark, to_terminal)
+                    else:
+                        await self.observer.updateconatiner(False,True)
+                        with metrics.measure("locate", record):
+                            mcp_address, pin_number = await self.test_different_components(tested_mark=to_mark, tested_terminal=to_terminal, ports=ports)
+                        logger.debug(f"Returned mcp_address: {mcp_address}, pin_number: {pin_number}")
+                        gevonden_details = self.zoek_connector(index, mcp_address, pin_number) if mcp_address is not None else None
+                        if gevonden_details is not None:
+                            logger.debug(f"Verbonden component: {gevonden_details}")
+                            self.add_result_different_terminal(from_terminal, False, gevonden_details)
+                        else:
+                            self.add_result(from_terminal, False, to_mark, to_terminal)
+                    metrics.finish_terminal(record, contact, ports.counters())
+
+                    await asyncio.sleep(self.pass_pause if contact else self.result_pause)
+                    await self.observer.dismiss()
 
                     logger.debug(f"From terminal: {from_terminal}, To part: {to_part}, To mark: {to_mark}, To terminal: {to_terminal}")
-            
-            # Save updated results after processing all terminals
-            self.save_results_to_json(test_data_path)
-        else:
-            logger.debug(f"Test '{test}' not found in the JSON.")
 
-    def zoek_connector(self, data_io, data, mcp_address, mcp_pin):
+                # Save updated results after processing all terminals
+                with metrics.measure("save"):
+                    self.save_results_to_json(test_data_path)
+            else:
+                logger.debug(f"Test '{test}' not found in the JSON.")
+            bus = ports.stats(since=start)
+        finally:
+            if probe is not None:
+                probe.close()
+            event_loop = await lag.stop()
+            await self.close_ports()
+        logger.debug(f"Bus: {bus}, event loop: {event_loop}")
+        metrics.export({"bus": bus, "event_loop": event_loop})
+
+    async def run_matrix(self, test_data_path, connectors=None):
+        """
+        Test alle connectoren (of alleen `connectors`) tegelijk zonder probe:
+        elke pin wordt gestuurd en alle andere pinnen worden gelezen. Schrijft
+        per connector de resultaten weg en geeft het rapport met opens, shorts
+        en miswires terug.
+        """
+        metrics = self.begin_metrics("matrix")
+        if self.journal is None:
+            self.journal = ResultJournal(test_data_path)
+
+        index = WiringIndex.for_project()
+        try:
+            ports = await self.open_ports()
+            start = ports.stats()
+            sweep = ContinuitySweep(ports, index, WiringModel.from_project(ANSWERS_PATH, FIXTURE_PATH),
+                                    settle=self.matrix_settle(ports, index), connectors=connectors)
+            expected, observed, report = await sweep.run()
+            bus = ports.stats(since=start)
+        finally:
+            await self.close_ports()
+        logger.debug(f"Bus: {bus}")
+        self.save_matrix_results(index, expected, report, test_data_path)
+        metrics.export({"bus": bus, "report": {kind: len(pairs) for kind, pairs in report.items()}})
+        return report
+
+    async def run_stations(self, test_data_path, stations):
+        """
+        Matrix test van meerdere stations tegelijk (bv. meerdere harnassen op
+        één bank). Alle I2C toegang loopt via één BusScheduler.
+        """
+        metrics = self.begin_metrics("stations")
+        if self.journal is None:
+            self.journal = ResultJournal(test_data_path)
+
+        index = WiringIndex.for_project()
+        try:
+            ports = await self.open_ports()
+            start = ports.stats()
+            results = await sweep_stations(ports, stations, index, WiringModel.from_project(ANSWERS_PATH, FIXTURE_PATH),
+                                           settle=self.matrix_settle(ports, index))
+            bus = ports.stats(since=start)
+        finally:
+            await self.close_ports()
+        logger.debug(f"Bus: {bus}")
+        for expected, observed, report in results.values():
+            self.save_matrix_results(index, expected, report, test_data_path)
+        metrics.export({"bus": bus, "stations": [station.owner for station in stations]})
+        return {owner: report for owner, (expected, observed, report) in results.items()}
+
+    def matrix_settle(self, ports, index: WiringIndex) -> float:
+        """Gekalibreerde wachttijd voor de matrix test, anders die uit het fixture profiel."""
+        if not self.calibration.calibrated:
+            return index.table.matrix_settle
+        return self.calibration.settle(ports.ports)
+
+    async def calibrate(self, path=CALIBRATION_PATH, samples: int = 3) -> Calibration:
+        """
+        Meet de settle tijden van de bank en slaat ze op. De kast moet goed
+        aangesloten zijn: de verbindingen uit het schema worden ook gemeten.
+        """
+        index = WiringIndex.for_project()
+        try:
+            ports = await self.open_ports()
+            expected = ContinuitySweep(ports, index, WiringModel.from_project(ANSWERS_PATH, FIXTURE_PATH)).expected()
+            pairs = [(driver, receiver) for driver, receivers in expected.items() for receiver in receivers]
+            self.calibration = await calibrate(ports, pairs, samples=samples)
+        finally:
+            await self.close_ports()
+        self.calibration.save(path)
+        logger.debug(f"Kalibratie opgeslagen in {path}")
+        return self.calibration
+
+    def save_matrix_results(self, index, expected, report, test_data_path):
+        """Schrijft per connector pin een resultaat van de matrix test weg."""
+        # Bevindingen per connector pin, leesbaar voor de operator
+        descriptions = {"opens": "open to", "shorts": "short to", "miswires": "wrongly connected to"}
+        findings = {}
+        for kind, pairs in report.items():
+            for pair in pairs:
+                for side, other in ((pair["from"], pair["to"]), (pair["to"], pair["from"])):
+                    findings.setdefault((side["Connector"], side["Conector_pin"]), []).append(
+                        f"{descriptions[kind]} connector {other['Connector']} pin {other['Conector_pin']}"
+                    )
+
+        results = {}
+        for address, (connector, connector_pin) in index.connectors.items():
+            key = (connector, connector_pin)
+            if key in findings:
+                results.setdefault(connector, []).append((normalize_terminal(connector_pin), False, findings[key]))
+            elif expected.get(address):
+                # Pinnen zonder verwachte partner kan de matrix niet bevestigen
+                results.setdefault(connector, []).append((normalize_terminal(connector_pin), True, []))
+
+        for connector, connector_results in results.items():
+            self.title = connector
+            self.results = []
+            for terminal, passes, connector_findings in connector_results:
+                self.add_result_continuity(terminal, passes, connector_findings)
+            with self.metrics.measure("save"):
+                self.save_results_to_json(test_data_path)
+
+    def zoek_connector(self, index, mcp_address, mcp_pin):
         """
         Zoek de connector details op basis van MCP-adres en pin-nummer.
 
         Parameters:
-            data_io (dict): De JSON data met IO informatie.
-            data (dict): De JSON data met component antwoorden.
+            index (WiringIndex): De gecompileerde opzoektabellen van het project.
             mcp_address (int): Het MCP-adres.
             mcp_pin (int): Het pin-nummer op de MCP.
 
         Returns:
             dict: Gevonden details met 'Connector', 'Conector_pin', 'to_part', 'to_mark', en 'to_terminal', of None als niets wordt gevonden.
         """
-        for connector, pins in data_io.items():
-            for pin in pins:
-                if int(pin['mcp_adress']) == mcp_address and int(pin['mcp_pin']) == mcp_pin:
-                    # Zoek in de data file waar deze connector eigenlijk heen zou moeten gaan
-                    for test, terminals in data.items():
-                        for terminal in terminals:
-                            if terminal['from_terminal'] == pin['Conector_pin']:
-                                return {
-                                    "Connector": connector,
-                                    "Conector_pin": pin['Conector_pin'],
-                                    "to_part": terminal['to_part'],
-                                    "to_mark": terminal['to_mark'],
-                                    "to_terminal": terminal['to_terminal']
-                                }
-        return None
-
-    async def test_different_components(self, tested_mark, tested_terminal, mcps, input_pin):
-        logger.debug(f"Starten met het testen van andere componenten voor mark: {tested_mark}, terminal: {tested_terminal}"), 
-
-        # Loop door alle MCP modules
-        logger.debug("Looping door alle MCP modules")
-        logger.debug(f"mcps: {mcps}")
-        logger.debug(f"mcp: {mcps.items()}")
-        for mcp_address, mcp in mcps.items():
-            logger.debug(f"Controleren MCP module op adres {mcp_address}")
-            for pin_number in range(16):  # MCP23017 heeft 16 pinnen
-                if mcp_address == 26 and pin_number == 0:
-                    continue
-                test_pin = mcp.get_pin(pin_number)
-                test_pin.direction = Direction.OUTPUT
-                
-                # Zet de pin hoog
-                test_pin.value = True
-                await asyncio.sleep(0.1)  # Kleine vertraging om het signaal te stabiliseren
-                
-                # Controleer de input
-                if input_pin.value:
-                    logger.debug(f"Verbonden component gevonden op MCP {mcp_address}, pin {pin_number}")
-                    
-                    # Zet pin weer laag
-                    test_pin.value = False
-                    test_pin.direction = Direction.INPUT
-                    
-                    # Return de gevonden verbinding en stop de test
-                    return mcp_address, pin_number
-
-                # Zet pin weer laag
-                test_pin.value = False
-                test_pin.direction = Direction.INPUT
-
-        logger.debug("Geen andere verbonden componenten gevonden")
-        return None, None
+        return index.locate(mcp_address, mcp_pin)
+
+    async def test_different_components(self, tested_mark, tested_terminal, ports):
+        logger.debug(f"Starten met het testen van andere componenten voor mark: {tested_mark}, terminal: {tested_terminal}")
+
+        # Standaard bisectie over groepen pinnen, lineaire scan als fallback
+        locate = LOCATORS.get(self.locate_mode, locate_linear)
+        if self.calibration.calibrated:
+            settle = self.calibration.settle_times(ports.ports, receiver=ports.probe[0])
+        else:
+            settle = WiringIndex.for_project().table.settle
+        mcp_address, pin_number = await locate(ports, settle=settle)
+        logger.debug(f"I2C transacties: {ports.counters()}")
+        return mcp_address, pin_number
 
 # Rest van je script blijft hetzelfde
 
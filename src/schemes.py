@@ -0,0 +1,27 @@
+import logging
+from pathlib import Path
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+SCHEMES_DIR = Path(__file__).parent.parent / "electrical_schemes"
+
+# (schema, werkboek in electrical_schemes/)
+testers = [
+    ("S25", "Cable & cabinet assembly list S25.xlsx"),
+    ("E25", "Cable & cabinet assembly list E25.xlsx"),
+    ("F25", "Cable & cabinet assembly list F25.xlsx"),
+    ("E40", "Cable & cabinet assembly list E40 S7-1500 PLC.xlsx"),
+    ("G40", "Cable & extruder assembly list G40.xlsx"),
+    ("E50", "Cable & cabinet assembly list E50.xlsx")
+]
+
+
+def scheme_file(scheme: str) -> str | None:
+    """Het werkboek van een schema, of None als het schema niet bestaat."""
+    return dict(testers).get(scheme)
+
+
+def scheme_of(workbook: str) -> str | None:
+    """Het schema van een werkboek, of None als het werkboek niet geregistreerd is."""
+    return next((scheme for scheme, file in testers if file == workbook), None)
@@ -0,0 +1,233 @@
+import json
+import logging
+import time
+from pathlib import Path
+
+from io_backend import IOBackend
+from fixture_profile import FixtureProfile, load_io
+from utils import normalize_terminal
+from wiring_graph import WiringGraph
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+class WiringModel:
+    """
+    Deterministisch model van de bedrading in de kast.
+
+    Knopen zijn (mark, terminal) paren, draden zijn verbindingen tussen twee
+    knopen. Elke tester pin (mcp_adress, mcp_pin) landt op een knoop; de probe
+    input uit het fixture profiel landt op de terminal waar de operator hem
+    op houdt. Een input leest hoog als er in hetzelfde net een pin hoog wordt
+    gestuurd.
+    """
+
+    def __init__(self, probe: tuple | None = None):
+        # Zonder probe: die van het standaard profiel
+        self.probe = tuple(probe) if probe is not None else tuple(FixtureProfile.load().probe)
+        self.wires = {}  # knoop -> set van knopen
+        self.pin_nodes = {}  # (mcp_adress, mcp_pin) -> knoop
+        self._nets = None
+
+    @staticmethod
+    def node(mark, terminal) -> tuple:
+        return str(mark), normalize_terminal(terminal)
+
+    @classmethod
+    def from_project(cls, answers_path: Path, io_path: Path, connections_path: Path | None = None):
+        """Bouwt het model uit testing_components_answers.json (plus connections.wgraph/.json) en de pin map (IOLIST.json of fixture.json)."""
+        data_io, probe = load_io(io_path)
+        model = cls(probe)
+        with open(answers_path, "r") as file:
+            answers = json.load(file)
+        model.add_connections(answers)
+        if connections_path is not None and Path(connections_path).suffix == ".wgraph":
+            graph = WiringGraph.load(connections_path)
+            model.add_connections(graph.to_dict())
+            graph.close()
+        elif connections_path is not None:
+            with open(connections_path, "r") as file:
+                model.add_connections(json.load(file))
+
+        for connector, pins in data_io.items():
+            for pin in pins:
+                address = (int(pin["mcp_adress"]), int(pin["mcp_pin"]))
+                if address == model.probe:
+                    continue
+                model.land(address, cls.node(connector, pin["Conector_pin"]))
+        return model
+
+    def add_connections(self, connections: dict):
+        for mark, terminals in connections.items():
+            for terminal in terminals:
+                to_node = self.node(terminal["to_mark"], terminal["to_terminal"])
+                if not to_node[1]:
+                    continue  # Vrije terminal zonder draad
+                self.connect(self.node(mark, terminal["from_terminal"]), to_node)
+
+    def land(self, pin: tuple, node: tuple):
+        self.pin_nodes[pin] = node
+        self._nets = None
+
+    def connect(self, a: tuple, b: tuple):
+        self.wires.setdefault(a, set()).add(b)
+        self.wires.setdefault(b, set()).add(a)
+        self._nets = None
+
+    def disconnect(self, node: tuple):
+        """Haalt alle draden van een knoop los (open verbinding)."""
+        for other in self.wires.pop(node, set()):
+            self.wires[other].discard(node)
+        self._nets = None
+
+    def miswire(self, node: tuple, wrong_node: tuple):
+        """Legt de draad van `node` op een verkeerde terminal."""
+        self.disconnect(node)
+        self.connect(node, wrong_node)
+
+    def place_probe(self, mark, terminal):
+        self.land(self.probe, self.node(mark, terminal))
+
+    def net(self, node: tuple):
+        if self._nets is None:
+            self._build_nets()
+        return self._nets.get(node, node)
+
+    def _build_nets(self):
+        # Verbonden componenten via een eenvoudige flood fill
+        self._nets = {}
+        for start in self.wires:
+            if start in self._nets:
+                continue
+            stack = [start]
+            self._nets[start] = start
+            while stack:
+                for other in self.wires[stack.pop()]:
+                    if other not in self._nets:
+                        self._nets[other] = start
+                        stack.append(other)
+
+
+class SimulatedInterruptLine:
+    """INT lijn van een gesimuleerde expander; `fire` roept de callback direct aan."""
+
+    def __init__(self):
+        self.callback = None
+
+    def start(self, callback):
+        self.callback = callback
+
+    def stop(self):
+        self.callback = None
+
+    def fire(self):
+        if self.callback is not None:
+            self.callback()
+
+
+class SimulatedMCP23017:
+    """Een MCP23017 met de I/O en interrupt registers, gekoppeld aan een WiringModel."""
+
+    def __init__(self, backend: "SimulatedBackend", address: int):
+        self.backend = backend
+        self.address = address
+        self._iodir = 0xFFFF
+        self.olat = 0x0000
+        self.interrupt_enable = 0x0000
+        self.interrupt_configuration = 0x0000
+        self.default_value = 0x0000
+        self.io_control = 0x00
+
+    @property
+    def gpio(self) -> int:
+        self.backend.transaction()
+        return self.backend.levels(self.address)
+
+    @gpio.setter
+    def gpio(self, value: int):
+        self.backend.transaction()
+        self.olat = value
+        self.backend.changed()
+
+    @property
+    def iodir(self) -> int:
+        return self._iodir
+
+    @iodir.setter
+    def iodir(self, value: int):
+        self.backend.transaction()
+        self._iodir = value
+        self.backend.changed()
+
+    def clear_ints(self):
+        pass
+
+    def interrupt_pending(self) -> bool:
+        # Alleen de compare-met-DEFVAL modus (INTCON = 1) wordt gesimuleerd
+        mask = self.interrupt_enable & self.interrupt_configuration
+        return bool((self.backend.levels(self.address) ^ self.default_value) & mask)
+
+
+class SimulatedBackend(IOBackend):
+    """In-memory tester: elke read wordt uitgerekend uit het bedradingsmodel."""
+
+    def __init__(self, model: WiringModel, operator: bool = True, interrupts: bool = True, bus_delay: float = 0.0,
+                 bus_error_at: int | None = None):
+        self.model = model
+        self.operator = operator  # Zet de probe zelf op de gevraagde terminal
+        self.interrupts = interrupts  # False: geen INT lijn, zoals een bord zonder interrupt draad
+        self.bus_delay = bus_delay  # Blokkerende tijd per register transactie, zoals een echte I2C bus
+        self.bus_error_at = bus_error_at  # Eén OSError op deze transactie (1 = de eerste), zoals een storing op de bus
+        self.transactions = 0
+        self.driven_at_error = None  # Per adres de hoog gestuurde pinnen op het moment van de fout
+        self.mcps = {}
+        self.lines = {}
+
+    def open(self) -> dict:
+        self.mcps = {address: SimulatedMCP23017(self, address) for address in self.addresses}
+        return self.mcps
+
+    def place_probe(self, mark, terminal):
+        if self.operator:
+            self.model.place_probe(mark, terminal)
+            self.changed()
+
+    def interrupt_line(self, address: int):
+        if not self.interrupts:
+            return None
+        return self.lines.setdefault(address, SimulatedInterruptLine())
+
+    def transaction(self):
+        self.transactions += 1
+        if self.transactions == self.bus_error_at:
+            self.driven_at_error = self.driven()
+            raise OSError(121, "Remote I/O error (simulated)")
+        if self.bus_delay:
+            time.sleep(self.bus_delay)
+
+    def driven(self) -> dict:
+        """Per adres het masker van de pinnen die nu hoog gestuurd worden."""
+        return {address: ~mcp.iodir & mcp.olat & 0xFFFF for address, mcp in self.mcps.items()}
+
+    def changed(self):
+        """Na elke verandering op de lijnen: interrupts afvuren waar nodig."""
+        for address, line in self.lines.items():
+            mcp = self.mcps.get(address)
+            if mcp is not None and line.callback is not None and mcp.interrupt_pending():
+                line.fire()
+
+    def levels(self, address: int) -> int:
+        high_nets = set()
+        for other, mcp in self.mcps.items():
+            driven = ~mcp.iodir & mcp.olat & 0xFFFF
+            for pin in range(16):
+                if driven >> pin & 1 and (other, pin) in self.model.pin_nodes:
+                    high_nets.add(self.model.net(self.model.pin_nodes[(other, pin)]))
+
+        mcp = self.mcps[address]
+        value = ~mcp.iodir & mcp.olat & 0xFFFF  # Outputs lezen hun eigen latch terug
+        for pin in range(16):
+            node = self.model.pin_nodes.get((address, pin))
+            if mcp.iodir >> pin & 1 and node is not None and self.model.net(node) in high_nets:
+                value |= 1 << pin
+        return value
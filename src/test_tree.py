@@ -4,17 +4,13 @@ from pathlib import Path
 from rich.progress import BarColumn, Progress
 import asyncio
 from textual.containers import Container, Horizontal
-from run_test import RunTest
 
 from textual.app import App, ComposeResult
-from textual.containers import Container
 from textual.widgets import Tree, Button, Static
-import json
 from textual import on
 from utils import read_css
-from create_test_project import CreateProject  # Zorg ervoor dat je deze import toevoegt
-
-logging.getLogger(__name__)
+from result_journal import ResultJournal
+from result_store import PAGE_SIZE
 
 logger = logging.getLogger(__name__)
 
@@ -33,44 +29,30 @@ class TestTree(Container):
         self.testers = testers
         self.selected_scheme = selected_scheme
         self.json_file = Path(__file__).parent.parent / "test_results/test_results.json"
-        self.load_json_data()
-
-    def load_json_data(self):
-        with open(self.json_file, "r") as file:
-            self.test_data = json.load(file)
-            self.cabinet_name = self.test_data.get("cabinet_name", "Unknown Cabinet")
-            self.test_results = self.test_data.get("test_results", {})
+        # Resultaten van de lopende run die nog niet in de store staan (die komen er per connector in)
+        self.live = {}
 
     def compose(self) -> ComposeResult:
-        tree: Tree[dict] = Tree(self.cabinet_name)
+        # Alleen de connectoren met hun telling; de terminals worden pas geladen als een connector uitklapt
+        self.store = self.app.store
+        self.run_id = self.app.run_id
+        tree: Tree[dict] = Tree(self.store.run(self.run_id)["cabinet_name"])
         tree.root.expand()
+        self.result_tree = tree
+        self.parent_nodes = {}
+        self.leaf_nodes = {}
+        self.loaded = {}  # test -> aantal geladen resultaten uit de store
+        self.more_nodes = {}
 
-        for test_name, results in self.test_results.items():
-            if not results:
-                # Als er geen resultaten zijn, markeer als MISSING
-                parent_status = TestStatus.MISSING.value
-            else:
-                # Controleer of alle tests in dit hoofdstuk geslaagd zijn
-                all_passed = all(result['passed'] for result in results)
-                parent_status = TestStatus.PASS.value if all_passed else TestStatus.FAIL.value
-
-            # Voeg de parent node toe met de juiste status
-            parent_node = tree.root.add(f"{parent_status} {test_name}", data=test_name)
-            
-            for result in results:
-                status = TestStatus.PASS.value if result['passed'] else TestStatus.FAIL.value
-                leaf_node = parent_node.add_leaf(f"{status} Terminal {result['terminal']}", data=result)
-                
-                # Als de test niet is geslaagd, voeg dan een extra leaf toe met het juiste antwoord
-                if not result['passed']:
-                    leaf_node.expand()
-                    leaf_node.add_leaf(f"{result['answer']}", data=result['answer'])
+        for row in self.store.summary(self.run_id):
+            self.add_parent(row["test"], row["total"], row["failed"])
 
         yield tree
 
         yield Horizontal(
             Horizontal(
                 Button("Run_test", id="run_test", disabled=True, variant="default"),
+                Button("Matrix test", id="matrix_test", variant="primary"),
                 Button("Clear project", id="clear_project", variant="warning"),
                 id="left-buttons"
             ),
@@ -83,6 +65,98 @@ class TestTree(Container):
             id="horizontal_tree"
         )
 
+    def add_parent(self, test_name, total, failed):
+        node = self.result_tree.root.add(self.parent_label(test_name, total, failed), data=test_name, allow_expand=total > 0)
+        self.parent_nodes[test_name] = node
+        return node
+
+    def parent_label(self, test_name, total, failed) -> str:
+        if not total:
+            # Als er geen resultaten zijn, markeer als MISSING
+            parent_status = TestStatus.MISSING.value
+        else:
+            # Alle tests in dit hoofdstuk geslaagd?
+            parent_status = TestStatus.PASS.value if not failed else TestStatus.FAIL.value
+        return f"{parent_status} {test_name}"
+
+    def add_leaf(self, test_name, result):
+        status = TestStatus.PASS.value if result['passed'] else TestStatus.FAIL.value
+        leaf_node = self.parent_nodes[test_name].add_leaf(f"{status} Terminal {result['terminal']}", data=result)
+        self.leaf_nodes[(test_name, result['terminal'])] = leaf_node
+        
+        # Als de test niet is geslaagd, voeg dan een extra leaf toe met het juiste antwoord
+        if not result['passed']:
+            leaf_node.expand()
+            leaf_node.add_leaf(f"{result['answer']}", data=result['answer'])
+
+    def load_page(self, test_name):
+        """Laadt de volgende pagina terminals van een connector uit de store."""
+        offset = self.loaded.get(test_name, 0)
+        rows = self.store.page(self.run_id, test_name, offset=offset, limit=PAGE_SIZE)
+        self.loaded[test_name] = offset + len(rows)
+
+        more = self.more_nodes.pop(test_name, None)
+        if more is not None:
+            more.remove()
+        live = self.live.get(test_name, {})
+        for result in rows:
+            self.add_leaf(test_name, live.get(result['terminal'], result))
+
+        if len(rows) == PAGE_SIZE:
+            self.more_nodes[test_name] = self.parent_nodes[test_name].add_leaf("… load more", data=None)
+        else:
+            # Laatste pagina: live resultaten van terminals die nog niet in de store staan
+            for terminal, result in live.items():
+                if (test_name, terminal) not in self.leaf_nodes:
+                    self.add_leaf(test_name, result)
+
+    @on(Tree.NodeExpanded)
+    def on_node_expanded(self, event: Tree.NodeExpanded) -> None:
+        test_name = event.node.data
+        if event.node.parent is event.node.tree.root and test_name not in self.loaded:
+            self.load_page(test_name)
+
+    @on(Tree.NodeSelected)
+    def on_node_selected(self, event: Tree.NodeSelected) -> None:
+        for test_name, node in self.more_nodes.items():
+            if node is event.node:
+                self.load_page(test_name)
+                break
+
+    def on_result(self, test_name, subtest) -> None:
+        """
+        Verwerkt één nieuw resultaat tijdens een run: alleen de betreffende
+        leaf en de status van de parent worden bijgewerkt, uitgeklapte nodes
+        en de cursor blijven staan.
+        """
+        result = {"terminal": subtest.terminal, "passed": subtest.passes, "answer": subtest.answer}
+        self.live.setdefault(test_name, {})[subtest.terminal] = result
+        statuses = self.store.statuses(self.run_id, test_name)
+        statuses.update({terminal: live['passed'] for terminal, live in self.live[test_name].items()})
+        total, failed = len(statuses), sum(not passed for passed in statuses.values())
+
+        if test_name not in self.parent_nodes:
+            self.add_parent(test_name, total, failed)
+        parent_node = self.parent_nodes[test_name]
+        parent_node.set_label(self.parent_label(test_name, total, failed))
+        parent_node.allow_expand = True
+        if test_name not in self.loaded:
+            # Nog niet uitgeklapt: de terminals komen bij het uitklappen uit de store en `live`
+            return
+
+        leaf_node = self.leaf_nodes.get((test_name, subtest.terminal))
+        if leaf_node is None:
+            self.add_leaf(test_name, result)
+            return
+
+        status = TestStatus.PASS.value if result['passed'] else TestStatus.FAIL.value
+        leaf_node.data = result
+        leaf_node.set_label(f"{status} Terminal {result['terminal']}")
+        leaf_node.remove_children()
+        if not result['passed']:
+            leaf_node.expand()
+            leaf_node.add_leaf(f"{result['answer']}", data=result['answer'])
+
     @on(Tree.NodeHighlighted)
     async def on_node_highlighted(self, event: Tree.NodeHighlighted) -> None:
         logger.debug(event.node)
@@ -99,9 +173,24 @@ class TestTree(Container):
     async def runtest(self, event: Button.Pressed) -> None:
         logger.debug(self.selected_node)
         logger.debug(self.app)
-        tester = RunTest(app=self.app)
+        # De test engine (en later de hardware libraries) pas laden als er getest wordt
+        from run_test import RunTest
+
+        tester = RunTest(observer=self.app, journal=ResultJournal(self.json_file, fsync=self.app.journal_fsync), listeners=[self.on_result], metrics=self.app.metrics, session=self.app.hardware,
+                         store=self.store, run_id=self.run_id)
         await tester.run(self.selected_node, self.json_file,test_time=self.app.test_time)
-        self.redraw()
+
+    @on(Button.Pressed, "#matrix_test")
+    async def matrixtest(self, event: Button.Pressed) -> None:
+        from run_test import RunTest
+
+        tester = RunTest(observer=self.app, journal=ResultJournal(self.json_file, fsync=self.app.journal_fsync), listeners=[self.on_result], metrics=self.app.metrics, session=self.app.hardware,
+                         store=self.store, run_id=self.run_id)
+        if self.app.stations:
+            report = await tester.run_stations(self.json_file, self.app.stations)
+        else:
+            report = await tester.run_matrix(self.json_file)
+        logger.debug(f"Matrix test: {report}")
 
     @on(Button.Pressed, "#clear_project")
     async def clear_project(self, event: Button.Pressed) -> None:
@@ -109,14 +198,9 @@ class TestTree(Container):
             logger.error("No scheme selected")
             return
 
-        # Create a new project based on the selected scheme
-        for tester in self.testers:
-            if tester[0] == self.selected_scheme:
-                selected_file = tester[1]
-                logger.debug(f"Bijbehorende bestand: {selected_file}")
-                CreateProject().create(selected_file)
-                self.redraw()
-                break
+        # Het project opnieuw aanmaken gaat via de app (in een worker), die daarna een nieuwe run
+        # start en deze tree vervangt; de resultaten van de vorige run blijven in de store
+        self.app.load_project(self.selected_scheme, self.app.cabinet_serial)
 
     @on(Button.Pressed, "#plus")
     async def increase_test_time(self, event: Button.Pressed) -> None:
@@ -131,8 +215,3 @@ class TestTree(Container):
     def update_test_time_display(self):
         test_time_display = self.query_one("#test_time", Static)
         test_time_display.update(f"Test time: {self.app.test_time}s")
-
-    def redraw(self):       
-        parent = self.parent
-        self.remove()
-        parent.mount(TestTree(testers=self.testers,selected_scheme=self.selected_scheme))
\ No newline at end of file
@@ -1,28 +1,88 @@
 from pathlib import Path
 from pydantic import BaseModel, Field
-from typing import ClassVar, List
-from textual.app import App
+from typing import Callable, ClassVar, List
 import json
+import math
+
+from result_journal import ResultJournal, merge_results
+from result_store import ResultStore
 
 def read_css(path: str) -> str:
     with Path(path).open() as f:
         return f.read()
 
+def normalize_terminal(terminal) -> str:
+    """Maakt van 'pin 3', 3, 3.0 en '3' dezelfde sleutel. Lege (NaN) terminals worden ''."""
+    if isinstance(terminal, float):
+        if math.isnan(terminal):
+            return ""
+        return str(int(terminal)) if terminal.is_integer() else str(terminal)
+    terminal = str(terminal).strip()
+    if terminal.lower().startswith("pin "):
+        terminal = terminal[4:].strip()
+    return terminal
+
 class SubTest(BaseModel):
     title: str = ""
     terminal: str = ""
     passes: bool = False
     answer: str = ""
 
+class TestObserver:
+    """
+    Volgt een lopende test: de operator vragen de probe te plaatsen en de
+    uitslag tonen. Standaard doet hij niets (headless); de Textual app
+    (pop_up.HasPrompt) en de CLI vullen hem in.
+    """
+
+    async def plan(self, plan, eta: float):
+        """Voor de run start: de werklijst (resume_planner.ResumePlan) en de verwachte duur in seconden."""
+        pass
+
+    async def prompt(self, title: str, prompt: str, duration: int):
+        pass
+
+    async def updateconatiner(self, state, state_2):
+        pass
+
+    async def dismiss(self):
+        pass
+
 class BaseTest(BaseModel, arbitrary_types_allowed=True):
     title: str = ""
     description: str = ""
     passes: bool = False
     results: List[SubTest] = []
-    app: App | None = Field(
+    observer: TestObserver = Field(
+        default_factory=TestObserver,
+        exclude=True,
+    )
+    journal: ResultJournal | None = Field(
+        None,
+        exclude=True,
+    )
+    # Geschiedenis van alle kasten; bij elke save komen de resultaten van de test erin
+    store: ResultStore | None = Field(
+        None,
+        exclude=True,
+    )
+    run_id: int | None = Field(
         None,
         exclude=True,
     )
+    # Worden per resultaat aangeroepen met (title, subtest), bv. TestTree.on_result
+    listeners: List[Callable] = Field(
+        default_factory=list,
+        exclude=True,
+    )
+
+    def record(self, subtest: SubTest):
+        """Bewaart een resultaat; met een journal staat het meteen op schijf."""
+        self.results.append(subtest)
+        if self.journal is not None:
+            self.journal.append(self.title, subtest.terminal, subtest.passes, subtest.answer)
+        for listener in self.listeners:
+            listener(self.title, subtest)
     
     def add_result(self, terminal, passes: bool, to_mark, to_terminal):
         """Voegt een testresultaat toe aan de resultatenlijst."""
@@ -32,7 +92,7 @@ class BaseTest(BaseModel, arbitrary_types_allowed=True):
             passes=passes,
             answer=f"Should go to mark: {to_mark} and terminal {to_terminal}"
         )
-        self.results.append(subtest)
+        self.record(subtest)
 
     def add_result_different_terminal(self, terminal, passes: bool, gevonden_details):
         """Voegt een testresultaat toe aan de resultatenlijst."""
@@ -46,36 +106,44 @@ class BaseTest(BaseModel, arbitrary_types_allowed=True):
             passes=passes,
             answer=f"A different cable is connected to this terminal. The cable from connector {connector}, pin {connector_pin}, is currently connected. This cable should be routed to mark: {to_mark} and terminal: {to_terminal}."
         )
-        self.results.append(subtest)
+        self.record(subtest)
+
+    def add_result_continuity(self, terminal, passes: bool, findings: list):
+        """Voegt een resultaat van de onbemande matrix test toe."""
+        if passes:
+            answer = "Continuity test: all expected connections present."
+        else:
+            answer = "Continuity test: " + "; ".join(findings) + "."
+        subtest = SubTest(
+            title=f"Test for terminal {terminal}",
+            terminal=terminal,
+            passes=passes,
+            answer=answer
+        )
+        self.record(subtest)
 
     def save_results_to_json(self, json_file_path: Path):
         """Slaat de resultaten op in een JSON-bestand en werkt bestaande terminals bij."""
         if not json_file_path.exists():
             raise FileNotFoundError(f"JSON file not found: {json_file_path}")
 
-        with open(json_file_path, 'r') as file:
-            data = json.load(file)
-
-        if self.title not in data["test_results"]:
-            data["test_results"][self.title] = []
+        if self.journal is not None:
+            # Alle resultaten staan al in de journal, alleen nog compacteren
+            data = self.journal.compact()
+        else:
+            with open(json_file_path, 'r') as file:
+                data = json.load(file)
 
-        existing_terminals = {result['terminal']: result for result in data["test_results"][self.title]}
+            merge_results(data, self.title, [
+                {"terminal": result.terminal, "passed": result.passes, "answer": result.answer}
+                for result in self.results
+            ])
 
-        for result in self.results:
-            if result.terminal in existing_terminals:
-                # Update het bestaande resultaat
-                existing_terminals[result.terminal]['passed'] = result.passes
-                existing_terminals[result.terminal]['answer'] = result.answer
-            else:
-                # Voeg een nieuw resultaat toe
-                data["test_results"][self.title].append({
-                    "terminal": result.terminal,
-                    "passed": result.passes,
-                    "answer": result.answer
-                })
+            with open(json_file_path, 'w') as file:
+                json.dump(data, file, indent=4)
 
-        with open(json_file_path, 'w') as file:
-            json.dump(data, file, indent=4)
+        if self.store is not None and self.run_id is not None:
+            self.store.add_results(self.run_id, self.title, data["test_results"].get(self.title, []))
 
     async def prompt(self, title: str,  prompt: str, duration: int):
-        await self.app.prompt(title=title, prompt=prompt, duration=duration)
+        await self.observer.prompt(title=title, prompt=prompt, duration=duration)
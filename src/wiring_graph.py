@@ -0,0 +1,225 @@
+"""
+Compact binair formaat voor de verbindingen van een schema (connections.json).
+
+Alle waarden (marks, parts en terminals) staan één keer in een tabel en de
+verbindingen zijn int32 kolommen met verwijzingen naar die tabel, per mark
+gegroepeerd (CSR: `offsets[i]:offsets[i + 1]` zijn de verbindingen van mark
+i). Het bestand wordt met mmap geopend; de kolommen worden niet ingelezen
+maar direct uit de page cache gelezen, en een waarde wordt pas gedecodeerd
+als hij opgevraagd wordt. JSON is alleen nog een export:
+
+    python src/wiring_graph.py test_results/connections.wgraph connections.json
+"""
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+from array import array
+from pathlib import Path
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+GRAPH_PATH = Path(__file__).parent.parent / "test_results/connections.wgraph"
+MAGIC = b"WGRF"
+VERSION = 1
+# magic, versie, aantal waarden, bytes in de waardentabel, aantal marks, aantal verbindingen
+HEADER = struct.Struct("<4sIIIII")
+COLUMNS = ("from_terminal", "to_part", "to_mark", "to_terminal")
+
+
+def _int32(values) -> array:
+    return array("i", values)
+
+
+def _decode(token: str):
+    # De meeste waarden zijn gewone strings; die hoeven niet door de JSON parser
+    if token[0] == '"' and "\\" not in token:
+        return token[1:-1]
+    return json.loads(token)
+
+
+class WiringGraph:
+    """
+    De verbindingen van een schema als kolommen.
+
+    Een waarde wordt als JSON token bewaard (`"X33"`, `6.2`, `5`, `NaN`),
+    zodat de export precies dezelfde types geeft als connections.json.
+    """
+
+    def __init__(self, tokens, marks, offsets, columns: dict, count: int | None = None, buffer=None, views=()):
+        self._tokens = tokens  # id -> JSON token, of een functie die hem uit de mmap leest
+        self._token_count = len(tokens) if count is None else count
+        self._values = {}
+        self.mark_ids = marks
+        self.offsets = offsets
+        self.columns = columns
+        self._buffer = buffer
+        self._views = list(views)  # Alle memoryviews op de mmap, die moeten vrij voor hij dicht kan
+        self._mark_index = None
+
+    @classmethod
+    def build(cls, connections: dict) -> "WiringGraph":
+        """Uit een connections dict zoals CreateProject.organize_connections die maakt."""
+        builder = GraphBuilder()
+        for mark, terminals in connections.items():
+            builder.add_mark(mark)
+            for terminal in terminals:
+                builder.add(mark, terminal)
+        return builder.build()
+
+    def __len__(self) -> int:
+        return self.offsets[-1]
+
+    def value(self, value_id: int):
+        if value_id not in self._values:
+            self._values[value_id] = _decode(self._token(value_id))
+        return self._values[value_id]
+
+    def marks(self) -> list:
+        return [self.value(mark_id) for mark_id in self.mark_ids]
+
+    def edges(self, mark) -> list:
+        """De verbindingen van één mark als dicts, zoals in connections.json."""
+        if self._mark_index is None:
+            self._mark_index = {self._token(mark_id): i for i, mark_id in enumerate(self.mark_ids)}
+        i = self._mark_index.get(json.dumps(mark))
+        if i is None:
+            return []
+        return [self._edge(position) for position in range(self.offsets[i], self.offsets[i + 1])]
+
+    def to_dict(self) -> dict:
+        """Alle verbindingen als connections dict (voor de JSON export)."""
+        return {
+            self.value(mark_id): [self._edge(position) for position in range(self.offsets[i], self.offsets[i + 1])]
+            for i, mark_id in enumerate(self.mark_ids)
+        }
+
+    def export_json(self, path: Path):
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=4)
+
+    def to_bytes(self) -> bytes:
+        tokens = [self._token(i).encode() for i in range(self._token_count)]
+        token_offsets = [0]
+        for token in tokens:
+            token_offsets.append(token_offsets[-1] + len(token))
+        table = b"".join(tokens)
+        padding = b"\0" * (-len(table) % 4)  # De int32 kolommen op een veelvoud van 4 bytes
+        return b"".join([
+            HEADER.pack(MAGIC, VERSION, len(tokens), len(table) + len(padding), len(self.mark_ids), len(self)),
+            _int32(token_offsets).tobytes(),
+            table, padding,
+            bytes(self.mark_ids),
+            bytes(self.offsets),
+            *(bytes(self.columns[column]) for column in COLUMNS),
+        ])
+
+    def save(self, path: Path = GRAPH_PATH):
+        tmp_path = Path(path).with_suffix(".tmp")
+        with open(tmp_path, "wb") as file:
+            file.write(self.to_bytes())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path = GRAPH_PATH) -> "WiringGraph":
+        """Opent een graph bestand met mmap; de kolommen zijn int32 views op het bestand."""
+        with open(path, "rb") as file:
+            buffer = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls.from_buffer(buffer)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "WiringGraph":
+        magic, version, count, table_size, mark_count, edge_count = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a wiring graph (version {VERSION}): {magic!r} v{version}")
+        if sys.byteorder != "little":
+            raise ValueError("Wiring graphs are little endian; load them on a little endian machine")
+
+        view = memoryview(buffer)
+        views = [view]
+        position = HEADER.size
+
+        def int32(length):
+            nonlocal position
+            column = view[position:position + length * 4].cast("i")
+            views.append(column)
+            position += length * 4
+            return column
+
+        token_offsets = int32(count + 1)
+        table_start = position
+        position += table_size
+
+        def token(value_id: int) -> str:
+            return bytes(view[table_start + token_offsets[value_id]:table_start + token_offsets[value_id + 1]]).decode()
+
+        marks = int32(mark_count)
+        offsets = int32(mark_count + 1)
+        columns = {column: int32(edge_count) for column in COLUMNS}
+        return cls(token, marks, offsets, columns, count=count, buffer=buffer, views=views)
+
+    def close(self):
+        """Geeft de mmap vrij; daarna is de graph niet meer te gebruiken."""
+        if self._buffer is None:
+            return
+        for view in reversed(self._views):
+            view.release()
+        self._tokens = self.mark_ids = self.offsets = self.columns = None
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+        self._buffer = None
+
+    def _token(self, value_id: int) -> str:
+        if callable(self._tokens):
+            return self._tokens(value_id)
+        return self._tokens[value_id]
+
+    def _edge(self, position: int) -> dict:
+        return {column: self.value(self.columns[column][position]) for column in COLUMNS}
+
+
+class GraphBuilder:
+    """
+    Bouwt een WiringGraph verbinding voor verbinding, bv. uit een streaming
+    import. Per mark worden alleen vier int32 ids per verbinding bewaard.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.tokens = []
+        self.groups = {}  # mark id -> array met 4 ids per verbinding, in volgorde van eerste voorkomen
+
+    def intern(self, value) -> int:
+        token = json.dumps(value)
+        value_id = self.ids.get(token)
+        if value_id is None:
+            value_id = self.ids[token] = len(self.tokens)
+            self.tokens.append(token)
+        return value_id
+
+    def add_mark(self, mark) -> array:
+        # Marks zijn sleutels, dus altijd strings zoals in JSON (een lege mark wordt "NaN")
+        key = mark if isinstance(mark, str) else next(iter(json.loads(json.dumps({mark: None}))))
+        mark_id = self.intern(key)
+        group = self.groups.get(mark_id)
+        if group is None:
+            group = self.groups[mark_id] = array("i")
+        return group
+
+    def add(self, mark, terminal: dict):
+        self.add_mark(mark).extend(self.intern(terminal[column]) for column in COLUMNS)
+
+    def build(self) -> WiringGraph:
+        offsets, columns = [0], {column: array("i") for column in COLUMNS}
+        for group in self.groups.values():
+            for i, column in enumerate(COLUMNS):
+                columns[column].extend(group[i::len(COLUMNS)])
+            offsets.append(offsets[-1] + len(group) // len(COLUMNS))
+        return WiringGraph(self.tokens, _int32(self.groups), _int32(offsets), columns)
+
+
+if __name__ == "__main__":
+    WiringGraph.load(Path(sys.argv[1])).export_json(Path(sys.argv[2]))
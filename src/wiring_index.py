@@ -0,0 +1,110 @@
+import json
+import logging
+from pathlib import Path
+
+from fixture_profile import FixtureProfile, PinTable, FIXTURE_PATH
+from utils import normalize_terminal
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+ANSWERS_PATH = Path(__file__).parent.parent / "test_results/testing_components_answers.json"
+IO_PATH = Path(__file__).parent / "IOLIST.json"
+
+
+class WiringIndex:
+    """
+    Gecompileerde opzoektabellen voor één project.
+
+    Wordt één keer opgebouwd uit testing_components_answers.json en de
+    gecompileerde PinTable van het project (fixture.json), met
+    genormaliseerde terminal sleutels ('pin 3', 3 en '3' zijn hetzelfde):
+
+        (connector, terminal)   -> (mcp_adress, mcp_pin)
+        (mcp_adress, mcp_pin)   -> (connector, Conector_pin)
+        (connector, terminal)   -> verwachte bestemming uit het antwoordenbestand
+
+    Het run pad (`terminals` en `locate`) leest direct uit de PinTable.
+    """
+
+    _cache = {}
+
+    def __init__(self, data: dict, data_io: dict, table: PinTable | None = None):
+        self.answers = data
+        if table is None:
+            table = PinTable.compile(FixtureProfile(marks=list(data), connectors=data_io), data)
+        self.table = table
+        self.pins = {}
+        self.connectors = {}
+        self.expected = {}
+
+        for connector, pins in data_io.items():
+            for pin in pins:
+                if pin["Conector_pin"] == "NaN":
+                    continue  # De probe zelf
+                address = (int(pin["mcp_adress"]), int(pin["mcp_pin"]))
+                key = (connector, normalize_terminal(pin["Conector_pin"]))
+                self.pins[key] = address
+                self.connectors[address] = (connector, pin["Conector_pin"])
+
+        for connector, terminals in data.items():
+            for terminal in terminals:
+                self.expected.setdefault((connector, normalize_terminal(terminal["from_terminal"])), terminal)
+
+    @classmethod
+    def for_project(cls, answers_path: Path | None = None, fixture_path: Path | None = None) -> "WiringIndex":
+        """Geeft de index van het huidige project; alleen opnieuw bouwen als een van de bestanden veranderd is."""
+        answers_path, fixture_path = answers_path or ANSWERS_PATH, fixture_path or FIXTURE_PATH
+        if not Path(fixture_path).exists():
+            # Compileren gebeurt alleen in CreateProject of met migrate, niet op het lees pad
+            raise FileNotFoundError(f"Geen {fixture_path}: laad het schema opnieuw of migreer het project met WiringIndex.migrate")
+        key = (str(answers_path), Path(answers_path).stat().st_mtime_ns, str(fixture_path), Path(fixture_path).stat().st_mtime_ns)
+        index = cls._cache.get(key)
+        if index is None:
+            with open(answers_path, "r") as file:
+                data = json.load(file)
+            table = PinTable.load(fixture_path)
+            index = cls(data, table.io, table)
+            cls._cache = {key: index}
+            logger.debug(f"Wiring index gebouwd: {len(index.pins)} pinnen, {len(index.expected)} terminals")
+        return index
+
+    @staticmethod
+    def migrate(answers_path: Path | None = None, fixture_path: Path | None = None, scheme: str | None = None) -> Path:
+        """Compileert fixture.json voor een project van voor de fixture profielen (standaard profiel, of dat van `scheme`)."""
+        answers_path, fixture_path = answers_path or ANSWERS_PATH, fixture_path or FIXTURE_PATH
+        with open(answers_path, "r") as file:
+            PinTable.compile(FixtureProfile.load(scheme), json.load(file)).save(fixture_path)
+        logger.info(f"{fixture_path} gecompileerd met het profiel van {scheme or 'default'}")
+        return Path(fixture_path)
+
+    @property
+    def probe(self) -> tuple:
+        return self.table.probe
+
+    def pin(self, connector, terminal):
+        """(mcp_adress, mcp_pin) voor een terminal van een connector, of None."""
+        return self.pins.get((connector, normalize_terminal(terminal)))
+
+    def terminals(self, test) -> list:
+        """De rijen van `test` uit de PinTable, in probe volgorde (zie PinTable)."""
+        return self.table.terminals.get(test, [])
+
+    def locate(self, mcp_address: int, mcp_pin: int):
+        """
+        Zoekt welke connector pin op een MCP pin zit en waar die draad heen zou moeten.
+
+        Returns:
+            dict: 'Connector', 'Conector_pin', 'to_part', 'to_mark' en 'to_terminal', of None.
+        """
+        found = self.table.slot(mcp_address, mcp_pin)
+        if found is None or found[2] is None:
+            return None
+        connector, connector_pin, (to_part, to_mark, to_terminal) = found
+        return {
+            "Connector": connector,
+            "Conector_pin": connector_pin,
+            "to_part": to_part,
+            "to_mark": to_mark,
+            "to_terminal": to_terminal
+        }
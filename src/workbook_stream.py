@@ -0,0 +1,108 @@
+"""
+Streaming import van het "Cable list" werkblad.
+
+Het werkblad wordt met openpyxl in read-only modus rij voor rij gelezen;
+elke rij wordt meteen omgezet in twee verbindingen (heen en terug) en
+daarna vergeten. Er staat dus nooit een heel werkblad of DataFrame in het
+geheugen, alleen wat de verbindingen zelf innemen.
+
+Cellen worden omgezet zoals pandas.read_excel dat doet (lege cellen en
+"NA"-achtige tekst worden NaN, hele getallen int). Alleen de kolom-brede
+type afleiding van pandas (een kolom met alleen getallen en lege cellen
+wordt float) wordt niet nagedaan; daarvoor moet de hele kolom eerst
+gelezen zijn. Een cel houdt hier het type dat in het werkboek staat.
+"""
+import logging
+import math
+
+logging.getLogger(__name__)
+logger = logging.getLogger(__name__)
+
+SHEET_NAMES = ("Cable list", "Cable list ")
+# pandas' standaard na_values: deze teksten worden NaN
+NA_STRINGS = frozenset({
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+    "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+})
+# (kolom van from_terminal, to_part, to_mark, to_terminal) per richting, met de kolom van de mark
+FORWARD = ("from Mark", ("From terminal", "to part", "to mark", "to terminal"))
+REVERSE = ("to mark", ("to terminal", "From Part", "from Mark", "From terminal"))
+EDGE_FIELDS = ("from_terminal", "to_part", "to_mark", "to_terminal")
+
+
+def convert_cell(cell):
+    """Een openpyxl cel als waarde, zoals pandas hem inleest."""
+    value = cell.value
+    if value is None or cell.data_type == "e":
+        return math.nan
+    if cell.data_type == "n":
+        return int(value) if int(value) == value else float(value)
+    if isinstance(value, str) and value in NA_STRINGS:
+        return math.nan
+    return value
+
+
+def _blank(row) -> bool:
+    return all(isinstance(value, float) and math.isnan(value) for value in row)
+
+
+def read_rows(path_file):
+    """
+    (werkblad naam, rijen): de rijen van het Cable list werkblad als tuples,
+    lui gelezen. Lege rijen aan het eind worden weggelaten, zoals pandas doet.
+    Geeft (None, None) als er geen Cable list werkblad is.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path_file, read_only=True, data_only=True, keep_links=False)
+    sheet_name = next((name for name in SHEET_NAMES if name in workbook.sheetnames), None)
+    if sheet_name is None:
+        workbook.close()
+        return None, None
+    sheet = workbook[sheet_name]
+    sheet.reset_dimensions()
+
+    def rows():
+        try:
+            blank = 0  # Lege rijen worden pas doorgegeven als er nog een gevulde rij volgt
+            for cells in sheet.iter_rows():
+                row = tuple(convert_cell(cell) for cell in cells)
+                if _blank(row):
+                    blank += 1
+                    continue
+                for _ in range(blank):
+                    yield ()
+                blank = 0
+                yield row
+        finally:
+            workbook.close()
+
+    return sheet_name, rows()
+
+
+def connection_edges(rows):
+    """
+    Leest de kastnaam (eerste rij, tweede kolom) en de kolomnamen (tweede
+    rij) en geeft daarna per rij de verbinding heen en terug als
+    (mark, verbinding) paren, in dezelfde volgorde als organize_connections.
+    """
+    first = next(rows, ())
+    cabinet_name = first[1] if len(first) > 1 and not _blank(first[1:2]) else "Unknown Cabinet"
+    header = next(rows, ())
+    columns = {}
+    for position, name in enumerate(header):
+        columns.setdefault(name, position)
+    missing = {name for _, fields in (FORWARD, REVERSE) for name in fields if name not in columns}
+    if missing:
+        raise KeyError(f"Cable list is missing column(s): {', '.join(sorted(missing))}")
+
+    def cell(row, name):
+        position = columns[name]
+        return row[position] if position < len(row) else math.nan
+
+    def edges():
+        for row in rows:
+            for mark_column, fields in (FORWARD, REVERSE):
+                yield cell(row, mark_column), dict(zip(EDGE_FIELDS, (cell(row, name) for name in fields)))
+
+    return cabinet_name, edges()
@@ -0,0 +1,97 @@
+"""
+Gedeelde fixtures voor de tests.
+
+De modules in src/ importeren elkaar op naam, dus src/ gaat vooraan op het
+pad. De tests gebruiken de antwoorden van het project in test_results/ met
+de SimulatedBackend in plaats van hardware; fixture.json wordt met het
+standaard profiel in een tijdelijke map gecompileerd en resultaten gaan
+ook naar een tijdelijke map.
+"""
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+import cli  # noqa: E402
+import run_test  # noqa: E402
+import wiring_index  # noqa: E402
+from calibration import Calibration  # noqa: E402
+from create_test_project import CreateProject  # noqa: E402
+from io_backend import MCP_ADDRESSES  # noqa: E402
+from simulator import WiringModel, SimulatedBackend  # noqa: E402
+from wiring_index import WiringIndex, ANSWERS_PATH  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def compiled_fixture(tmp_path_factory) -> Path:
+    """fixture.json van het project, één keer per sessie gecompileerd buiten test_results/."""
+    return WiringIndex.migrate(ANSWERS_PATH, tmp_path_factory.mktemp("project") / "fixture.json")
+
+
+@pytest.fixture(autouse=True)
+def fixture_path(compiled_fixture, monkeypatch) -> Path:
+    """Laat de modules die fixture.json lezen de gecompileerde kopie gebruiken."""
+    for module in (wiring_index, run_test, cli):
+        monkeypatch.setattr(module, "FIXTURE_PATH", compiled_fixture)
+    return compiled_fixture
+
+
+@pytest.fixture
+def index(fixture_path) -> WiringIndex:
+    return WiringIndex.for_project()
+
+
+@pytest.fixture
+def make_model(fixture_path):
+    """Een vers bedradingsmodel van het project, om fouten in te leggen."""
+    return lambda: WiringModel.from_project(ANSWERS_PATH, fixture_path)
+
+
+@pytest.fixture
+def model(make_model) -> WiringModel:
+    return make_model()
+
+
+@pytest.fixture
+def make_backend(make_model):
+    """Een verse SimulatedBackend op het project; kwargs gaan door naar SimulatedBackend."""
+    def make(model: WiringModel | None = None, **kwargs) -> SimulatedBackend:
+        return SimulatedBackend(model or make_model(), **kwargs)
+    return make
+
+
+@pytest.fixture
+def results(tmp_path, index) -> Path:
+    """Een leeg test_results.json voor alle connectoren van het project."""
+    path = tmp_path / "test_results.json"
+    with open(path, "w") as file:
+        json.dump({"cabinet_name": "test", "test_results": {connector: [] for connector in index.answers}}, file)
+    return path
+
+
+@pytest.fixture
+def calibration() -> Calibration:
+    """Een gekalibreerde bank met 1 ms settle tijd, zodat de tests niet op de vaste 0,1 s wachten."""
+    measured = {"rise": 0.0, "fall": 0.0, "samples": 1, "timeouts": 0}
+    return Calibration({address: dict(measured) for address in MCP_ADDRESSES}, minimum=0.001)
+
+
+@pytest.fixture
+def cli_args(results, tmp_path) -> list:
+    """Argumenten voor cli.main met de simulator en alles (resultaten, store, metrics) in een tijdelijke map."""
+    return ["--backend", "simulated", "--results", str(results), "--store", str(tmp_path / "results.sqlite3"),
+            "--metrics", str(tmp_path / "metrics")]
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch) -> Path:
+    """CreateProject schrijft naar een tijdelijke map in plaats van test_results/."""
+    for name in ("graph_output_path", "json_output_path", "testing_components_output_path",
+                 "testing_components_results", "fixture_output_path"):
+        monkeypatch.setattr(CreateProject, name, tmp_path / getattr(CreateProject, name).name)
+    # Niet de cache van test_results/ gebruiken: save_compiled ruimt oudere versies op
+    monkeypatch.setattr(CreateProject, "compiled_dir", tmp_path / "compiled")
+    return tmp_path
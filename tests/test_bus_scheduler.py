@@ -0,0 +1,117 @@
+"""Meerdere stations tegelijk op één bus via de BusScheduler."""
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+import cli
+from bus_scheduler import BusScheduler
+from fixture_profile import FixtureProfile, Station
+from hardware_worker import AsyncPortBank
+from result_journal import ResultJournal
+from run_test import RunTest
+
+# 21C1 en 21C2 hebben netten binnen de eigen connector, die kan een station alleen bevestigen
+STATIONS = [Station(name="A", connectors=["21C2"]), Station(name="B", connectors=["21C1"])]
+
+
+def run_stations(backend, results, calibration, stations):
+    test = RunTest(backend=backend, journal=ResultJournal(results), calibration=calibration)
+    return asyncio.run(test.run_stations(results, stations))
+
+
+def test_scheduler_merges_drives_and_reads(make_backend):
+    backend = make_backend()
+
+    async def run():
+        ports = await AsyncPortBank.open(backend)
+        scheduler = BusScheduler(ports)
+        scheduler.start()
+        try:
+            await asyncio.gather(scheduler.drive("A", {25: 0b01}), scheduler.drive("B", {25: 0b10}))
+            assert (scheduler.batches, scheduler.requests) == (1, 2)
+            assert backend.driven()[25] == 0b11
+
+            # Eén read voor iedereen die hetzelfde adres vraagt
+            reads = backend.transactions
+            first, second = await asyncio.gather(scheduler.read(25), scheduler.read(25))
+            assert first == second and backend.transactions == reads + 1
+
+            # Loslaten van A laat de pin van B staan
+            await scheduler.release("A")
+            assert backend.driven()[25] == 0b10
+        finally:
+            await scheduler.stop()
+        assert not any(backend.driven().values())
+
+    asyncio.run(run())
+
+
+def test_clean_stations(make_backend, results, calibration):
+    reports = run_stations(make_backend(), results, calibration, STATIONS)
+    assert set(reports) == {"A", "B"}
+    assert not any(any(report.values()) for report in reports.values())
+    data = json.loads(results.read_text())["test_results"]
+    assert data["21C1"] and data["21C2"] and all(result["passed"] for result in data["21C2"])
+
+
+def test_findings_stay_with_their_station(make_backend, make_model, index, results, calibration):
+    model = make_model()
+    # Twee netten van 21C2 kortsluiten
+    nets = {}
+    for pin, (connector, _) in index.connectors.items():
+        if connector == "21C2" and pin in model.pin_nodes:
+            nets.setdefault(model.net(model.pin_nodes[pin]), []).append(pin)
+    first, second = [pins for pins in nets.values() if len(pins) > 1][:2]
+    model.connect(model.pin_nodes[first[0]], model.pin_nodes[second[0]])
+    reports = run_stations(make_backend(model), results, calibration, STATIONS)
+    assert any(reports["A"].values())
+    assert not any(reports["B"].values())
+
+
+def test_probe_is_never_driven(make_backend, index, results, calibration):
+    probe = index.probe
+    backend = make_backend()
+    driven = []
+    transaction = backend.transaction
+
+    def spy():
+        driven.append(backend.driven().get(probe[0], 0) >> probe[1] & 1)
+        transaction()
+
+    backend.transaction = spy
+    run_stations(backend, results, calibration, STATIONS)
+    assert driven and not any(driven)
+
+
+def test_stations_from_profile(tmp_path):
+    (tmp_path / "default.json").write_text(json.dumps({
+        "marks": ["8C1", "20C1"], "connectors": {},
+        "stations": [{"name": "A", "connectors": ["8C1"]}, {"connectors": ["20C1"]}],
+    }))
+    profile = FixtureProfile.load(None, tmp_path)
+    assert [station.connectors for station in profile.stations] == [["8C1"], ["20C1"]]
+    assert [station.owner for station in profile.stations] == ["A", "20C1"]
+
+
+@pytest.mark.parametrize("stations", [
+    [{"connectors": ["8C1", "99C9"]}],
+    [{"connectors": ["8C1"]}, {"connectors": ["8C1"]}],
+])
+def test_invalid_stations(tmp_path, stations):
+    (tmp_path / "default.json").write_text(json.dumps({"marks": ["8C1"], "connectors": {}, "stations": stations}))
+    with pytest.raises(ValidationError):
+        FixtureProfile.load(None, tmp_path)
+
+
+def test_cli_stations(cli_args, capsys):
+    code = cli.main(["--mode", "stations", "--station", "21C2", "--station", "21C1,19C1", *cli_args])
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert code == 0
+    assert {event["test"] for event in events if event["event"] == "result"} == {"21C2", "21C1", "19C1"}
+    assert events[-1]["connectors"] == ["21C2", "21C1", "19C1"]
+
+
+def test_cli_stations_needs_stations(cli_args):
+    assert cli.main(["--mode", "stations", *cli_args]) == 2
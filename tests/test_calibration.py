@@ -0,0 +1,105 @@
+"""De kalibratie meet de settle tijd van elke expander en komt na save/load onveranderd terug."""
+import asyncio
+
+import pytest
+
+from calibration import Calibration, DEFAULT_SETTLE, _edges, calibrate
+from hardware_worker import AsyncPortBank
+from simulator import SimulatedBackend, WiringModel
+from wiring_index import ANSWERS_PATH
+
+BUS_DELAY = 0.002  # Per register transactie, dus elke gemeten flank duurt minstens zo lang
+
+
+def pair(model, connected: bool) -> tuple:
+    """Twee tester pinnen op verschillende expanders die wel of juist niet via een draad verbonden zijn."""
+    pins = sorted(model.pin_nodes)
+    return next(
+        (driver, receiver) for driver in pins for receiver in pins
+        if driver[0] != receiver[0]
+        and (model.net(model.pin_nodes[driver]) == model.net(model.pin_nodes[receiver])) == connected
+    )
+
+
+def measure(backend, **kwargs) -> Calibration:
+    async def run():
+        ports = await AsyncPortBank.open(backend)
+        return await calibrate(ports, **kwargs)
+
+    return asyncio.run(run())
+
+
+def edges(backend, driver, receiver, timeout=0.05) -> tuple:
+    async def run():
+        ports = await AsyncPortBank.open(backend)
+        return await ports.call(_edges, ports.bank, driver, receiver, timeout)
+
+    return asyncio.run(run())
+
+
+@pytest.fixture(scope="module")
+def measured(compiled_fixture) -> tuple:
+    """Eén kalibratie met bus_delay voor de hele module; elke pin is een meting, dat duurt even."""
+    backend = SimulatedBackend(WiringModel.from_project(ANSWERS_PATH, compiled_fixture), bus_delay=BUS_DELAY)
+    return backend, measure(backend, samples=1)
+
+
+def test_edges_of_a_wire(make_backend, model):
+    driver, receiver = pair(model, connected=True)
+    backend = make_backend(bus_delay=BUS_DELAY)
+    rise, fall = edges(backend, driver, receiver)
+    assert rise >= BUS_DELAY and fall >= BUS_DELAY
+    assert not any(backend.driven().values())
+
+
+def test_edges_of_an_open_pair_time_out(make_backend, model):
+    driver, receiver = pair(model, connected=False)
+    assert edges(make_backend(), driver, receiver, timeout=0.01) == (None, None)
+
+
+def test_every_expander_is_measured(measured):
+    backend, calibration = measured
+    assert calibration.calibrated and calibration.created
+    assert set(calibration.expanders) == set(backend.mcps)
+    for values in calibration.expanders.values():
+        assert values["rise"] >= BUS_DELAY and values["fall"] >= BUS_DELAY
+        assert values["samples"] and not values["timeouts"]
+
+
+def test_settle_times_per_address(measured):
+    backend, calibration = measured
+    probe = backend.model.probe[0]
+    times = calibration.settle_times(backend.mcps, probe)
+    assert set(times) == set(backend.mcps)
+    for address, settle in times.items():
+        slowest = max(max(calibration.expanders[a]["rise"], calibration.expanders[a]["fall"]) for a in {address, probe})
+        assert settle == max(calibration.minimum, slowest * calibration.margin)
+        assert settle >= BUS_DELAY * calibration.margin
+    # Een onbekende expander valt terug op de vaste wachttijd
+    assert calibration.settle({0x99}) == DEFAULT_SETTLE
+
+
+def test_open_pairs_count_as_timeouts(make_backend, model):
+    driver, receiver = pair(model, connected=False)
+    backend = make_backend()
+    calibration = measure(backend, pairs=[(driver, receiver)], samples=2, timeout=0.01)
+    assert calibration.expanders[driver[0]]["timeouts"] == 2
+    assert calibration.expanders[receiver[0]]["timeouts"] == 2
+
+
+def test_save_and_load(measured, tmp_path):
+    backend, calibration = measured
+    path = tmp_path / "calibration.json"
+    calibration.save(path)
+    loaded = Calibration.load(path)
+    assert loaded.expanders == calibration.expanders
+    assert (loaded.margin, loaded.minimum, loaded.default, loaded.created) == \
+        (calibration.margin, calibration.minimum, calibration.default, calibration.created)
+    assert loaded.settle_times(backend.mcps, backend.model.probe[0]) == calibration.settle_times(backend.mcps, backend.model.probe[0])
+
+
+def test_load_without_a_calibration(tmp_path):
+    assert not Calibration.load(tmp_path / "calibration.json").calibrated
+    (tmp_path / "broken.json").write_text("{")
+    broken = Calibration.load(tmp_path / "broken.json")
+    assert not broken.calibrated and broken.settle({26}) == DEFAULT_SETTLE
@@ -0,0 +1,61 @@
+"""De headless tester schrijft alleen JSON regels naar stdout, ook als hij eerst een schema laadt."""
+import json
+
+import pytest
+
+import cli
+import wiring_index
+from create_test_project import CreateProject
+from fixture_profile import FixtureProfile
+from result_store import ResultStore
+from schemes import scheme_file
+
+
+def test_create_project_keeps_stdout_clean(project, capsys):
+    assert CreateProject().create(scheme_file("F25"))
+    assert capsys.readouterr().out == ""
+    assert json.loads((project / "test_results.json").read_text())["test_results"]
+
+
+def test_failed_project_exits_2(project, cli_args, monkeypatch, capsys):
+    # Resultaten van het vorige project staan er nog; daarmee mag niet getest worden
+    monkeypatch.setattr(CreateProject, "create", lambda self, path_file: None)
+    code = cli.main(["--scheme", "S25", "--test-time", "0.05", *cli_args])
+    assert code == 2
+    assert capsys.readouterr().out == ""
+
+
+def test_interrupt_pin_option():
+    assert cli.parse_args(["--interrupt-pin", "26:17", "--interrupt-pin", "25:27"]).interrupt_pin == [(26, 17), (25, 27)]
+    with pytest.raises(SystemExit):
+        cli.parse_args(["--interrupt-pin", "26"])
+    assert cli.make_backend("hardware", None, {26: 17}).interrupt_line(26).bcm_pin == 17
+
+
+def test_missing_fixture_exits_2(cli_args, tmp_path, monkeypatch, capsys):
+    # Een lees pad compileert niets: zonder fixture.json stopt de tester
+    missing = tmp_path / "fixture.json"
+    monkeypatch.setattr(wiring_index, "FIXTURE_PATH", missing)
+    assert cli.main(cli_args) == 2
+    assert not missing.exists()
+    assert capsys.readouterr().out == ""
+
+
+def test_matrix_is_the_default_mode(cli_args, capsys):
+    # Zonder --mode wacht de tester niet op een operator
+    assert cli.parse_args([]).mode == "matrix"
+    assert cli.main(["--connector", "21C2", *cli_args]) == 0
+    events = [json.loads(line)["event"] for line in capsys.readouterr().out.splitlines()]
+    assert "result" in events and "prompt" not in events
+
+
+def test_profile_of_the_loaded_project(cli_args, results, tmp_path, monkeypatch, capsys):
+    # De laatste run in de store is een andere kast met een ander schema
+    store = ResultStore(tmp_path / "results.sqlite3")
+    store.start_run("KS-OTHER", "E50", json.loads(results.read_text()))
+    store.close()
+    schemes = []
+    load = FixtureProfile.load
+    monkeypatch.setattr(FixtureProfile, "load", lambda scheme=None, *args: schemes.append(scheme) or load(scheme, *args))
+    assert cli.main(["--connector", "21C2", *cli_args]) == 0
+    assert schemes == ["default"]
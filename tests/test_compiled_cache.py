@@ -0,0 +1,74 @@
+"""Het gecompileerde project hangt af van werkboek, versie, marks en import; bij een andere sleutel wordt opnieuw geparsed."""
+import shutil
+
+import pytest
+
+from create_test_project import CreateProject
+from fixture_profile import FixtureProfile
+from schemes import SCHEMES_DIR, scheme_file
+
+COMPILED = {"cabinet_name": "test", "graph": b"", "answers": {}}
+
+
+@pytest.fixture
+def workbook(tmp_path):
+    """Een kopie van het S25 werkboek (zelfde naam, dus hetzelfde profiel) die aangepast mag worden."""
+    path = tmp_path / scheme_file("S25")
+    shutil.copy(SCHEMES_DIR / scheme_file("S25"), path)
+    return path
+
+
+@pytest.mark.parametrize("change", ["workbook", "version", "marks", "streaming"])
+def test_cache_key(project, workbook, change):
+    creator = CreateProject()
+    key = creator.compiled_path(workbook)
+    assert creator.compiled_path(workbook) == key
+    if change == "workbook":
+        workbook.write_bytes(workbook.read_bytes() + b"\0")
+    elif change == "version":
+        creator.compiled_version += 1
+    elif change == "marks":
+        creator.profile = FixtureProfile(marks=["8C1"])
+    else:
+        creator.streaming_import = True
+    assert creator.compiled_path(workbook) != key
+    assert creator.compiled_path(workbook).parent == project / "compiled"
+
+
+def test_save_and_load(project, workbook):
+    creator = CreateProject()
+    assert creator.load_compiled(workbook) is None
+    creator.save_compiled(workbook, COMPILED)
+    assert creator.load_compiled(workbook) == COMPILED
+    creator.streaming_import = True
+    assert creator.load_compiled(workbook) is None
+
+
+def test_unreadable_pickle_is_rebuilt(project, workbook):
+    creator = CreateProject()
+    creator.compiled_dir.mkdir()
+    creator.compiled_path(workbook).write_bytes(b"geen pickle")
+    assert creator.load_compiled(workbook) is None
+
+
+def test_older_versions_are_removed(project, workbook):
+    creator = CreateProject()
+    other = workbook.with_name(scheme_file("F25"))
+    shutil.copy(SCHEMES_DIR / scheme_file("F25"), other)
+    creator.save_compiled(other, COMPILED)
+    creator.save_compiled(workbook, COMPILED)
+    workbook.write_bytes(workbook.read_bytes() + b"\0")
+    creator.save_compiled(workbook, COMPILED)
+    assert sorted(creator.compiled_dir.iterdir()) == sorted([creator.compiled_path(workbook), creator.compiled_path(other)])
+
+
+def test_create_uses_the_cache(project, monkeypatch):
+    assert CreateProject().create(scheme_file("S25"))
+    answers = (project / "testing_components_answers.json").read_text()
+
+    def compile(self, path_file):
+        raise AssertionError("werkboek opnieuw geparsed")
+
+    monkeypatch.setattr(CreateProject, "compile", compile)
+    assert CreateProject().create(scheme_file("S25"))
+    assert (project / "testing_components_answers.json").read_text() == answers
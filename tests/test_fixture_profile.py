@@ -0,0 +1,136 @@
+"""Fixture profielen en de gecompileerde PinTable."""
+import asyncio
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from fixture_profile import FixtureProfile, PinTable, PROFILES_DIR
+from io_backend import HardwareBackend, MCP_ADDRESSES
+from result_journal import ResultJournal
+from run_test import RunTest
+from simulator import WiringModel, SimulatedBackend
+from wiring_index import WiringIndex, ANSWERS_PATH
+
+
+@pytest.fixture
+def profiles(tmp_path):
+    """Een profielen map met het echte standaard profiel."""
+    (tmp_path / "default.json").write_text((PROFILES_DIR / "default.json").read_text())
+    return tmp_path
+
+
+def test_interrupt_pins_from_profile(profiles):
+    (profiles / "S25.json").write_text(json.dumps({"interrupt_pins": {"26": 17}}))
+    assert FixtureProfile.load("F25", profiles).interrupt_pins == {}
+    interrupt_pins = FixtureProfile.load("S25", profiles).interrupt_pins
+    assert interrupt_pins == {26: 17}
+
+    backend = HardwareBackend(interrupt_pins=interrupt_pins)
+    assert backend.interrupt_line(25) is None
+    assert backend.interrupt_line(26) is not None
+
+
+def test_invalid_interrupt_pin(profiles):
+    (profiles / "S25.json").write_text(json.dumps({"interrupt_pins": {"200": 17}}))
+    with pytest.raises(ValidationError):
+        FixtureProfile.load("S25", profiles)
+
+
+def test_simulator_takes_the_probe_from_the_profile(index, results, calibration, tmp_path):
+    # De probe op een vrije pin in plaats van (26, 0)
+    probe = next((address, pin) for address in MCP_ADDRESSES for pin in range(16)
+                 if (address, pin) not in index.connectors and (address, pin) != index.probe)
+    profile = FixtureProfile.load(index.table.scheme).model_copy(update={"probe": probe})
+    table = PinTable.compile(profile, index.answers)
+    table.save(tmp_path / "fixture.json")
+
+    model = WiringModel.from_project(ANSWERS_PATH, tmp_path / "fixture.json")
+    assert model.probe == probe
+    model.place_probe("8C1", "1")
+    assert model.pin_nodes[probe] == ("8C1", "1")
+
+    test = RunTest(backend=SimulatedBackend(model), journal=ResultJournal(results), calibration=calibration,
+                   probe=probe, result_pause=0, pass_pause=0)
+    asyncio.run(test.run("8C1", results, test_time=0.05))
+    assert test.results and all(result.passes for result in test.results)
+
+
+def pin(terminal, address, number) -> dict:
+    return {"Conector_pin": terminal, "mcp_adress": address, "mcp_pin": number}
+
+
+def answer(terminal, to_mark, to_terminal, to_part="X") -> dict:
+    return {"from_terminal": terminal, "to_part": to_part, "to_mark": to_mark, "to_terminal": to_terminal}
+
+
+@pytest.fixture
+def table():
+    profile = FixtureProfile(marks=["A"], connectors={"A": [pin(1, 25, 0), pin(2, 25, 1), pin(3, 25, 2), pin(10, 27, 15)]})
+    return PinTable.compile(profile, {"A": [
+        answer("10", "X2", "1"),
+        answer("1", "X1", "10"),
+        answer("1", "X9", "1"),  # Tweede draad op dezelfde terminal: de eerste is de bestemming
+        answer("2", "X1", "2"),
+        answer("3", None, None),  # Geen bestemming
+        answer("4", "X1", "3"),  # Geen MCP pin
+    ]})
+
+
+def test_pin_table_probe_order(table):
+    # Per to_mark in schema volgorde, binnen een mark op terminal nummer, niet te testen rijen achteraan
+    assert [(row[0], row[4], row[5]) for row in table.terminals["A"]] == [
+        ("10", "X2", "1"), ("2", "X1", "2"), ("1", "X1", "10"), ("1", "X9", "1"), ("3", None, None), ("4", "X1", "3"),
+    ]
+    assert [row[1:3] for row in table.terminals["A"][-2:]] == [[None, None], [None, None]]
+
+
+def test_pin_table_slots(table):
+    assert table.slot(25, 0) == ["A", 1, ["X", "X1", "10"]]
+    assert table.slot(27, 15) == ["A", 10, ["X", "X2", "1"]]
+    assert table.slot(25, 2) == ["A", 3, ["X", None, None]]
+    assert table.slot(25, 3) is None
+    assert table.slot(25, 16) is None
+    assert table.slot(40, 0) is None
+
+
+def test_pin_table_round_trip(table, tmp_path):
+    table.save(tmp_path / "fixture.json")
+    loaded = PinTable.load(tmp_path / "fixture.json")
+    assert loaded.terminals == table.terminals
+    assert loaded.slot(25, 0) == table.slot(25, 0)
+    assert loaded.probe == table.probe == (26, 0)
+
+
+@pytest.mark.parametrize("data", [
+    {"marks": ["A", "A"]},
+    {"marks": []},
+    {"marks": ["A"], "connectors": {"A": [pin(1, 26, 0)]}},  # Op de probe
+    {"marks": ["A"], "connectors": {"A": [pin(1, 25, 0), pin(2, 25, 0)]}},  # Twee keer dezelfde MCP pin
+    {"marks": ["A"], "connectors": {"A": [pin(1, 25, 0), pin("1", 25, 1)]}},  # Twee keer dezelfde terminal
+    {"marks": ["A"], "connectors": {"A": [pin(1, 25, 16)]}},
+])
+def test_invalid_profiles(data):
+    with pytest.raises(ValidationError):
+        FixtureProfile.model_validate(data)
+
+
+def test_scheme_profile_overrides_the_default(profiles):
+    (profiles / "S25.json").write_text(json.dumps({"marks": ["8C1"], "settle": 0.05}))
+    default, scheme = FixtureProfile.load(None, profiles), FixtureProfile.load("S25", profiles)
+    assert scheme.marks == ["8C1"] and scheme.settle == 0.05 and scheme.scheme == "S25"
+    assert scheme.probe == default.probe and scheme.connectors == default.connectors
+
+
+def test_index_does_not_compile_a_missing_fixture(tmp_path):
+    fixture_path = tmp_path / "fixture.json"
+    with pytest.raises(FileNotFoundError):
+        WiringIndex.for_project(ANSWERS_PATH, fixture_path)
+    assert not fixture_path.exists()
+
+
+def test_migrate_compiles_the_fixture(index, tmp_path):
+    fixture_path = WiringIndex.migrate(ANSWERS_PATH, tmp_path / "fixture.json")
+    compiled = WiringIndex.for_project(ANSWERS_PATH, fixture_path)
+    assert compiled.terminals("8C1") == index.terminals("8C1")
+    assert compiled.locate(*compiled.pin("8C1", compiled.terminals("8C1")[0][0]))
@@ -0,0 +1,104 @@
+"""De bus blijft open tussen tests en wordt na een busfout bij de volgende test opnieuw geopend."""
+import asyncio
+import shutil
+import threading
+from pathlib import Path
+
+import pytest
+
+from hardware_session import HardwareSession
+from result_journal import ResultJournal
+from run_test import RunTest
+
+CONNECTOR = "8C1"
+
+
+def hardware_threads() -> list:
+    return [thread for thread in threading.enumerate() if thread.name == "hardware"]
+
+
+def test_bus_stays_open_between_tests(make_backend):
+    async def run():
+        session = HardwareSession(make_backend())
+        ports = await session.acquire()
+        await session.release()
+        assert await session.acquire() is ports
+        assert session.opened == 1
+        await session.close()
+
+    asyncio.run(run())
+    assert not hardware_threads()
+
+
+@pytest.mark.parametrize("hardware_thread", [True, False])
+def test_reopen_after_a_bus_error(make_backend, hardware_thread):
+    backend = make_backend()
+
+    async def run():
+        session = HardwareSession(backend, hardware_thread=hardware_thread)
+        ports = await session.acquire()
+        await ports.drive(25, 3)
+        backend.bus_error_at = backend.transactions + 1
+        with pytest.raises(OSError):
+            await ports.read_all()
+        assert isinstance(session.error, OSError)
+        await session.release()
+        assert not any(backend.driven().values())
+
+        reopened = await session.acquire()
+        assert reopened is not ports and session.opened == 2 and session.error is None
+        assert set(await reopened.read_all()) == set(backend.mcps)
+        await session.close()
+
+    asyncio.run(run())
+    assert not hardware_threads()
+
+
+def test_failed_health_check_reopens(make_backend):
+    backend = make_backend()
+
+    async def run():
+        # health_interval 0: elke acquire controleert eerst de bus
+        session = HardwareSession(backend, health_interval=0)
+        await session.acquire()
+        backend.bus_error_at = backend.transactions + 1
+        await session.acquire()
+        assert session.opened == 2 and session.error is None
+        await session.close()
+
+    asyncio.run(run())
+
+
+def test_next_run_after_a_failed_run(make_backend, results, calibration, tmp_path):
+    def make_tester(session, path=results) -> RunTest:
+        return RunTest(session=session, journal=ResultJournal(path), calibration=calibration,
+                       result_pause=0, pass_pause=0)
+
+    async def clean_run(backend, path):
+        session = HardwareSession(backend)
+        await make_tester(session, path).run(CONNECTOR, path, test_time=0.05)
+        await session.close()
+
+    # De fout halverwege een run (geteld op een eigen kopie van de resultaten), en een nieuwe test op dezelfde sessie
+    counted = make_backend()
+    asyncio.run(clean_run(counted, Path(shutil.copy(results, tmp_path / "clean.json"))))
+    backend = make_backend()
+
+    async def run():
+        session = HardwareSession(backend)
+        await session.acquire()
+        await session.release()
+        # Het openen telt niet mee: de fout komt halverwege de run zelf
+        backend.bus_error_at = backend.transactions + (counted.transactions - backend.transactions) // 2
+        with pytest.raises(OSError):
+            await make_tester(session).run(CONNECTOR, results, test_time=0.05)
+        assert session.error is not None
+
+        await make_tester(session).run(CONNECTOR, results, test_time=0.05)
+        data = ResultJournal(results).load()["test_results"][CONNECTOR]
+        assert data and all(result["passed"] for result in data)
+        assert session.opened == 2
+        await session.close()
+
+    asyncio.run(run())
+    assert not any(backend.driven().values())
@@ -0,0 +1,81 @@
+"""De matrix test vindt opens, kortsluitingen en verkeerd aangesloten draden zonder operator."""
+import asyncio
+
+from hardware_worker import AsyncPortBank
+from matrix_sweep import ContinuitySweep
+
+
+class CountingSweep(ContinuitySweep):
+    drives = 0
+
+    async def drive(self, pin: tuple):
+        self.drives += 1
+        await super().drive(pin)
+
+
+def sweep(backend, index, schema, connectors=None) -> tuple:
+    """Meet de bedrading van `backend` tegen het model van het schema."""
+    async def run():
+        ports = await AsyncPortBank.open(backend)
+        matrix = CountingSweep(ports, index, schema, settle=0, connectors=connectors)
+        return matrix, *(await matrix.run())
+
+    return asyncio.run(run())
+
+
+def nets(model, index) -> list:
+    """De tester pinnen per net, alleen netten met meer dan één pin."""
+    by_net = {}
+    for pin in sorted(index.connectors):
+        if pin in model.pin_nodes:
+            by_net.setdefault(model.net(model.pin_nodes[pin]), []).append(pin)
+    return [pins for pins in by_net.values() if len(pins) > 1]
+
+
+def pairs(report, kind) -> set:
+    return {((pair["from"]["Connector"], pair["from"]["Conector_pin"]), (pair["to"]["Connector"], pair["to"]["Conector_pin"]))
+            for pair in report[kind]}
+
+
+def test_clean_cabinet(make_backend, model, index):
+    backend = make_backend()
+    matrix, expected, observed, report = sweep(backend, index, model)
+    assert report == {"opens": [], "shorts": [], "miswires": []}
+    assert {pin: observed.get(pin, set()) for pin in expected} == expected
+    # Eén stap per net: pinnen in een al gemeten net worden niet meer gestuurd
+    assert matrix.drives == len({backend.model.net(backend.model.pin_nodes.get(pin, pin)) for pin in matrix.labels})
+    assert not any(backend.driven().values())
+
+
+def test_open(make_backend, make_model, index):
+    model = make_model()
+    first, second, *_ = next(pins for pins in nets(model, index) if len(pins) == 2)
+    model.disconnect(model.pin_nodes[second])
+    _, _, _, report = sweep(make_backend(model), index, make_model())
+    assert pairs(report, "opens") == {(index.connectors[first], index.connectors[second])}
+    assert not report["shorts"] and not report["miswires"]
+
+
+def test_short(make_backend, make_model, index):
+    model = make_model()
+    a, b = nets(model, index)[:2]
+    model.connect(model.pin_nodes[a[0]], model.pin_nodes[b[0]])
+    _, _, _, report = sweep(make_backend(model), index, make_model())
+    assert (index.connectors[a[0]], index.connectors[b[0]]) in pairs(report, "shorts")
+    assert not report["opens"] and not report["miswires"]
+
+
+def test_miswire(make_backend, make_model, index):
+    model = make_model()
+    a, b = [pins for pins in nets(model, index) if len(pins) == 2][:2]
+    # De draad van a[1] op de terminal van b[0]: open naar a[0], verbonden met b
+    model.miswire(model.pin_nodes[a[1]], model.pin_nodes[b[0]])
+    _, _, _, report = sweep(make_backend(model), index, make_model())
+    assert (index.connectors[a[0]], index.connectors[a[1]]) in pairs(report, "opens")
+    assert any(index.connectors[a[1]] in pair for pair in pairs(report, "miswires"))
+
+
+def test_connectors_limit_the_sweep(make_backend, model, index):
+    matrix, _, _, report = sweep(make_backend(), index, model, connectors=["21C2"])
+    assert matrix.labels and {label[0] for label in matrix.labels.values()} == {"21C2"}
+    assert not any(report.values())
@@ -0,0 +1,54 @@
+"""PortBank schrijft alleen wat verandert en laat na een busfout alle pinnen weer los."""
+import pytest
+
+from mcp_port import ALL_PINS, PortBank
+
+
+def bank(backend) -> PortBank:
+    return PortBank(backend.open(), probe=(26, 0))
+
+
+def test_unchanged_registers_are_not_written(make_backend):
+    ports = bank(make_backend())
+    ports.drive(25, 3)
+    writes = ports.counters()["writes"]
+    ports.drive(25, 3)
+    assert ports.counters()["writes"] == writes
+    # Een andere pin op dezelfde poort: latch en richting, samen twee writes
+    ports.drive(25, 4)
+    assert ports.counters()["writes"] == writes + 2
+
+
+def test_probe_is_never_driven(make_backend):
+    backend = make_backend()
+    ports = bank(backend)
+    ports.drive(26, 0)
+    assert backend.driven()[26] == 0
+    assert (26, 0) not in ports.pins()
+
+
+def test_bus_error_halfway_a_drive(make_backend):
+    backend = make_backend()
+    ports = bank(backend)
+    # Latch en richting van 25 lukken, de latch van 24 niet
+    backend.bus_error_at = backend.transactions + 3
+    with pytest.raises(OSError):
+        ports.drive_mask({25: 0b1, 24: 0b1})
+    assert backend.driven()[25] == 0b1
+    # 25 was al als actief gemarkeerd, dus een gewone release laat hem los
+    ports.release()
+    assert not any(backend.driven().values())
+
+
+def test_force_release_rewrites_every_port(make_backend):
+    backend = make_backend()
+    ports = bank(backend)
+    # De chip stuurt een pin terwijl de schaduwkopie denkt dat alles input is (bv. na een busfout)
+    backend.mcps[24].olat, backend.mcps[24]._iodir = 0b1, ALL_PINS & ~0b1
+    writes = ports.counters()["writes"]
+    ports.release()
+    assert backend.driven()[24] == 0b1 and ports.counters()["writes"] == writes
+
+    ports.release(force=True)
+    assert not any(backend.driven().values())
+    assert ports.counters()["writes"] == writes + len(ports.ports)
@@ -0,0 +1,29 @@
+"""Metrics worden alleen weggeschreven als er een map is opgegeven."""
+import asyncio
+import json
+
+from metrics import RunMetrics
+from result_journal import ResultJournal
+from run_test import RunTest
+
+
+def run(make_backend, results, calibration, metrics=None) -> RunTest:
+    test = RunTest(backend=make_backend(), journal=ResultJournal(results), calibration=calibration, metrics=metrics,
+                   result_pause=0, pass_pause=0)
+    asyncio.run(test.run("8C1", results, test_time=0.05))
+    return test
+
+
+def test_no_directory_no_export(make_backend, results, calibration, tmp_path):
+    test = run(make_backend, results, calibration)
+    assert test.metrics.directory is None
+    assert test.metrics.export() is None
+    assert test.metrics.summary()["terminals"] == 3
+
+
+def test_export_to_directory(make_backend, results, calibration, tmp_path):
+    run(make_backend, results, calibration, RunMetrics(tmp_path / "metrics"))
+    (path,) = (tmp_path / "metrics").glob("*_8C1.json")
+    data = json.loads(path.read_text())
+    assert data["summary"]["terminals"] == len(data["terminals"]) == 3
+    assert data["bus"]["reads"] > 0
@@ -0,0 +1,34 @@
+"""Alleen werkboeken die echt gecompileerd moeten worden starten een proces, en de pool blijft niet staan."""
+import asyncio
+
+import precompile
+from precompile import SchemeCompiler
+
+SCHEMES = [("F25", "Cable & cabinet assembly list F25.xlsx"), ("X99", "Cable & cabinet assembly list X99.xlsx")]
+
+
+def test_cached_and_missing_spawn_nothing(tmp_path):
+    compiler = SchemeCompiler(SCHEMES, compiled_dir=tmp_path)
+    first = asyncio.run(compiler.compile_all())
+    assert first["F25"]["status"] == "compiled"
+    assert len(list(tmp_path.glob("*F25*.pickle"))) == 1
+
+    results = asyncio.run(compiler.compile_all())
+    assert results["F25"]["status"] == "cached"
+    assert compiler.results["X99"]["status"] == "missing"
+    assert compiler.spawned == 0
+    assert compiler._pool is None
+
+
+def test_pool_is_sized_to_the_work_and_closed(tmp_path, monkeypatch):
+    monkeypatch.setattr(precompile, "is_cached", lambda workbook, compiled_dir: False)
+    compiler = SchemeCompiler(SCHEMES, workers=4, compiled_dir=tmp_path)
+    results = asyncio.run(compiler.compile_all())
+    assert results == {"F25": compiler.results["F25"]}
+    assert results["F25"]["status"] == "compiled"
+    assert compiler.spawned == 1  # Het ontbrekende werkboek telt niet mee
+    assert compiler._pool is None
+
+    # Ongewijzigde werkboeken: geen nieuwe ronde
+    assert asyncio.run(compiler.compile_changed()) == {}
+    assert compiler.spawned == 0
@@ -0,0 +1,82 @@
+"""Een project import kan tussen de fases afgebroken worden; het geladen project blijft dan onaangeroerd."""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from create_test_project import CreateProject, ProjectCancelled, STAGES
+from schemes import scheme_file
+
+OUTPUTS = ("graph_output_path", "testing_components_output_path", "testing_components_results", "fixture_output_path")
+
+
+@pytest.fixture
+def loaded(project) -> dict:
+    """Bestanden van het vorige project, die na een afgebroken import nog hetzelfde moeten zijn."""
+    previous = {}
+    for name in OUTPUTS:
+        path = getattr(CreateProject, name)
+        path.write_bytes(f"vorig project: {name}".encode())
+        previous[path] = path.read_bytes()
+    return previous
+
+
+def cancel_at(stage: str):
+    """Een CreateProject dat afbreken aanvraagt zodra `stage` begint, plus de lijst met begonnen fases."""
+    cancel, started = threading.Event(), []
+
+    def listener(name, index):
+        assert STAGES[index] == name
+        started.append(name)
+        if name == stage:
+            cancel.set()
+
+    return CreateProject(listeners=[listener], cancelled=cancel.is_set), started
+
+
+@pytest.mark.parametrize("stage", STAGES[:-1])
+def test_cancel_before_the_next_stage(loaded, stage):
+    creator, started = cancel_at(stage)
+    with pytest.raises(ProjectCancelled):
+        creator.create(scheme_file("S25"))
+    assert started == list(STAGES[:STAGES.index(stage) + 1])
+    assert {path: path.read_bytes() for path in loaded} == loaded
+
+
+def test_no_cancel_once_writing(loaded):
+    creator, started = cancel_at("write")
+    assert creator.create(scheme_file("S25"))
+    assert started == list(STAGES)
+    assert all(path.read_bytes() != content for path, content in loaded.items())
+
+
+def test_cancel_from_a_cached_project(loaded):
+    assert CreateProject().create(scheme_file("S25"))
+    for path in loaded:
+        path.write_bytes(loaded[path])
+    # Uit de cache: van read meteen naar write, daar wordt nog gecontroleerd
+    creator, started = cancel_at("read")
+    with pytest.raises(ProjectCancelled):
+        creator.create(scheme_file("S25"))
+    assert started == ["read"]
+    assert {path: path.read_bytes() for path in loaded} == loaded
+
+
+def test_cancel_from_another_thread(loaded):
+    # Zoals de app: de import in een worker thread, afbreken vanuit de UI thread
+    cancel, organizing, cancelled = threading.Event(), threading.Event(), threading.Event()
+
+    def listener(name, index):
+        if name == "organize":
+            organizing.set()
+            assert cancelled.wait(5)
+
+    creator = CreateProject(listeners=[listener], cancelled=cancel.is_set)
+    with ThreadPoolExecutor(1) as pool:
+        future = pool.submit(creator.create, scheme_file("S25"))
+        assert organizing.wait(5)
+        cancel.set()
+        cancelled.set()
+        with pytest.raises(ProjectCancelled):
+            future.result(timeout=5)
+    assert {path: path.read_bytes() for path in loaded} == loaded
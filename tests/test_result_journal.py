@@ -0,0 +1,87 @@
+"""Elk resultaat staat in de journal zodra het gemeten is; een crash kost hooguit de half geschreven regel."""
+import asyncio
+import json
+
+import pytest
+
+from result_journal import ResultJournal
+from run_test import RunTest
+
+CONNECTOR = "8C1"
+
+
+def test_load_applies_the_journal(results):
+    journal = ResultJournal(results)
+    snapshot = results.read_text()
+    journal.append(CONNECTOR, "1", False, "open")
+    journal.append(CONNECTOR, "2", True, "ok")
+    journal.append(CONNECTOR, "1", True, "ok")  # Opnieuw getest: het laatste resultaat telt
+    journal.close()
+
+    assert results.read_text() == snapshot
+    assert json.loads(snapshot)["test_results"][CONNECTOR] == []
+    assert journal.load()["test_results"][CONNECTOR] == [
+        {"terminal": "1", "passed": True, "answer": "ok"},
+        {"terminal": "2", "passed": True, "answer": "ok"},
+    ]
+
+
+def test_compact(results):
+    journal = ResultJournal(results, compact_every=3)
+    for terminal in "123":
+        journal.append(CONNECTOR, terminal, True, "ok")
+    # De derde append compacteert: alles in het snapshot, de journal is leeg
+    assert not journal.path.exists()
+    assert len(json.loads(results.read_text())["test_results"][CONNECTOR]) == 3
+    journal.append(CONNECTOR, "4", True, "ok")
+    journal.close()
+    assert len(journal.load()["test_results"][CONNECTOR]) == 4
+
+
+def test_damaged_last_line(results):
+    journal = ResultJournal(results)
+    journal.append(CONNECTOR, "1", True, "ok")
+    journal.close()
+    # Crash midden in het schrijven van de volgende regel
+    with open(journal.path, "a") as file:
+        file.write('{"test": "8C1", "terminal": "2", "pas')
+
+    journal = ResultJournal(results)
+    assert [result["terminal"] for result in journal.load()["test_results"][CONNECTOR]] == ["1"]
+    # De volgende regel begint op een nieuwe regel en gaat dus niet verloren
+    journal.append(CONNECTOR, "3", False, "open")
+    journal.close()
+    assert [result["terminal"] for result in journal.load()["test_results"][CONNECTOR]] == ["1", "3"]
+
+
+@pytest.mark.parametrize("fsync", ["always", "batch", "never"])
+def test_fsync_policies(results, fsync):
+    journal = ResultJournal(results, fsync=fsync, batch_size=2)
+    for terminal in "123":
+        journal.append(CONNECTOR, terminal, True, "ok")
+    journal.close()
+    assert len(journal.load()["test_results"][CONNECTOR]) == 3
+
+
+def test_unknown_fsync_policy(results):
+    with pytest.raises(ValueError):
+        ResultJournal(results, fsync="sometimes")
+
+
+def test_results_survive_a_bus_error(make_backend, results, calibration):
+    # Eerst bij een run zonder fout noteren na welke transactie elk resultaat er is
+    clean = make_backend()
+    saved_at = []
+    asyncio.run(RunTest(backend=clean, journal=ResultJournal(results), calibration=calibration, result_pause=0, pass_pause=0,
+                        listeners=[lambda *_: saved_at.append(clean.transactions)]).run(CONNECTOR, results, test_time=0.05))
+    ResultJournal(results).clear()
+    results.write_text(json.dumps({"cabinet_name": "test", "test_results": {CONNECTOR: []}}))
+
+    # De busfout na het eerste resultaat, tijdens de volgende terminal
+    test = RunTest(backend=make_backend(bus_error_at=saved_at[0] + 1), journal=ResultJournal(results),
+                   calibration=calibration, result_pause=0, pass_pause=0)
+    with pytest.raises(OSError):
+        asyncio.run(test.run(CONNECTOR, results, test_time=0.05))
+
+    saved = ResultJournal(results).load()["test_results"][CONNECTOR]
+    assert len(saved) == len(test.results) == 1
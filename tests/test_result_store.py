@@ -0,0 +1,94 @@
+"""De store houdt per kast alle runs bij en pakt na een crash de run weer op met wat er in de journal staat."""
+import asyncio
+import json
+
+import pytest
+
+from result_journal import ResultJournal
+from result_store import ResultStore
+from run_test import RunTest
+
+CONNECTOR = "8C1"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(tmp_path / "results.sqlite3")
+    yield store
+    store.close()
+
+
+def working_copy(results: dict) -> dict:
+    return {"cabinet_name": "test", "test_results": results}
+
+
+def result(terminal, passed, answer="ok") -> dict:
+    return {"terminal": terminal, "passed": passed, "answer": answer}
+
+
+def test_resume_or_start(store):
+    first = store.resume("KS-1", "S25", working_copy({"8C1": [result("1", True)], "20C1": []}))
+    assert store.run(first)["serial"] == "KS-1"
+    assert store.summary(first) == [{"test": "8C1", "total": 1, "failed": 0}, {"test": "20C1", "total": 0, "failed": 0}]
+
+    # Dezelfde kast en hetzelfde schema: dezelfde run, met wat er in de werkkopie bij gekomen is
+    again = store.resume("KS-1", "S25", working_copy({"8C1": [result("1", True), result("2", False, "open")], "20C1": []}))
+    assert again == first
+    assert store.statuses(first, "8C1") == {"1": True, "2": False}
+
+    # Een ander schema of een andere kast: een nieuwe run, de oude blijft bewaard
+    assert store.resume("KS-1", "E25", working_copy({})) != first
+    assert store.resume("KS-2", "S25", working_copy({})) != first
+    assert store.statuses(first, "8C1") == {"1": True, "2": False}
+    assert store.latest_run("KS-1", "S25")["id"] == first
+
+
+def test_results_overwrite_and_page(store):
+    run_id = store.start_run("KS-1", "S25", working_copy({"8C1": []}))
+    store.add_results(run_id, "8C1", [result(str(terminal), True) for terminal in range(1, 6)])
+    store.add_results(run_id, "8C1", [result("3", False, "open")])
+    assert [row["terminal"] for row in store.page(run_id, "8C1", offset=2, limit=2)] == ["3", "4"]
+    assert store.page(run_id, "8C1", offset=2, limit=1) == [result("3", False, "open")]
+    assert store.summary(run_id) == [{"test": "8C1", "total": 5, "failed": 1}]
+
+    store.clear(run_id, ["8C1"])
+    assert store.summary(run_id) == [{"test": "8C1", "total": 0, "failed": 0}]
+
+
+def test_failures_over_all_cabinets(store):
+    old = store.start_run("KS-1", "S25", working_copy({"8C1": [result("1", False, "open")]}))
+    new = store.start_run("KS-2", "S25", working_copy({"8C1": [result("2", False, "short"), result("3", True)]}))
+    failures = store.failures("8C1")
+    assert [(row["serial"], row["run_id"], row["terminal"]) for row in failures] == [("KS-2", new, "2"), ("KS-1", old, "1")]
+
+
+def test_resume_after_a_crash(make_backend, results, calibration, store):
+    """Een run valt weg midden in een connector: na de herstart staan de resultaten uit de journal in de store."""
+    data = ResultJournal(results).load()
+    run_id = store.start_run("KS-1", "S25", data)
+
+    saved_at = []
+    clean = make_backend()
+    asyncio.run(RunTest(backend=clean, journal=ResultJournal(results), calibration=calibration, result_pause=0, pass_pause=0,
+                        listeners=[lambda *_: saved_at.append(clean.transactions)]).run(CONNECTOR, results, test_time=0.05))
+    store.clear(run_id, [CONNECTOR])
+    ResultJournal(results).clear()
+    results.write_text(json.dumps(data))
+
+    test = RunTest(backend=make_backend(bus_error_at=saved_at[0] + 1), journal=ResultJournal(results), calibration=calibration,
+                   store=store, run_id=run_id, result_pause=0, pass_pause=0)
+    with pytest.raises(OSError):
+        asyncio.run(test.run(CONNECTOR, results, test_time=0.05))
+    # De connector is niet afgemaakt, dus nog niet in de store
+    assert store.statuses(run_id, CONNECTOR) == {}
+
+    # Herstart van de app
+    assert store.resume("KS-1", "S25", ResultJournal(results).load()) == run_id
+    assert store.statuses(run_id, CONNECTOR) == {test.results[0].terminal: True}
+
+    # Verder testen: de geslaagde terminal wordt overgeslagen, de rest komt erbij
+    rest = RunTest(backend=make_backend(), journal=ResultJournal(results), calibration=calibration, store=store,
+                   run_id=run_id, result_pause=0, pass_pause=0)
+    asyncio.run(rest.run(CONNECTOR, results, test_time=0.05))
+    assert len(rest.results) == len(saved_at) - 1
+    assert len(store.statuses(run_id, CONNECTOR)) == len(saved_at)
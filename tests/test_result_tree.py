@@ -0,0 +1,114 @@
+"""De boom laadt terminals per pagina uit de store en werkt tijdens een run alleen de geraakte nodes bij."""
+import asyncio
+
+import pytest
+from textual.app import App
+
+import test_tree
+from result_store import ResultStore, PAGE_SIZE
+from utils import SubTest
+
+CONNECTOR = "8C1"
+TERMINALS = PAGE_SIZE * 2 + 5
+
+
+class TreeApp(App):
+    """Host voor TestTree; die leest test_time, de store en de run van de app."""
+    test_time = 30
+
+    def __init__(self, store, run_id):
+        super().__init__()
+        self.store = store
+        self.run_id = run_id
+
+    def compose(self):
+        yield test_tree.TestTree(testers=[], selected_scheme="S25")
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(tmp_path / "results.sqlite3")
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def run_id(store):
+    results = [{"terminal": str(terminal), "passed": True, "answer": "ok"} for terminal in range(TERMINALS)]
+    return store.start_run("KS-1", "S25", {"cabinet_name": "test", "test_results": {CONNECTOR: results, "20C1": []}})
+
+
+def with_tree(store, run_id, check):
+    """Draait `check(tree, pilot)` met de boom in een app zonder scherm."""
+    async def run():
+        app = TreeApp(store, run_id)
+        async with app.run_test() as pilot:
+            await check(app.query_one(test_tree.TestTree), pilot)
+
+    asyncio.run(run())
+
+
+def labels(node) -> list:
+    return [str(child.label) for child in node.children]
+
+
+def test_pages(store, run_id):
+    async def check(tree, pilot):
+        parent = tree.parent_nodes[CONNECTOR]
+        assert not parent.children  # Pas laden bij uitklappen
+        parent.expand()
+        await pilot.pause()
+        assert tree.loaded[CONNECTOR] == PAGE_SIZE
+        assert labels(parent)[-1] == "… load more"
+
+        tree.result_tree.select_node(tree.more_nodes[CONNECTOR])
+        await pilot.pause()
+        assert tree.loaded[CONNECTOR] == PAGE_SIZE * 2
+        tree.load_page(CONNECTOR)
+        assert tree.loaded[CONNECTOR] == TERMINALS and CONNECTOR not in tree.more_nodes
+        assert labels(parent) == [f"✅ Terminal {terminal}" for terminal in range(TERMINALS)]
+
+    with_tree(store, run_id, check)
+
+
+def test_result_before_expanding(store, run_id):
+    async def check(tree, pilot):
+        tree.on_result(CONNECTOR, SubTest(terminal="3", passes=False, answer="Should go to mark: X1"))
+        parent = tree.parent_nodes[CONNECTOR]
+        assert str(parent.label) == f"❌ {CONNECTOR}" and not parent.children
+        # Bij uitklappen komt het live resultaat in plaats van dat uit de store
+        tree.load_page(CONNECTOR)
+        assert str(tree.leaf_nodes[(CONNECTOR, "3")].label) == "❌ Terminal 3"
+        assert labels(tree.leaf_nodes[(CONNECTOR, "3")]) == ["Should go to mark: X1"]
+
+    with_tree(store, run_id, check)
+
+
+def test_result_patches_the_leaf(store, run_id):
+    async def check(tree, pilot):
+        tree.load_page(CONNECTOR)
+        leaf = tree.leaf_nodes[(CONNECTOR, "3")]
+        tree.on_result(CONNECTOR, SubTest(terminal="3", passes=False, answer="open"))
+        assert tree.leaf_nodes[(CONNECTOR, "3")] is leaf
+        assert str(leaf.label) == "❌ Terminal 3" and labels(leaf) == ["open"]
+        assert len(tree.parent_nodes[CONNECTOR].children) == PAGE_SIZE + 1  # Geen nieuwe leaf
+
+        tree.on_result(CONNECTOR, SubTest(terminal="3", passes=True, answer="ok"))
+        assert str(leaf.label) == "✅ Terminal 3" and not leaf.children
+        assert str(tree.parent_nodes[CONNECTOR].label) == f"✅ {CONNECTOR}"
+
+    with_tree(store, run_id, check)
+
+
+def test_result_for_a_new_terminal_and_connector(store, run_id):
+    async def check(tree, pilot):
+        tree.load_page("20C1")
+        assert str(tree.parent_nodes["20C1"].label) == "⚪ 20C1"
+        tree.on_result("20C1", SubTest(terminal="1", passes=True))
+        assert labels(tree.parent_nodes["20C1"]) == ["✅ Terminal 1"]
+        assert str(tree.parent_nodes["20C1"].label) == "✅ 20C1"
+
+        tree.on_result("99C9", SubTest(terminal="1", passes=False, answer="open"))
+        assert str(tree.parent_nodes["99C9"].label) == "❌ 99C9"
+
+    with_tree(store, run_id, check)
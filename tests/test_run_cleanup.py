@@ -0,0 +1,87 @@
+"""Na een busfout midden in een run mogen er geen pinnen hoog blijven en geen taken of threads overblijven."""
+import asyncio
+import threading
+
+import pytest
+
+from hardware_session import HardwareSession
+from result_journal import ResultJournal
+from run_test import RunTest
+from simulator import WiringModel
+
+CONNECTOR = "8C1"
+
+
+def miswired(model: WiringModel, index) -> WiringModel:
+    """Legt de eerste te testen terminal van CONNECTOR op een verkeerde plek, zodat de locator gaat zoeken."""
+    terminal, *_ = next(row for row in index.terminals(CONNECTOR) if row[1] is not None)
+    model.miswire(model.node(CONNECTOR, terminal), model.node("XX", "1"))
+    return model
+
+
+def make_tester(backend, results, calibration, session=None) -> RunTest:
+    return RunTest(backend=backend, session=session, journal=ResultJournal(results), calibration=calibration,
+                   result_pause=0, pass_pause=0)
+
+
+def other_tasks() -> set:
+    return {task for task in asyncio.all_tasks() if task is not asyncio.current_task()}
+
+
+def hardware_threads() -> list:
+    return [thread for thread in threading.enumerate() if thread.name == "hardware"]
+
+
+def transactions(make_backend, make_model, index, results, calibration, mode: str) -> int:
+    """Het aantal bus transacties van een run zonder fout."""
+    backend = make_backend(miswired(make_model(), index))
+
+    async def run():
+        if mode == "matrix":
+            await make_tester(backend, results, calibration).run_matrix(results, connectors=[CONNECTOR])
+        else:
+            await make_tester(backend, results, calibration).run(CONNECTOR, results, test_time=0.05)
+
+    asyncio.run(run())
+    return backend.transactions
+
+
+@pytest.mark.parametrize("mode", ["probe", "matrix"])
+@pytest.mark.parametrize("own_session", [True, False])
+def test_bus_error_releases_everything(make_backend, make_model, index, results, calibration, mode, own_session):
+    total = transactions(make_backend, make_model, index, results, calibration, mode)
+    driven_at_error = []
+
+    for error_at in (total // 4, total // 2, 3 * total // 4):
+        backend = make_backend(miswired(make_model(), index), bus_error_at=error_at)
+
+        async def run():
+            session = None if own_session else HardwareSession(backend)
+            test = make_tester(backend, results, calibration, session=session)
+            with pytest.raises(OSError):
+                if mode == "matrix":
+                    await test.run_matrix(results, connectors=[CONNECTOR])
+                else:
+                    await test.run(CONNECTOR, results, test_time=0.05)
+
+            assert backend.driven() == {address: 0 for address in backend.mcps}, f"fout op transactie {error_at}"
+            assert not other_tasks()
+            if session is not None:
+                # De bus van de app blijft open (met de fout), tot de app hem sluit
+                assert session.error is not None
+                await session.close()
+            assert not hardware_threads()
+
+        asyncio.run(run())
+        driven_at_error.append(any(backend.driven_at_error.values()))
+
+    # De test moet ook echt een moment raken waarop er pinnen hoog stonden
+    assert any(driven_at_error)
+
+
+def test_clean_run_still_passes(make_backend, results, calibration):
+    backend = make_backend()
+    test = make_tester(backend, results, calibration)
+    asyncio.run(test.run(CONNECTOR, results, test_time=0.05))
+    assert test.results and all(result.passes for result in test.results)
+    assert backend.driven() == {address: 0 for address in backend.mcps}
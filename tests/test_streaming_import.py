@@ -0,0 +1,28 @@
+"""De streaming import geeft dezelfde antwoorden en verbindingen als de import via pandas."""
+import json
+
+import pytest
+
+from create_test_project import CreateProject
+from schemes import SCHEMES_DIR
+from wiring_graph import WiringGraph
+
+
+def compile_workbook(path_file, compiled_dir, streaming: bool) -> dict:
+    project = CreateProject()
+    project.compiled_dir = compiled_dir
+    project.streaming_import = streaming
+    compiled = project.compile(path_file)
+    assert compiled
+    return compiled
+
+
+@pytest.mark.parametrize("path_file", sorted(SCHEMES_DIR.glob("*.xlsx")), ids=lambda path: path.stem.split("list ")[-1])
+def test_streaming_matches_pandas(path_file, tmp_path):
+    pandas = compile_workbook(path_file, tmp_path / "pandas", streaming=False)
+    streaming = compile_workbook(path_file, tmp_path / "streaming", streaming=True)
+    assert streaming["cabinet_name"] == pandas["cabinet_name"]
+    # Lege cellen zijn NaN (NaN != NaN), dus vergelijken zoals ze in de JSON bestanden komen
+    assert json.dumps(streaming["answers"]) == json.dumps(pandas["answers"])
+    assert json.dumps(WiringGraph.from_buffer(streaming["graph"]).to_dict()) == \
+        json.dumps(WiringGraph.from_buffer(pandas["graph"]).to_dict())
@@ -0,0 +1,57 @@
+"""WiringGraph geeft na to_bytes / from_buffer / load precies de connections dict terug die erin ging."""
+import json
+
+import pytest
+
+from create_test_project import CreateProject
+from schemes import SCHEMES_DIR, scheme_file
+from wiring_graph import WiringGraph
+
+
+@pytest.fixture(scope="module")
+def connections(tmp_path_factory) -> dict:
+    """De connections dict van S25 zoals organize_connections hem maakt."""
+    project = CreateProject()
+    project.compiled_dir = tmp_path_factory.mktemp("compiled")
+    organized = []
+    organize = project.organize_connections
+    project.organize_connections = lambda df: organized.append(organize(df)) or organized[-1]
+    assert project.compile(SCHEMES_DIR / scheme_file("S25"))
+    return organized[0]
+
+
+def same(graph: WiringGraph, connections: dict) -> bool:
+    # Lege cellen zijn NaN (NaN != NaN), dus vergelijken zoals connections.json ze schrijft
+    return json.dumps(graph.to_dict()) == json.dumps(connections)
+
+
+def test_round_trip_through_bytes(connections):
+    graph = WiringGraph.build(connections)
+    assert same(graph, connections)
+    assert same(WiringGraph.from_buffer(graph.to_bytes()), connections)
+
+
+def test_round_trip_through_a_file(connections, tmp_path):
+    path = tmp_path / "connections.wgraph"
+    WiringGraph.build(connections).save(path)
+    graph = WiringGraph.load(path)
+    assert same(graph, connections)
+    mark = next(mark for mark in connections if isinstance(mark, str))
+    assert json.dumps(graph.edges(mark)) == json.dumps(connections[mark])
+    assert graph.edges("bestaat niet") == []
+
+    graph.close()
+    assert graph._buffer is None and graph.columns is None
+    graph.close()  # Twee keer sluiten mag
+
+
+def test_values_keep_their_type():
+    connections = {
+        "X1": [{"from_terminal": 1, "to_part": "K1", "to_mark": "X2", "to_terminal": 6.2}],
+        "X2": [{"from_terminal": 6.2, "to_part": "K1", "to_mark": "X1", "to_terminal": 1},
+               {"from_terminal": "PE", "to_part": "K2", "to_mark": "X3", "to_terminal": "1"}],
+    }
+    graph = WiringGraph.from_buffer(WiringGraph.build(connections).to_bytes())
+    assert graph.to_dict() == connections
+    assert graph.marks() == ["X1", "X2"]
+    graph.close()
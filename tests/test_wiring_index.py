@@ -0,0 +1,46 @@
+"""WiringIndex.for_project bouwt alleen opnieuw als de antwoorden of fixture.json veranderd zijn."""
+import json
+import os
+import shutil
+
+import pytest
+
+from wiring_index import WiringIndex, ANSWERS_PATH
+
+
+@pytest.fixture
+def project(tmp_path, fixture_path) -> tuple:
+    answers = tmp_path / "testing_components_answers.json"
+    fixture = tmp_path / "fixture.json"
+    shutil.copy(ANSWERS_PATH, answers)
+    shutil.copy(fixture_path, fixture)
+    return answers, fixture
+
+
+def touch(path):
+    # Eén seconde later, zodat ook een grof mtime het verschil ziet
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def test_unchanged_project_is_cached(project):
+    assert WiringIndex.for_project(*project) is WiringIndex.for_project(*project)
+
+
+@pytest.mark.parametrize("changed", [0, 1], ids=["answers", "fixture"])
+def test_changed_file_rebuilds(project, changed):
+    index = WiringIndex.for_project(*project)
+    touch(project[changed])
+    assert WiringIndex.for_project(*project) is not index
+
+
+def test_rebuild_reads_the_new_answers(project):
+    answers, fixture = project
+    index = WiringIndex.for_project(answers, fixture)
+    data = json.loads(answers.read_text())
+    connector = next(iter(data))
+    del data[connector]
+    answers.write_text(json.dumps(data))
+    touch(answers)
+    rebuilt = WiringIndex.for_project(answers, fixture)
+    assert connector in index.answers and connector not in rebuilt.answers